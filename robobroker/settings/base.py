@@ -89,6 +89,18 @@ DATABASES = {
 }
 if TESTING:
     DATABASES['default']['NAME'] = BASE_DIR / 'test.db.sqlite3'
+TEST_RUNNER = 'robobroker.test_runner.TestRunner'
+
+# Writes of configurations touch it to drop the configurations cache of every process
+# (see shared.domain.configurations)
+CONFIGURATIONS_GENERATION_FILE = BASE_DIR / ('test_configurations_generation' if TESTING
+                                             else 'configurations_generation')
+# Columnar price history (see trading.infrastructure.memmap_price_store)
+PRICES_STORE_DIR = BASE_DIR / ('test_prices' if TESTING else 'prices')
+# Local copy of the prices of the remote instance (see trading.infrastructure.remote_prices)
+REMOTE_PRICES_STORE_DIR = BASE_DIR / ('test_remote_prices' if TESTING else 'remote_prices')
+# Rolling window statistics of the price history (see trading.infrastructure.rolling_stats)
+ROLLING_STATS_DIR = BASE_DIR / ('test_rolling_stats' if TESTING else 'rolling_stats')
 
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
@@ -0,0 +1,23 @@
+from django.test.runner import DiscoverRunner
+
+from shared.domain.dependencies import dependency_dispatcher
+from trading.domain.interfaces import ICryptoCurrencySource
+
+
+class _NoCryptocurrenciesSource(ICryptoCurrencySource):
+    def get_trading_cryptocurrencies(self):
+        return []
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Migration 0004 imports the month prices of every cryptocurrency of the wired source. Test databases
+    are migrated with a source without cryptocurrencies, so they start empty and no API is called.
+    """
+    def setup_databases(self, **kwargs):
+        previous_source = dependency_dispatcher.request_implementation(ICryptoCurrencySource)
+        dependency_dispatcher.register_implementation(ICryptoCurrencySource, _NoCryptocurrenciesSource())
+        try:
+            return super().setup_databases(**kwargs)
+        finally:
+            dependency_dispatcher.register_implementation(ICryptoCurrencySource, previous_source)
@@ -13,6 +13,7 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 
@@ -21,9 +22,12 @@ from shared.domain.dependencies import dependency_dispatcher
 from shared.domain.interfaces.environment import AbstractEnvironment
 from shared.infrastructure.django_configurations import DjangoConfigurationStorage
 from shared.infrastructure.django_environment import DjangoEnvironment
-from trading.domain.interfaces import ICryptoCurrencySource, ILocalStorage
+from trading.domain.interfaces import ICryptoCurrencySource, ILocalStorage, IPriceRollups, IPriceStore, IRollingStats
 from trading.infrastructure.coinbase import CoinbaseCryptoCurrencySource
+from trading.infrastructure.django_rollups import DjangoPriceRollups
 from trading.infrastructure.django_storage import DjangoLocalStorage
+from trading.infrastructure.memmap_price_store import MemmapPriceStore
+from trading.infrastructure.rolling_stats import PriceStoreRollingStats
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -35,3 +39,8 @@ dependency_dispatcher.register_implementation(AbstractConfigurationStorage, Djan
 dependency_dispatcher.register_implementation(ICryptoCurrencySource,
                                               CoinbaseCryptoCurrencySource(native_currency='EUR'))
 dependency_dispatcher.register_implementation(ILocalStorage, DjangoLocalStorage())
+price_store = MemmapPriceStore(settings.PRICES_STORE_DIR)
+dependency_dispatcher.register_implementation(IPriceStore, price_store)
+dependency_dispatcher.register_implementation(IRollingStats,
+                                              PriceStoreRollingStats(price_store, settings.ROLLING_STATS_DIR))
+dependency_dispatcher.register_implementation(IPriceRollups, DjangoPriceRollups())
@@ -3,6 +3,7 @@ from django.db.models import JSONField
 
 from shared.application.forms import PrettyJSONWidget
 from shared.application.models import DServerConfiguration, DUserConfiguration, DSystemLog
+from shared.domain.configurations import invalidate_configurations_cache
 from django.contrib import messages
 
 
@@ -11,9 +12,18 @@ class DServerConfigurationAdmin(admin.ModelAdmin):
         try:
             obj.core_entity.request_pre_save_validations()
             obj.save()
+            invalidate_configurations_cache()
         except Exception as e:
             messages.error(request, str(e))
             return
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        invalidate_configurations_cache()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        invalidate_configurations_cache()
     formfield_overrides = {
         JSONField: {'widget': PrettyJSONWidget}
     }
@@ -24,9 +34,18 @@ class DUserConfigurationAdmin(admin.ModelAdmin):
         try:
             obj.core_entity.request_pre_save_validations()
             obj.save()
+            invalidate_configurations_cache()
         except Exception as e:
             messages.error(request, str(e))
             return
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        invalidate_configurations_cache()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        invalidate_configurations_cache()
     formfield_overrides = {
         JSONField: {'widget': PrettyJSONWidget}
     }
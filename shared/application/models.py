@@ -4,7 +4,7 @@ from shared.domain.configurations import ServerConfiguration, UserConfiguration
 
 
 class DServerConfiguration(models.Model):
-    key = models.CharField(max_length=200, blank=False, null=False)
+    key = models.CharField(max_length=200, blank=False, null=False, unique=True)
     data = models.JSONField(blank=False, null=False, default=dict)
 
     class Meta:
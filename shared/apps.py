@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class SharedConfig(AppConfig):
     name = 'shared'
+
+    def ready(self):
+        from django.conf import settings
+        from shared.domain.configurations import configurations_cache
+        configurations_cache.set_generation_file(str(settings.CONFIGURATIONS_GENERATION_FILE))
@@ -1,7 +1,15 @@
-from typing import Optional
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
 
 from shared.domain.dependencies import dependency_dispatcher
 from shared.domain.event_dispatcher import event_dispatcher
+from shared.domain.tools import filelocks
+
+CACHE_TTL = 30.0
+CACHE_MAX_SIZE = 256
 
 
 class ServerConfiguration:
@@ -37,6 +45,17 @@ class AbstractConfigurationStorage:
     def server_set(self, key: str, data: dict):
         raise NotImplementedError
 
+    def server_get_many(self, keys: List[str]) -> Dict[str, ServerConfiguration]:
+        """
+        Existing configurations of `keys`, missing keys are left out.
+        """
+        configurations = {key: self.server_get(key) for key in keys}
+        return {key: configuration for key, configuration in configurations.items() if configuration is not None}
+
+    def server_set_many(self, items: Dict[str, dict]):
+        for key, data in items.items():
+            self.server_set(key, data)
+
     def user_set(self, user_pk, key: str, data: dict):
         raise NotImplementedError
 
@@ -44,12 +63,133 @@ class AbstractConfigurationStorage:
         raise NotImplementedError
 
 
+class ConfigurationsCache:
+    """
+    LRU cache of configurations read from the storage, entries expire after `ttl` seconds.
+    Writes of any process bump a generation counter kept in `generation_file`, which drops every entry
+    of the caches of all the processes. Without it, entries only expire or are invalidated in this process.
+    Cached configurations are shared, their data must not be mutated.
+    """
+    def __init__(self, ttl=CACHE_TTL, max_size=CACHE_MAX_SIZE, generation_file=None):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.generation_file = generation_file
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._generation = self._read_generation()
+        self._lock = threading.Lock()
+
+    def get(self, cache_key):
+        """
+        Returns (found, value), value can be a cached None.
+        """
+        with self._lock:
+            self._check_generation()
+            entry = self._entries.get(cache_key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[cache_key]
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(cache_key)
+            self.hits += 1
+            return True, entry[1]
+
+    def put(self, cache_key, value):
+        with self._lock:
+            self._entries[cache_key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *cache_keys):
+        """
+        Drops `cache_keys` (every entry if none is given) here and the whole cache of every other process.
+        """
+        with self._lock:
+            if len(cache_keys) == 0:
+                self._entries.clear()
+            for cache_key in cache_keys:
+                self._entries.pop(cache_key, None)
+            self._bump_generation()
+            self._generation = self._read_generation()
+
+    def set_generation_file(self, generation_file):
+        with self._lock:
+            self.generation_file = generation_file
+            self._entries.clear()
+            self._generation = self._read_generation()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def get_stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._entries),
+            'hit_ratio': self.hits / total if total > 0 else 0.0,
+        }
+
+    def _check_generation(self):
+        generation = self._read_generation()
+        if generation != self._generation:
+            self._entries.clear()
+            self._generation = generation
+
+    def _read_generation(self):
+        if self.generation_file is None:
+            return None
+        try:
+            return os.stat(self.generation_file).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _bump_generation(self):
+        if self.generation_file is None:
+            return
+        with filelocks.acquire_single_access(self.generation_file):
+            previous = self._read_generation() or 0
+            with open(self.generation_file, 'a'):
+                pass
+            # the modification time is the counter, it must always move forward
+            generation = max(time.time_ns(), previous + 1)
+            os.utime(self.generation_file, ns=(generation, generation))
+
+
+# its generation file is set from the settings when the shared app is ready
+configurations_cache = ConfigurationsCache()
+
+
+def get_configurations_cache_stats() -> dict:
+    return configurations_cache.get_stats()
+
+
+def invalidate_configurations_cache():
+    """
+    To be called after configurations are written without server_set/user_set (admin, bulk deletes, ...).
+    """
+    configurations_cache.invalidate()
+
+
 def server_get(key: str, default_data=None) -> ServerConfiguration:
-    storage: AbstractConfigurationStorage = dependency_dispatcher.request_implementation(AbstractConfigurationStorage)
-    value = storage.server_get(key)
-    if value is None and default_data is not None:
-        storage.server_set(key, default_data)
-        return storage.server_get(key)
+    found, value = configurations_cache.get(('server', key))
+    if not found:
+        storage: AbstractConfigurationStorage = dependency_dispatcher.request_implementation(
+            AbstractConfigurationStorage)
+        value = storage.server_get(key)
+        if value is None and default_data is not None:
+            storage.server_set(key, default_data)
+            configurations_cache.invalidate(('server', key))
+            value = storage.server_get(key)
+        configurations_cache.put(('server', key), value)
     return value
 
 
@@ -60,14 +200,61 @@ def server_set(key: str, data: dict):
         raise ValueError(f'Data must be a dict object')
     storage: AbstractConfigurationStorage = dependency_dispatcher.request_implementation(AbstractConfigurationStorage)
     storage.server_set(key, data)
+    configurations_cache.invalidate(('server', key))
 
 
-def user_get(user_pk, key: str, default_data=None) -> UserConfiguration:
+def server_get_many(keys: List[str], default_data: Optional[Dict[str, dict]] = None) -> Dict[str, ServerConfiguration]:
+    """
+    Configurations of `keys` read with a single storage call for all of them that are not cached.
+    Missing keys are created from `default_data` when it has them, otherwise they are left out.
+    """
+    default_data = default_data or {}
+    configurations = {}
+    missing_keys = []
+    for key in keys:
+        found, value = configurations_cache.get(('server', key))
+        if found:
+            configurations[key] = value
+        else:
+            missing_keys.append(key)
+
+    if len(missing_keys) > 0:
+        storage: AbstractConfigurationStorage = dependency_dispatcher.request_implementation(
+            AbstractConfigurationStorage)
+        stored = storage.server_get_many(missing_keys)
+        defaults = {key: default_data[key] for key in missing_keys if key not in stored and key in default_data}
+        if len(defaults) > 0:
+            storage.server_set_many(defaults)
+            configurations_cache.invalidate(*[('server', key) for key in defaults.keys()])
+            stored.update(storage.server_get_many(list(defaults.keys())))
+        for key in missing_keys:
+            configurations[key] = stored.get(key)
+            configurations_cache.put(('server', key), configurations[key])
+    return {key: value for key, value in configurations.items() if value is not None}
+
+
+def server_set_many(items: Dict[str, dict]):
+    for key, data in items.items():
+        if type(key) != str:
+            raise ValueError('Invalid key provided. Must be str')
+        if type(data) != dict:
+            raise ValueError('Data must be a dict object')
     storage: AbstractConfigurationStorage = dependency_dispatcher.request_implementation(AbstractConfigurationStorage)
-    value = storage.user_get(user_pk, key)
-    if value is None and default_data is not None:
-        storage.user_set(user_pk, key, default_data)
-        return storage.user_get(user_pk, key)
+    storage.server_set_many(items)
+    configurations_cache.invalidate(*[('server', key) for key in items.keys()])
+
+
+def user_get(user_pk, key: str, default_data=None) -> UserConfiguration:
+    found, value = configurations_cache.get(('user', user_pk, key))
+    if not found:
+        storage: AbstractConfigurationStorage = dependency_dispatcher.request_implementation(
+            AbstractConfigurationStorage)
+        value = storage.user_get(user_pk, key)
+        if value is None and default_data is not None:
+            storage.user_set(user_pk, key, default_data)
+            configurations_cache.invalidate(('user', user_pk, key))
+            value = storage.user_get(user_pk, key)
+        configurations_cache.put(('user', user_pk, key), value)
     return value
 
 
@@ -80,3 +267,4 @@ def user_set(user_pk, key: str, data: dict):
         raise ValueError(f'Data must be a dict object')
     storage: AbstractConfigurationStorage = dependency_dispatcher.request_implementation(AbstractConfigurationStorage)
     storage.user_set(user_pk, key, data)
+    configurations_cache.invalidate(('user', user_pk, key))
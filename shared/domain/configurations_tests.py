@@ -1,6 +1,10 @@
+import os
+import tempfile
+import time
 import unittest
 
-from shared.domain.configurations import server_set, server_get, user_set, user_get
+from shared.domain.configurations import server_set, server_get, user_set, user_get, ConfigurationsCache, \
+    configurations_cache, server_get_many, server_set_many
 
 
 class ConfigurationsTestCase(unittest.TestCase):
@@ -44,3 +48,87 @@ class ConfigurationsTestCase(unittest.TestCase):
         self.assertIsNone(configuration)
         configuration = server_get('non-existent-server-key')
         self.assertIsNone(configuration)
+
+    def test_cached_server_configurations(self):
+        server_set('cached_key', {'value': 1})
+        configurations_cache.clear()
+        self.assertEqual(server_get('cached_key').data, {'value': 1})
+        self.assertEqual(server_get('cached_key').data, {'value': 1})
+        self.assertEqual(configurations_cache.get_stats()['misses'], 1)
+        self.assertEqual(configurations_cache.get_stats()['hits'], 1)
+
+        server_set('cached_key', {'value': 2})
+        self.assertEqual(server_get('cached_key').data, {'value': 2})
+        self.assertEqual(server_get('cached_default_key', default_data={'value': 3}).data, {'value': 3})
+
+    def test_many_server_configurations(self):
+        server_set('many_key1', {'value': 1})
+        server_set_many({'many_key1': {'value': 11}, 'many_key2': {'value': 2}})
+        configurations = server_get_many(['many_key1', 'many_key2', 'many_key3', 'many_key4'],
+                                         default_data={'many_key3': {'value': 3}})
+        self.assertEqual({key: c.data for key, c in configurations.items()},
+                         {'many_key1': {'value': 11}, 'many_key2': {'value': 2}, 'many_key3': {'value': 3}})
+        self.assertEqual(server_get('many_key3').data, {'value': 3})
+        self.assertIsNone(server_get('many_key4'))
+
+        server_set_many({'many_key2': {'value': 22}})
+        self.assertEqual(server_get_many(['many_key2'])['many_key2'].data, {'value': 22})
+        with self.assertRaises(ValueError):
+            server_set_many({'many_key5': 5})
+
+
+class ConfigurationsCacheTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.generation_file = os.path.join(self.directory.name, 'generation')
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_ttl(self):
+        cache = ConfigurationsCache(ttl=0.05, generation_file=self.generation_file)
+        cache.put('a', 1)
+        self.assertEqual(cache.get('a'), (True, 1))
+        time.sleep(0.06)
+        self.assertEqual(cache.get('a'), (False, None))
+        self.assertEqual(cache.get_stats()['hits'], 1)
+        self.assertEqual(cache.get_stats()['misses'], 1)
+
+    def test_least_recently_used_eviction(self):
+        cache = ConfigurationsCache(max_size=2, generation_file=self.generation_file)
+        cache.put('a', 1)
+        cache.put('b', None)
+        cache.get('a')
+        cache.put('c', 3)
+        self.assertEqual(cache.get('a'), (True, 1))
+        self.assertEqual(cache.get('b'), (False, None))
+        self.assertEqual(cache.get('c'), (True, 3))
+        self.assertEqual(cache.get_stats()['evictions'], 1)
+        self.assertEqual(cache.get_stats()['size'], 2)
+
+    def test_cross_process_invalidation(self):
+        cache = ConfigurationsCache(generation_file=self.generation_file)
+        other_process_cache = ConfigurationsCache(generation_file=self.generation_file)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        other_process_cache.put('a', 1)
+
+        other_process_cache.invalidate('a')
+        self.assertEqual(other_process_cache.get('a'), (False, None))
+        self.assertEqual(cache.get('a'), (False, None))
+        self.assertEqual(cache.get('b'), (False, None))
+
+        cache.put('b', 2)
+        self.assertEqual(cache.get('b'), (True, 2))
+
+    def test_without_generation_file(self):
+        cache = ConfigurationsCache()
+        cache.put('a', 1)
+        cache.invalidate('b')
+        self.assertEqual(cache.get('a'), (True, 1))
+
+        other_process_cache = ConfigurationsCache(generation_file=self.generation_file)
+        cache.set_generation_file(self.generation_file)
+        cache.put('a', 1)
+        other_process_cache.invalidate()
+        self.assertEqual(cache.get('a'), (False, None))
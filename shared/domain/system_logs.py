@@ -1,5 +1,16 @@
+from typing import List, Tuple
+
 
 def add_system_log(log_type: str, text):
     # TODO enhance this
     from shared.application.models import DSystemLog
     DSystemLog.objects.create(log_type=log_type, text=text)
+
+
+def add_system_logs(logs: List[Tuple[str, str]]):
+    """
+    Adds several (log_type, text) logs with a single insert.
+    """
+    from shared.application.models import DSystemLog
+    if len(logs) > 0:
+        DSystemLog.objects.bulk_create([DSystemLog(log_type=log_type, text=text) for log_type, text in logs])
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Dict, List, Optional
 
 from shared.domain.configurations import AbstractConfigurationStorage, UserConfiguration, ServerConfiguration
 
@@ -20,12 +20,24 @@ class DjangoConfigurationStorage(AbstractConfigurationStorage):
 
     def server_set(self, key: str, data: dict):
         from shared.application.models import DServerConfiguration
-        config = DServerConfiguration.objects.filter(key=key).first()
-        if config is None:
-            DServerConfiguration.objects.create(key=key, data=data)
-        else:
-            config.data = data
-            config.save()
+        DServerConfiguration.objects.update_or_create(key=key, defaults={'data': data})
+
+    def server_get_many(self, keys: List[str]) -> Dict[str, ServerConfiguration]:
+        from shared.application.models import DServerConfiguration
+        return {config.key: config.core_entity for config in DServerConfiguration.objects.filter(key__in=keys)}
+
+    def server_set_many(self, items: Dict[str, dict]):
+        from django.db import transaction
+        from shared.application.models import DServerConfiguration
+        with transaction.atomic():
+            configs = DServerConfiguration.objects.select_for_update().filter(key__in=list(items.keys()))
+            existing = {config.key: config for config in configs}
+            for key, config in existing.items():
+                config.data = items[key]
+            DServerConfiguration.objects.bulk_update(existing.values(), ['data'])
+            DServerConfiguration.objects.bulk_create([
+                DServerConfiguration(key=key, data=data) for key, data in items.items() if key not in existing
+            ])
 
     def user_set(self, user_pk, key: str, data: dict):
         from shared.application.models import DUserConfiguration
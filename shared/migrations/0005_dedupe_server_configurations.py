@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+def _dedupe_server_configurations(apps, schema_editor):
+    # reads always returned the oldest row of a key, that is the one kept
+    DServerConfiguration = apps.get_model('shared', 'DServerConfiguration')
+    seen_keys = set()
+    duplicated_pks = []
+    for pk, key in DServerConfiguration.objects.order_by('key', 'pk').values_list('pk', 'key'):
+        if key in seen_keys:
+            duplicated_pks.append(pk)
+        seen_keys.add(key)
+    DServerConfiguration.objects.filter(pk__in=duplicated_pks).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shared', '0004_auto_20210216_1003'),
+    ]
+
+    operations = [
+        migrations.RunPython(_dedupe_server_configurations, migrations.RunPython.noop),
+    ]
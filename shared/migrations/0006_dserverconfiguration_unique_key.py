@@ -0,0 +1,18 @@
+# Generated by Django 3.1.6 on 2026-10-18 11:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shared', '0005_dedupe_server_configurations'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='dserverconfiguration',
+            name='key',
+            field=models.CharField(max_length=200, unique=True),
+        ),
+    ]
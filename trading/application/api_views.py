@@ -1,27 +1,64 @@
-from datetime import timedelta
+import hashlib
+import json
+from datetime import datetime, timedelta
 
+import pytz
+from django.db.models import Count, Max, Min
+from django.http import StreamingHttpResponse
 from django.utils import timezone
-from rest_framework.decorators import api_view
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework.decorators import api_view, renderer_classes
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
 from shared.domain.dependencies import dependency_dispatcher
 from trading.application.django_models import DCryptocurrencyPrice
-from trading.domain.interfaces import ICryptoCurrencySource
+from trading.application.renderers import ColumnarJSONRenderer, PackedPricesRenderer, accepts_gzip
+from trading.domain.interfaces import ICryptoCurrencySource, IPriceRollups
+
+STREAM_CHUNK_SIZE = 2000
 
 
 @api_view(http_method_names=['GET'])
+@renderer_classes(api_settings.DEFAULT_RENDERER_CLASSES + [ColumnarJSONRenderer, PackedPricesRenderer])
 def last_month_prices_view(request, currency=None):
     if not request.user.is_authenticated:
         return Response(status=401)
 
-    days = int(request.GET.get('days', 30))
-    prices = DCryptocurrencyPrice.objects.filter(symbol=currency, instant__gte=timezone.now() - timedelta(days=days)).order_by('instant').all()
-    serialized_prices = [{
-        'i': p.instant.timestamp(),
-        's': p.sell_price,
-        'b': p.buy_price,
-    } for p in prices]
-    return Response(serialized_prices)
+    try:
+        start, sliding_duration = _get_start_instant(request)
+    except ValueError as e:
+        return Response({'detail': str(e)}, status=400)
+
+    prices = DCryptocurrencyPrice.objects.filter(symbol=currency)
+    parts = [currency, request.accepted_media_type]
+    columnar = getattr(request.accepted_renderer, 'columnar', False)
+    if columnar:
+        # the same representation is served gzipped or not, they can not share a strong ETag
+        parts.append('gzip' if accepts_gzip(request) else 'identity')
+    etag, last_modified = _get_validators(request, prices, start, sliding_duration, *parts)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        if columnar:
+            patch_vary_headers(not_modified, ('Accept-Encoding',))
+        return _set_validators(not_modified, etag, last_modified)
+
+    rows = prices.filter(instant__gt=start).order_by('instant').values_list('instant', 'sell_price', 'buy_price')
+    if columnar:
+        instants, sell_prices, buy_prices = [], [], []
+        for instant, sell_price, buy_price in rows:
+            instants.append(instant.timestamp())
+            sell_prices.append(sell_price)
+            buy_prices.append(buy_price)
+        response = Response({'i': instants, 's': sell_prices, 'b': buy_prices})
+    else:
+        response = Response([{
+            'i': instant.timestamp(),
+            's': sell_price,
+            'b': buy_price,
+        } for instant, sell_price, buy_price in rows])
+    return _set_validators(response, etag, last_modified)
 
 
 @api_view(http_method_names=['GET'])
@@ -29,14 +66,145 @@ def all_last_month_prices_view(request):
     if not request.user.is_authenticated:
         return Response(status=401)
 
+    try:
+        start, sliding_duration = _get_start_instant(request)
+    except ValueError as e:
+        return Response({'detail': str(e)}, status=400)
+
     trading_source: ICryptoCurrencySource = dependency_dispatcher.request_implementation(ICryptoCurrencySource)
-    all_prices = {}
-    days = int(request.GET.get('days', 30))
-    for currency in trading_source.get_trading_cryptocurrencies():
-        prices = DCryptocurrencyPrice.objects.filter(symbol=currency.symbol, instant__gte=timezone.now() - timedelta(days=days)).order_by('instant').all()
-        all_prices[currency.symbol] = [{
-            'i': p.instant.timestamp(),
-            's': p.sell_price,
-            'b': p.buy_price,
-        } for p in prices]
-    return Response(all_prices)
+    symbols = [currency.symbol for currency in trading_source.get_trading_cryptocurrencies()]
+    prices = DCryptocurrencyPrice.objects.filter(symbol__in=symbols)
+    etag, last_modified = _get_validators(request, prices, start, sliding_duration, *sorted(symbols))
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return _set_validators(not_modified, etag, last_modified)
+
+    rows = prices.filter(instant__gt=start).order_by('symbol', 'instant')\
+        .values_list('symbol', 'instant', 'sell_price', 'buy_price')
+    response = StreamingHttpResponse(_stream_prices_by_symbol(rows, symbols), content_type='application/json')
+    return _set_validators(response, etag, last_modified)
+
+
+def _get_start_instant(request):
+    """
+    Start of the requested window (exclusive): the last `days` (30 by default), or the `since` epoch cursor
+    if it is more recent, so polling clients only get samples they have not seen yet.
+    Returns it and the duration of the window when it slides with the current time (None for `since`).
+    Raises ValueError on malformed parameters.
+    """
+    duration = _get_duration(request)
+    start = timezone.now() - duration
+    since = request.GET.get('since')
+    if since is None:
+        return start, duration
+    try:
+        since = pytz.utc.localize(datetime.utcfromtimestamp(float(since)))
+    except (ValueError, OverflowError, OSError):
+        raise ValueError(f'Invalid since: {since}')
+    return (start, duration) if start >= since else (since, None)
+
+
+def _get_duration(request) -> timedelta:
+    """
+    The `days` parameter, 30 by default. Raises ValueError if it is not a number of days that fits in a date.
+    """
+    days = request.GET.get('days', '30')
+    try:
+        duration = timedelta(days=int(days))
+        timezone.now() - duration
+    except (ValueError, OverflowError):
+        raise ValueError(f'Invalid days: {days}')
+    if duration < timedelta():
+        raise ValueError(f'Invalid days: {days}')
+    return duration
+
+
+def _get_validators(request, prices, start, sliding_duration, *parts):
+    """
+    ETag and Last-Modified of the prices served after `start`: the rows in the window and everything else
+    the body depends on (query parameters, negotiated format, ...).
+    A sliding window also changes when its rows leave it, Last-Modified is the latest of both.
+    """
+    window = prices.filter(instant__gt=start).aggregate(first=Min('instant'), latest=Max('instant'),
+                                                        count=Count('instant'))
+    instants = [window['latest']]
+    if sliding_duration is not None:
+        left = prices.filter(instant__lte=start).aggregate(latest=Max('instant'))['latest']
+        if left is not None:
+            instants.append(left + sliding_duration)
+    instants = [instant for instant in instants if instant is not None]
+    last_modified = int(max(instants).timestamp()) if len(instants) > 0 else 0
+    fingerprint = ':'.join(str(part) for part in (
+        window['first'].timestamp() if window['first'] is not None else 0,
+        window['latest'].timestamp() if window['latest'] is not None else 0,
+        window['count'],
+        request.GET.urlencode(),
+    ) + parts)
+    return quote_etag(hashlib.md5(fingerprint.encode()).hexdigest()), last_modified
+
+
+def _set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def _stream_prices_by_symbol(rows, symbols, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Streams {symbol: [{'i', 's', 'b'}, ...]} from rows sorted by symbol and instant, one chunk at a time.
+    Symbols without prices get an empty list.
+    """
+    yield '{'
+    current_symbol = None
+    pending_symbols = set(symbols)
+    parts = []
+    for symbol, instant, sell_price, buy_price in rows.iterator(chunk_size=chunk_size):
+        if symbol != current_symbol:
+            if current_symbol is not None:
+                parts.append('],')
+            parts.append(f'{json.dumps(symbol)}:[')
+            current_symbol = symbol
+            pending_symbols.discard(symbol)
+        else:
+            parts.append(',')
+        parts.append(f'{{"i":{_json_number(instant.timestamp())},"s":{_json_number(sell_price)},'
+                     f'"b":{_json_number(buy_price)}}}')
+        if len(parts) >= chunk_size:
+            yield ''.join(parts)
+            parts = []
+    if current_symbol is not None:
+        parts.append(']')
+    for n, symbol in enumerate(sorted(pending_symbols)):
+        parts.append(f'{"," if current_symbol is not None or n > 0 else ""}{json.dumps(symbol)}:[]')
+    parts.append('}')
+    yield ''.join(parts)
+
+
+def _json_number(value):
+    return 'null' if value is None else repr(float(value))
+
+
+@api_view(http_method_names=['GET'])
+def price_rollups_view(request, currency=None):
+    if not request.user.is_authenticated:
+        return Response(status=401)
+
+    try:
+        duration = _get_duration(request)
+    except ValueError as e:
+        return Response({'detail': str(e)}, status=400)
+
+    price_rollups: IPriceRollups = dependency_dispatcher.request_implementation(IPriceRollups)
+    rollups = price_rollups.get_rollups(currency, duration)
+    return Response({
+        'resolution': rollups[0].resolution if len(rollups) > 0 else None,
+        'rollups': [{
+            'i': r.instant.timestamp(),
+            'o': r.open_price,
+            'h': r.high_price,
+            'l': r.low_price,
+            'c': r.close_price,
+            'm': r.mean_price,
+            'n': r.samples,
+        } for r in rollups],
+    })
@@ -0,0 +1,174 @@
+import gzip
+import json
+import math
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+
+from shared.domain.dependencies import dependency_dispatcher
+from trading.application.api_views import _stream_prices_by_symbol
+from trading.application.django_models import DCryptocurrencyPrice
+from trading.domain.entities import Cryptocurrency
+from trading.domain.interfaces import ICryptoCurrencySource
+from trading.domain.tools.wire import from_columns, unpack_prices
+
+
+class _Source(ICryptoCurrencySource):
+    def __init__(self, symbols):
+        super().__init__()
+        self.symbols = symbols
+
+    def get_trading_cryptocurrencies(self):
+        return [Cryptocurrency(symbol=symbol, metadata={}) for symbol in self.symbols]
+
+
+class PricesApiTests(TestCase):
+    def setUp(self) -> None:
+        import robobroker.urls  # noqa: F401, wires the implementations that are replaced below
+        self.previous_source = dependency_dispatcher.request_implementation(ICryptoCurrencySource)
+        dependency_dispatcher.register_implementation(ICryptoCurrencySource, _Source(['ETH', 'BTC', 'ADA', 'DAI']))
+
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user('replica', password='secret'))
+        self.now = timezone.now()
+        self._add_prices('BTC', self.now - timedelta(days=2), 5)
+        self._add_prices('ETH', self.now - timedelta(days=1), 3)
+        # not traded and too old
+        self._add_prices('XRP', self.now - timedelta(days=1), 3)
+        self._add_prices('ADA', self.now - timedelta(days=40), 2)
+
+    def tearDown(self) -> None:
+        dependency_dispatcher.register_implementation(ICryptoCurrencySource, self.previous_source)
+
+    def _add_prices(self, symbol, start, count):
+        DCryptocurrencyPrice.objects.bulk_create([DCryptocurrencyPrice(
+            symbol=symbol,
+            instant=start + timedelta(minutes=5 * n),
+            sell_price=float(n),
+            buy_price=float(n) + 0.5 if n != 1 else None,
+        ) for n in range(count)])
+
+    def _expected(self, symbol, days=30):
+        return [{'i': p.instant.timestamp(), 's': p.sell_price, 'b': p.buy_price} for p in DCryptocurrencyPrice.objects
+                .filter(symbol=symbol, instant__gt=self.now - timedelta(days=days)).order_by('instant')]
+
+    def test_all_prices_stream(self):
+        response = self.client.get('/api/all-month-prices/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        body = json.loads(b''.join(response.streaming_content))
+        # symbols with prices first, then the ones without prices
+        self.assertEqual(list(body.keys()), ['BTC', 'ETH', 'ADA', 'DAI'])
+        self.assertEqual(body['BTC'], self._expected('BTC'))
+        self.assertEqual(body['ETH'], self._expected('ETH'))
+        self.assertEqual((body['ADA'], body['DAI']), ([], []))
+        self.assertIsNone(body['BTC'][1]['b'])
+
+        body = json.loads(b''.join(self.client.get('/api/all-month-prices/?days=60').streaming_content))
+        self.assertEqual(body['ADA'], self._expected('ADA', days=60))
+
+    def test_stream_chunks(self):
+        rows = DCryptocurrencyPrice.objects.filter(symbol__in=['BTC', 'ETH']).order_by('symbol', 'instant')\
+            .values_list('symbol', 'instant', 'sell_price', 'buy_price')
+        expected = json.loads(''.join(_stream_prices_by_symbol(rows, ['BTC', 'ETH', 'ADA'])))
+        for chunk_size in [1, 2, 3, 7]:
+            chunks = list(_stream_prices_by_symbol(rows, ['BTC', 'ETH', 'ADA'], chunk_size=chunk_size))
+            self.assertGreater(len(chunks), 2)
+            self.assertEqual(json.loads(''.join(chunks)), expected)
+        self.assertEqual(list(expected.keys()), ['BTC', 'ETH', 'ADA'])
+        self.assertEqual(len(expected['BTC']) + len(expected['ETH']), 8)
+
+        no_rows = rows.none()
+        self.assertEqual(json.loads(''.join(_stream_prices_by_symbol(no_rows, ['BTC', 'ADA']))), {'ADA': [], 'BTC': []})
+        self.assertEqual(''.join(_stream_prices_by_symbol(no_rows, [])), '{}')
+
+    def test_month_prices_formats(self):
+        expected = self._expected('BTC')
+        seconds = [round(price['i']) for price in expected]
+        response = self.client.get('/api/month-prices/BTC/')
+        self.assertEqual(response.json(), expected)
+
+        response = self.client.get('/api/month-prices/BTC/?format=columnar')
+        self.assertEqual(response['Content-Type'], 'application/vnd.robobroker.columnar+json')
+        self.assertEqual(from_columns(json.loads(response.content)), (seconds, [p['s'] for p in expected],
+                                                                       [p['b'] for p in expected]))
+
+        response = self.client.get('/api/month-prices/BTC/', HTTP_ACCEPT='application/vnd.robobroker.packed-prices')
+        self.assertEqual(response['Content-Type'], 'application/vnd.robobroker.packed-prices')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', response['Vary'])
+        instants, sell_prices, buy_prices = unpack_prices(response.content)
+        self.assertEqual((instants.tolist(), sell_prices.tolist()), (seconds, [p['s'] for p in expected]))
+        self.assertTrue(math.isnan(buy_prices[1]))
+
+    def test_month_prices_gzip(self):
+        response = self.client.get('/api/month-prices/BTC/?format=packed', HTTP_ACCEPT_ENCODING='deflate, gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        instants, _, _ = unpack_prices(gzip.decompress(response.content))
+        self.assertEqual(len(instants), 5)
+
+        # plain JSON is left as it is
+        response = self.client.get('/api/month-prices/BTC/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(len(response.json()), 5)
+
+    def test_not_modified(self):
+        for n, url in enumerate(['/api/month-prices/BTC/?format=packed', '/api/all-month-prices/']):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual((response.status_code, response.content), (304, b''))
+            self.assertTrue(response.has_header('ETag'))
+            self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code,
+                             304)
+
+            # a new sample changes both
+            etag, last_modified = response['ETag'], response['Last-Modified']
+            self._add_prices('BTC', self.now + timedelta(minutes=1 + n), 1)
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+            self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 200)
+
+    def test_sliding_window(self):
+        # ADA left the 30 days window 10 days ago, its body changed then
+        response = self.client.get('/api/month-prices/ADA/')
+        self.assertEqual(response.json(), [])
+        self.assertEqual(response['Last-Modified'], http_date(int((self.now - timedelta(days=10, minutes=-5))
+                                                                  .timestamp())))
+        # the same rows in a shorter window, or samples dropped from it, are other bodies
+        etag = self.client.get('/api/month-prices/BTC/?days=3')['ETag']
+        self.assertNotEqual(self.client.get('/api/month-prices/BTC/?days=3', HTTP_IF_NONE_MATCH=etag).status_code,
+                            200)
+        DCryptocurrencyPrice.objects.filter(symbol='BTC').order_by('instant').first().delete()
+        self.assertEqual(self.client.get('/api/month-prices/BTC/?days=3', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_encodings(self):
+        url = '/api/month-prices/BTC/?format=columnar'
+        plain = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip;q=0, identity')
+        self.assertFalse(plain.has_header('Content-Encoding'))
+        compressed = self.client.get(url, HTTP_ACCEPT_ENCODING='br, *;q=0.5')
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertNotEqual(plain['ETag'], compressed['ETag'])
+
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=plain['ETag'])
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='x-gzip', HTTP_IF_NONE_MATCH=compressed['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_malformed_parameters(self):
+        for query in ['days=a', 'days=-1', 'days=1e9', 'days=99999999', 'since=a', 'since=nan', 'since=1e30']:
+            for url in ['/api/month-prices/BTC/', '/api/month-prices/BTC/?format=packed', '/api/all-month-prices/',
+                        '/api/price-rollups/BTC/']:
+                if 'since' in query and 'rollups' in url:
+                    continue
+                response = self.client.get(f'{url}{"&" if "?" in url else "?"}{query}')
+                self.assertEqual(response.status_code, 400, f'{url} {query}')
+                self.assertIn('Invalid', json.loads(response.content)['detail'])
+
+        since = (self.now - timedelta(days=1, minutes=-1)).timestamp()
+        self.assertEqual(len(self.client.get(f'/api/month-prices/ETH/?since={since}').json()), 2)
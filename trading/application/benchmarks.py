@@ -0,0 +1,625 @@
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytz
+from django.db import connection, transaction
+
+from trading.application.django_models import DCryptocurrencyPrice
+from trading.domain.entities import CryptocurrencyPrice
+from trading.domain.tools.market import PriceMatrix
+from trading.domain.tools.prices import PricesIndex, PricesQueryset, PriceSeries
+from trading.domain.tools.stats import profit_difference_percentage
+from trading.domain.tools.testing import generate_currency_prices, generate_market
+
+BENCHMARKS = {}
+
+
+@contextmanager
+def _throwaway_database(source):
+    """
+    Points the default database to a new SQLite file while the block runs, then deletes it.
+    It is migrated with `source` wired, migration 0004 imports the prices of the wired source.
+    """
+    from shared.domain.dependencies import dependency_dispatcher
+    from trading.domain.interfaces import ICryptoCurrencySource
+
+    directory = tempfile.mkdtemp()
+    old_name = connection.settings_dict['NAME']
+    old_test_name = connection.settings_dict['TEST'].get('NAME')
+    connection.settings_dict['TEST']['NAME'] = os.path.join(directory, 'benchmark.sqlite3')
+    previous_source = dependency_dispatcher.request_implementation(ICryptoCurrencySource)
+    dependency_dispatcher.register_implementation(ICryptoCurrencySource, source)
+    try:
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        yield
+    finally:
+        dependency_dispatcher.register_implementation(ICryptoCurrencySource, previous_source)
+        if connection.settings_dict['NAME'] != old_name:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+        connection.settings_dict['TEST']['NAME'] = old_test_name
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def benchmark(name):
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+    return decorator
+
+
+def run_benchmark(name, report=print, **params):
+    if name not in BENCHMARKS:
+        raise ValueError(f'Unknown benchmark {name}. Available: {", ".join(sorted(BENCHMARKS.keys()))}')
+    return BENCHMARKS[name](report=report, **params)
+
+
+def _best_time(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def _synthetic_price_rows(symbols, days=30, now=None):
+    now = now or pytz.utc.localize(datetime.utcnow())
+    start_ts = (now - timedelta(days=days)).timestamp()
+    samples = days * 288
+    rows = []
+    for symbol in symbols:
+        price = random.uniform(1.0, 1000.0)
+        for n in range(samples):
+            price *= random.uniform(0.995, 1.005)
+            rows.append({
+                'symbol': symbol,
+                'instant': start_ts + n * 300,
+                'sell_price': price,
+                'buy_price': price * 1.005,
+            })
+    return rows
+
+
+@benchmark('prices_index')
+def prices_index_benchmark(report=print, days=30, symbols='10,20,40,80'):
+    """
+    Per tick cost of get_last_month_prices for every trading currency: scanning the decoded blobs for each
+    currency against decoding them once and serving every currency from a PricesIndex.
+    """
+    days = int(days)
+    now = pytz.utc.localize(datetime.utcnow())
+    report(f'{"symbols":>8} {"scan (s)":>10} {"index (s)":>10} {"speedup":>8}')
+    for n_symbols in [int(n) for n in str(symbols).split(',')]:
+        symbol_names = [f'S{n}' for n in range(n_symbols)]
+        blob = json.dumps({'current_prices': _synthetic_price_rows(symbol_names, days=days, now=now)})
+
+        def scan_tick():
+            for symbol in symbol_names:
+                native_prices = []
+                for price in json.loads(blob)['current_prices']:
+                    if price['symbol'] != symbol:
+                        continue
+                    instant = pytz.utc.localize(datetime.utcfromtimestamp(price['instant']))
+                    if instant < now - timedelta(days=30):
+                        continue
+                    native_prices.append(CryptocurrencyPrice(
+                        symbol=price['symbol'],
+                        instant=instant,
+                        sell_price=price['sell_price'],
+                        buy_price=price['buy_price'],
+                    ))
+                native_prices.sort(key=lambda p: p.instant)
+
+        def index_tick():
+            index = PricesIndex(json.loads(blob)['current_prices'])
+            for symbol in symbol_names:
+                index.get_prices(symbol, since=now - timedelta(days=30))
+
+        scan = _best_time(scan_tick, repeat=1)
+        index = _best_time(index_tick)
+        report(f'{n_symbols:>8} {scan:>10.3f} {index:>10.3f} {scan / index:>7.1f}x')
+
+
+@benchmark('prices_windows')
+def prices_windows_benchmark(report=print, days=30, repeat=100):
+    """
+    Window queries done by sell/purchase over a month of 5 minute samples: the former linear scan
+    against the bisected and memoized PricesQueryset, over a list of prices and over a PriceSeries.
+    """
+    days = int(days)
+    repeat = int(repeat)
+    now = pytz.utc.localize(datetime.utcnow())
+    rows = _synthetic_price_rows(['BTC'], days=days, now=now)
+    prices = PricesIndex(rows).get_prices('BTC')
+    series = PriceSeries.from_prices('BTC', prices)
+    windows = [timedelta(days=30), timedelta(days=7), timedelta(days=4), timedelta(days=30), timedelta(days=7)]
+
+    def linear_profit(td):
+        filtered_prices = [price for price in prices if now - td <= price.instant <= now]
+        if len(filtered_prices) == 0:
+            return 0
+        return profit_difference_percentage(filtered_prices[0].sell_price, filtered_prices[-1].sell_price)
+
+    def linear():
+        for _ in range(repeat):
+            for td in windows:
+                linear_profit(td)
+
+    def bisected(source):
+        def run():
+            for _ in range(repeat):
+                qs = PricesQueryset(source)
+                for td in windows:
+                    qs.profit_percentage(td, now=now)
+        return run
+
+    report(f'{len(prices)} prices, {len(windows)} windows per tick, {repeat} ticks')
+    linear_time = _best_time(linear)
+    report(f'{"linear scan":<24} {linear_time * 1000 / repeat:>10.3f} ms/tick')
+    for name, source in [('bisect (list)', prices), ('bisect (PriceSeries)', series)]:
+        elapsed = _best_time(bisected(source))
+        report(f'{name:<24} {elapsed * 1000 / repeat:>10.3f} ms/tick {linear_time / elapsed:>8.1f}x')
+
+
+@benchmark('profit_engine')
+def profit_engine_benchmark(report=print, days=30, symbols='40,100,300'):
+    """
+    4d, 7d and 30d profits of every currency: one PricesQueryset per currency against one PriceMatrix pass.
+    "matrix" includes building the matrix, "query" is the pass alone over an already built one.
+    """
+    days = int(days)
+    now = pytz.utc.localize(datetime.utcnow())
+    windows = [timedelta(days=4), timedelta(days=7), timedelta(days=30)]
+    report(f'{"symbols":>8} {"queryset (ms)":>14} {"matrix (ms)":>15} {"query (ms)":>11} {"speedup":>8}')
+    for n_symbols in [int(n) for n in str(symbols).split(',')]:
+        grouped_rows = defaultdict(list)
+        for row in _synthetic_price_rows([f'S{n}' for n in range(n_symbols)], days=days, now=now):
+            grouped_rows[row['symbol']].append(row)
+        series_list = [PriceSeries(
+            symbol=symbol,
+            instants=np.array([r['instant'] for r in rows]),
+            sell_prices=np.array([r['sell_price'] for r in rows]),
+            buy_prices=np.array([r['buy_price'] for r in rows]),
+        ) for symbol, rows in grouped_rows.items()]
+
+        def per_currency():
+            for series in series_list:
+                qs = PricesQueryset(series)
+                for td in windows:
+                    qs.profit_percentage(td, now=now)
+
+        def tick():
+            PriceMatrix.from_series(series_list, (now - timedelta(days=30)).timestamp(), now.timestamp())\
+                .window_profits(windows, now=now)
+
+        matrix = PriceMatrix.from_series(series_list, (now - timedelta(days=30)).timestamp(), now.timestamp())
+        matrix.window_profits(windows, now=now)
+        queryset_time = _best_time(per_currency)
+        tick_time = _best_time(tick)
+        query_time = _best_time(lambda: matrix.window_profits(windows, now=now))
+        report(f'{n_symbols:>8} {queryset_time * 1000:>14.2f} {tick_time * 1000:>15.2f} {query_time * 1000:>11.3f} '
+               f'{queryset_time / tick_time:>7.1f}x')
+
+
+@benchmark('coinbase_client')
+def coinbase_client_benchmark(report=print, calls=200, latency=0.0, workers='1,8'):
+    """
+    Latency of get_sell_price against a local HTTP stand-in of Coinbase: a new client (and connection) per call
+    against clients borrowed from a CoinbaseClientPool, which keep their connections alive.
+    The stand-in is plain HTTP, TLS handshakes saved by the pool in production are not part of the numbers.
+    """
+    import warnings
+    from concurrent.futures import ThreadPoolExecutor
+
+    from coinbase.wallet.client import Client
+
+    from trading.infrastructure.coinbase_pool import API_VERSION, CoinbaseClientPool, PooledClientProxy
+    from trading.infrastructure.coinbase_testing import FakeCoinbaseServer
+
+    calls = int(calls)
+    warnings.simplefilter('ignore', UserWarning)
+    report(f'{"workers":>8} {"new client (ms/call)":>21} {"pooled (ms/call)":>17} {"speedup":>8}')
+    with FakeCoinbaseServer({'BTC': (100.0, 101.0)}, latency=float(latency)) as server:
+        for n_workers in [int(n) for n in str(workers).split(',')]:
+            pool = CoinbaseClientPool('key', 'secret', api_uri=server.base_url, size=n_workers)
+            pooled_client = PooledClientProxy(pool)
+
+            def new_client_call(_):
+                Client('key', 'secret', base_api_uri=server.base_url, api_version=API_VERSION)\
+                    .get_sell_price(currency_pair='BTC-EUR')
+
+            def pooled_call(_):
+                pooled_client.get_sell_price(currency_pair='BTC-EUR')
+
+            def run(call):
+                with ThreadPoolExecutor(max_workers=n_workers) as executor:
+                    list(executor.map(call, range(calls)))
+
+            new_client_time = _best_time(lambda: run(new_client_call))
+            pooled_time = _best_time(lambda: run(pooled_call))
+            pool.close()
+            report(f'{n_workers:>8} {new_client_time * 1000 / calls:>21.3f} {pooled_time * 1000 / calls:>17.3f} '
+                   f'{new_client_time / pooled_time:>7.1f}x')
+
+
+@benchmark('prices_table')
+def prices_table_benchmark(report=print, months='1,3,6', symbols=10, repeat=5):
+    """
+    Latency of the last month prices query of the API views over DCryptocurrencyPrice filled with `months` of
+    synthetic history, without and with the (symbol, instant) index.
+    Everything happens inside a transaction that is rolled back, the database is left untouched.
+    """
+    symbols, repeat = int(symbols), int(repeat)
+    index = next(i for i in DCryptocurrencyPrice._meta.indexes if i.fields == ['symbol', 'instant'])
+    editor = connection.schema_editor()
+    now = pytz.utc.localize(datetime.utcnow())
+    symbol_names = [f'BENCH{n}' for n in range(symbols)]
+
+    def query():
+        return DCryptocurrencyPrice.objects.filter(symbol=symbol_names[0], instant__gte=now - timedelta(days=30))\
+            .order_by('instant').values_list('instant', 'sell_price', 'buy_price')
+
+    def run_sql():
+        # rows are fetched but not converted to python values, so the database work is measured alone
+        sql, params = query().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            cursor.fetchall()
+
+    def measure():
+        return _best_time(run_sql, repeat=repeat), _best_time(lambda: list(query()), repeat=repeat), \
+            query().explain()
+
+    report(f'{"months":>7} {"rows":>9} {"sql no index (ms)":>18} {"sql index (ms)":>15} {"speedup":>8} '
+           f'{"orm no index (ms)":>18} {"orm index (ms)":>15}')
+    for n_months in [int(n) for n in str(months).split(',')]:
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(str(index.remove_sql(DCryptocurrencyPrice, editor)))
+            rows = _synthetic_price_rows(symbol_names, days=n_months * 30, now=now)
+            DCryptocurrencyPrice.objects.bulk_create([DCryptocurrencyPrice(
+                symbol=row['symbol'],
+                instant=pytz.utc.localize(datetime.utcfromtimestamp(row['instant'])),
+                sell_price=row['sell_price'],
+                buy_price=row['buy_price'],
+            ) for row in rows], batch_size=5000)
+            scan_sql_time, scan_orm_time, scan_plan = measure()
+
+            with connection.cursor() as cursor:
+                cursor.execute(str(index.create_sql(DCryptocurrencyPrice, editor)))
+                cursor.execute('ANALYZE')
+            index_sql_time, index_orm_time, index_plan = measure()
+            transaction.set_rollback(True)
+
+        report(f'{n_months:>7} {len(rows):>9} {scan_sql_time * 1000:>18.2f} {index_sql_time * 1000:>15.2f} '
+               f'{scan_sql_time / index_sql_time:>7.1f}x {scan_orm_time * 1000:>18.2f} {index_orm_time * 1000:>15.2f}')
+        report(f'        plan without index: {" | ".join(scan_plan.splitlines())}')
+        report(f'        plan with index: {" | ".join(index_plan.splitlines())}')
+
+
+@benchmark('prices_wire')
+def prices_wire_benchmark(report=print, days=30, repeat=5):
+    """
+    Payload size and encode time of one currency month prices in every format of the month-prices API.
+    """
+    import gzip
+
+    from rest_framework.renderers import JSONRenderer
+
+    from trading.application.renderers import ColumnarJSONRenderer, PackedPricesRenderer, orjson
+
+    rows = _synthetic_price_rows(['BTC'], days=int(days))
+    columns = {
+        'i': [row['instant'] for row in rows],
+        's': [row['sell_price'] for row in rows],
+        'b': [row['buy_price'] for row in rows],
+    }
+    objects = [{'i': row['instant'], 's': row['sell_price'], 'b': row['buy_price']} for row in rows]
+    formats = [
+        ('json (current)', lambda: JSONRenderer().render(objects)),
+        ('json + gzip', lambda: gzip.compress(JSONRenderer().render(objects), compresslevel=6)),
+        (f'columnar ({"orjson" if orjson is not None else "json"})', lambda: ColumnarJSONRenderer().render(columns)),
+        ('columnar + gzip', lambda: gzip.compress(ColumnarJSONRenderer().render(columns), compresslevel=6)),
+        ('packed', lambda: PackedPricesRenderer().render(columns)),
+        ('packed + gzip', lambda: gzip.compress(PackedPricesRenderer().render(columns), compresslevel=6)),
+    ]
+    report(f'{len(rows)} samples')
+    report(f'{"format":>20} {"bytes":>9} {"ratio":>6} {"encode (ms)":>12}')
+    reference_size = None
+    for name, encode in formats:
+        size = len(encode())
+        reference_size = reference_size or size
+        encode_time = _best_time(encode, repeat=int(repeat))
+        report(f'{name:>20} {size:>9} {size / reference_size:>6.2f} {encode_time * 1000:>12.2f}')
+
+
+@benchmark('trading_tick')
+def trading_tick_benchmark(report=print, symbols='10,40', packages=5, repeat=3):
+    """
+    Commits and wall time of the writes of a purchase and a sell tick over `symbols` currencies holding
+    `packages` packages each, writing every package and system log as it happens (autocommit, as before)
+    against buffering them in a UnitOfWork flushed in one transaction.
+    Prices come from an in-memory source whose conversions do nothing. Packages and system logs are written
+    to a throwaway SQLite file, not to the configured database, see _throwaway_database.
+    """
+    from shared.application.models import DSystemLog
+    from shared.domain.system_logs import add_system_log
+    from trading.application.django_models import DPackage
+    from trading.domain.context import TradingContext
+    from trading.domain.entities import Cryptocurrency, Package
+    from trading.domain.interfaces import ICryptoCurrencySource
+    from trading.domain.services import _purchase, _sell
+    from trading.domain.unit_of_work import UnitOfWork
+    from trading.infrastructure.django_storage import DjangoLocalStorage
+
+    class InMemorySource(ICryptoCurrencySource):
+        def __init__(self, series):
+            super().__init__()
+            self.series = series
+
+        def get_trading_cryptocurrencies(self):
+            return [Cryptocurrency(symbol=symbol, metadata={}) for symbol in self.series.keys()]
+
+        def get_stable_cryptocurrency(self):
+            return Cryptocurrency(symbol='DAI', metadata={})
+
+        def get_amount_owned(self, cryptocurrency):
+            return 1000.0
+
+        def get_last_month_prices(self, cryptocurrency):
+            return self.series[cryptocurrency.symbol]
+
+        def start_conversions(self):
+            pass
+
+        def finish_conversions(self):
+            pass
+
+        def convert(self, source_cryptocurrency, source_amount, target_cryptocurrency):
+            pass
+
+    class DirectWrites(UnitOfWork):
+        # writes go straight to the storage, one package at a time, as the ticks did before
+        def save_package(self, package):
+            self.storage.save_package(package)
+
+        def delete_package(self, package):
+            self.storage.delete_package(package)
+
+        def add_system_log(self, log_type, text):
+            add_system_log(log_type, text)
+
+    class CommitCounter:
+        def __init__(self):
+            self.commits = 0
+            self._pending = False
+
+        def __call__(self, execute, sql, params, many, context):
+            if not sql.lstrip().upper().startswith(('SELECT', 'BEGIN')):
+                if not connection.in_atomic_block:
+                    self.commits += 1
+                elif not self._pending:
+                    self._pending = True
+                    transaction.on_commit(self._committed)
+            return execute(sql, params, many, context)
+
+        def _committed(self):
+            self.commits += 1
+            self._pending = False
+
+    with _throwaway_database(InMemorySource({})):
+        now = pytz.utc.localize(datetime.utcnow())
+        storage = DjangoLocalStorage()
+        configurations = {'enable_trading': {'activated': True}}
+
+        def clean():
+            DPackage.objects.filter(currency_symbol__startswith='BENCH').delete()
+            storage.refresh_position_summaries()
+            DSystemLog.objects.filter(log_type__in=['BUY', 'SELL'], text__regex=r'^(BUY|SELL) BENCH[0-9]+ ').delete()
+
+        def run_tick(tick, series, writes_class, setup):
+            best_time, commits = None, None
+            for _ in range(int(repeat)):
+                clean()
+                setup()
+                context = TradingContext(InMemorySource(series), storage, now=now, configurations=configurations)
+                # reads are done before measuring, only the writes of the tick are compared
+                _ = context.matrix, context.positions, context.packages
+                counter = CommitCounter()
+                start = time.perf_counter()
+                with connection.execute_wrapper(counter):
+                    with writes_class(storage) as unit_of_work:
+                        tick(context, unit_of_work)
+                elapsed = time.perf_counter() - start
+                if best_time is None or elapsed < best_time:
+                    best_time, commits = elapsed, counter.commits
+            return best_time, commits
+
+        report(f'{"tick":>9} {"symbols":>8} {"commits before":>15} {"commits after":>14} {"before (ms)":>12} '
+               f'{"after (ms)":>11} {"speedup":>8}')
+        try:
+            for n_symbols in [int(n) for n in str(symbols).split(',')]:
+                # every price falls 2% a day, so every currency is a purchase candidate and has sellable packages
+                instants = now.timestamp() - np.arange(30 * 288)[::-1] * 300.0
+                prices = 100.0 * np.exp(-0.02 * (instants - instants[0]) / 86400)
+                series = {f'BENCH{n}': PriceSeries(symbol=f'BENCH{n}', instants=instants, sell_prices=prices,
+                                                   buy_prices=prices * 1.005) for n in range(n_symbols)}
+
+                def with_packages():
+                    storage.save_packages([Package(currency_symbol=symbol, currency_amount=10.0,
+                                                   bought_at_price=float(prices[-1]) / 1.5,
+                                                   operation_datetime=now - timedelta(days=10))
+                                           for symbol in series.keys() for _ in range(int(packages))])
+
+                for name, tick, setup in [('purchase', _purchase, lambda: None), ('sell', _sell, with_packages)]:
+                    before_time, before_commits = run_tick(tick, series, DirectWrites, setup)
+                    after_time, after_commits = run_tick(tick, series, UnitOfWork, setup)
+                    report(f'{name:>9} {n_symbols:>8} {before_commits:>15} {after_commits:>14} '
+                           f'{before_time * 1000:>12.2f} {after_time * 1000:>11.2f} {before_time / after_time:>7.1f}x')
+        finally:
+            clean()
+
+
+@benchmark('rolling_windows')
+def rolling_windows_benchmark(report=print, days=30, symbols='40,100', repeat=3):
+    """
+    Cost of the 4d, 7d and 30d windows of every currency on a tick, with the month prices already in memory:
+    profits only with a PriceMatrix, profit, mean, variance, min and max recomputed from the window prices,
+    and appending the new sample to RollingStats and reading their windows (which give all of them).
+    `build` is the one-off cost of the rolling windows of the month.
+    """
+    from trading.domain.tools.rolling import RollingStats
+
+    windows = [timedelta(days=4), timedelta(days=7), timedelta(days=30)]
+    now = pytz.utc.localize(datetime.utcnow())
+    report(f'{"symbols":>8} {"build (ms)":>11} {"matrix tick (ms)":>17} {"scratch tick (ms)":>18} '
+           f'{"rolling tick (ms)":>18}')
+    for n_symbols in [int(n) for n in str(symbols).split(',')]:
+        rows = _synthetic_price_rows([f'BENCH{n}' for n in range(n_symbols)], days=int(days), now=now)
+        grouped = defaultdict(list)
+        for row in rows:
+            grouped[row['symbol']].append(row)
+        series_list = [PriceSeries(
+            symbol=symbol,
+            instants=np.array([row['instant'] for row in symbol_rows]),
+            sell_prices=np.array([row['sell_price'] for row in symbol_rows]),
+            buy_prices=np.array([row['buy_price'] for row in symbol_rows]),
+        ) for symbol, symbol_rows in grouped.items()]
+
+        start = time.perf_counter()
+        states = []
+        for series in series_list:
+            stats = RollingStats(series.symbol, windows=windows)
+            stats.update(series[:-1])
+            states.append(stats.to_state())
+        build_time = time.perf_counter() - start
+
+        def matrix_tick():
+            matrix = PriceMatrix.from_series(series_list, (now - timedelta(days=30)).timestamp(), now.timestamp())
+            matrix.window_profits(windows, now=now)
+
+        def scratch_tick():
+            for series in series_list:
+                for td in windows:
+                    prices = series.between(start_ts=(now - td).timestamp(), end_ts=now.timestamp()).sell_prices
+                    prices.mean(), prices.var(ddof=1), prices.min(), prices.max()
+                    profit_difference_percentage(prices[0], prices[-1])
+
+        matrix_time = _best_time(matrix_tick, repeat=int(repeat))
+        scratch_time = _best_time(scratch_tick, repeat=int(repeat))
+        rolling_time = None
+        for _ in range(int(repeat)):
+            # windows as saved before the last sample arrived, then it is appended and every window read
+            rolling_stats = [RollingStats.from_state(state) for state in states]
+            start = time.perf_counter()
+            for stats, series in zip(rolling_stats, series_list):
+                stats.update(series)
+                for td in windows:
+                    stats.get_stats(td)
+            elapsed = time.perf_counter() - start
+            rolling_time = elapsed if rolling_time is None else min(rolling_time, elapsed)
+        report(f'{n_symbols:>8} {build_time * 1000:>11.1f} {matrix_time * 1000:>17.2f} {scratch_time * 1000:>18.2f} '
+               f'{rolling_time * 1000:>18.2f}')
+
+
+@benchmark('sliding_quantiles')
+def sliding_quantiles_benchmark(report=print, days=30, ticks=100, repeat=3):
+    """
+    Median and stdev of the month buy prices of a currency on every tick, over `ticks` ticks of 5 minutes:
+    recomputed with statistics.median and statistics.stdev over the month, as before, against appending the
+    new price to a SlidingWindowStats and expiring the oldest one.
+    """
+    import statistics
+    from trading.domain.tools.stats import SlidingWindowStats
+
+    now = pytz.utc.localize(datetime.utcnow())
+    rows = _synthetic_price_rows(['BENCH'], days=int(days), now=now)
+    prices = [row['buy_price'] for row in rows]
+    instants = [row['instant'] for row in rows]
+    ticks = int(ticks)
+    first_tick = len(prices) - ticks
+    month = timedelta(days=int(days)).total_seconds() - ticks * 300
+
+    def scratch_ticks():
+        start = 0
+        for end in range(first_tick, len(prices)):
+            while instants[start] < instants[end] - month:
+                start += 1
+            window = prices[start:end + 1]
+            statistics.median(window), statistics.stdev(window)
+
+    scratch_time = _best_time(scratch_ticks, repeat=int(repeat))
+    sliding_time = None
+    for _ in range(int(repeat)):
+        # the window as it was before the first tick, then every tick appends its price and reads the window
+        window = SlidingWindowStats()
+        for instant, price in zip(instants[:first_tick], prices[:first_tick]):
+            window.append(price, key=instant)
+        start = time.perf_counter()
+        for position in range(first_tick, len(prices)):
+            window.append(prices[position], key=instants[position])
+            window.expire(instants[position] - month)
+            window.median(), window.stdev()
+        elapsed = time.perf_counter() - start
+        sliding_time = elapsed if sliding_time is None else min(sliding_time, elapsed)
+    report(f'{len(prices)} prices, {ticks} ticks')
+    report(f'statistics per tick: {scratch_time / ticks * 1000:.3f} ms')
+    report(f'sliding window per tick: {sliding_time / ticks * 1000:.3f} ms')
+
+
+@benchmark('parameter_sweep')
+def parameter_sweep_benchmark(report=print, symbols=20, days=14, sets=8, workers='1,2,4'):
+    """
+    Throughput of a strategy parameter sweep over `days` days of synthetic prices of `symbols` currencies
+    (plus the month before) with 1, 2, 4... worker processes sharing the price matrix. Scaling is bounded
+    by the cores available.
+    """
+    import os
+    from trading.domain.backtesting import Backtest
+    from trading.domain.sweep import random_parameters, run_sweep
+
+    now = pytz.utc.localize(datetime.utcnow()).replace(minute=0, second=0, microsecond=0)
+    since = now - timedelta(days=int(days))
+    series = generate_market(int(symbols), days=int(days) + 30, start=since - timedelta(days=30), seed=1).to_series()
+    parameter_sets = random_parameters({'sell_profit': (10, 30), 'sell_market_profit': (-10, -2),
+                                        'purchase_currencies': (3, 10)}, int(sets), seed=1)
+
+    report(f'{os.cpu_count()} cores, {len(parameter_sets)} parameter sets')
+    report(f'{"workers":>8} {"time (s)":>9} {"sets/s":>8} {"speedup":>8}')
+    single = None
+    for n_workers in [int(n) for n in str(workers).split(',')]:
+        start = time.perf_counter()
+        run_sweep(Backtest(series), since, now, parameter_sets, workers=n_workers)
+        elapsed = time.perf_counter() - start
+        single = single or elapsed
+        report(f'{n_workers:>8} {elapsed:>9.2f} {len(parameter_sets) / elapsed:>8.2f} {single / elapsed:>8.2f}')
+
+
+@benchmark('synthetic_market')
+def synthetic_market_benchmark(report=print, symbols=100, days=365, repeat=3):
+    """
+    Generation of `days` days of 5 minute prices of `symbols` currencies as arrays, against building a
+    CryptocurrencyPrice per sample as generate_currency_prices does.
+    """
+    symbols, days = int(symbols), float(days)
+    market_time = _best_time(lambda: generate_market(symbols, days=days, seed=1), repeat=int(repeat))
+    samples = symbols * int(days * 288)
+
+    phases = [{'timedelta': timedelta(days=days), 'start_price': 100.0, 'end_price': 150.0}]
+    entities_time = _best_time(lambda: generate_currency_prices(phases, seed=1), repeat=int(repeat))
+    entity_samples = int(days * 288)
+
+    report(f'{samples} samples of {symbols} currencies')
+    report(f'market arrays: {market_time:.3f} s ({samples / market_time / 1e6:.1f} M samples/s)')
+    report(f'price entities: {entities_time * symbols:.3f} s estimated '
+           f'({entity_samples / entities_time / 1e6:.2f} M samples/s)')
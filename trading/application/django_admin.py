@@ -1,7 +1,29 @@
 from django.contrib import admin
 
-from trading.application.django_models import DPackage, DCryptocurrencyPrice
+from trading.application.django_models import DPackage, DCryptocurrencyPrice, DPriceRollup, DPositionSummary
+from trading.infrastructure.django_storage import DjangoLocalStorage
 
 
-admin.site.register(DPackage)
+class DPackageAdmin(admin.ModelAdmin):
+    # packages edited by hand keep their currency position summaries up to date
+    def save_model(self, request, obj, form, change):
+        symbols = {obj.currency_symbol}
+        if change and obj.pk is not None:
+            symbols.update(DPackage.objects.filter(pk=obj.pk).values_list('currency_symbol', flat=True))
+        super().save_model(request, obj, form, change)
+        DjangoLocalStorage().refresh_position_summaries(symbols)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        DjangoLocalStorage().refresh_position_summaries([obj.currency_symbol])
+
+    def delete_queryset(self, request, queryset):
+        symbols = set(queryset.values_list('currency_symbol', flat=True))
+        super().delete_queryset(request, queryset)
+        DjangoLocalStorage().refresh_position_summaries(symbols)
+
+
+admin.site.register(DPackage, DPackageAdmin)
 admin.site.register(DCryptocurrencyPrice)
+admin.site.register(DPriceRollup)
+admin.site.register(DPositionSummary)
@@ -1,5 +1,5 @@
 from django.db import models
-from trading.domain.entities import Package
+from trading.domain.entities import Package, PositionSummary, PriceRollup
 
 
 class DPackage(models.Model):
@@ -27,6 +27,44 @@ class DPackage(models.Model):
     class Meta:
         verbose_name = 'Package'
         verbose_name_plural = 'Packages'
+        indexes = [
+            models.Index(fields=['currency_symbol'], name='package_currency_symbol_idx'),
+        ]
+
+
+class DPositionSummary(models.Model):
+    currency_symbol = models.CharField(max_length=10, unique=True)
+    packages = models.IntegerField(default=0)
+    total_amount = models.FloatField(default=0.0)
+    cost_basis = models.FloatField(default=0.0)
+    oldest_datetime = models.DateTimeField(blank=True, null=True)
+    youngest_datetime = models.DateTimeField(blank=True, null=True)
+    min_bought_price = models.FloatField(blank=True, null=True)
+    max_bought_price = models.FloatField(blank=True, null=True)
+
+    @property
+    def core_entity(self):
+        return PositionSummary(
+            currency_symbol=self.currency_symbol,
+            packages=self.packages,
+            total_amount=self.total_amount,
+            cost_basis=self.cost_basis,
+            oldest_datetime=self.oldest_datetime,
+            youngest_datetime=self.youngest_datetime,
+            min_bought_price=self.min_bought_price,
+            max_bought_price=self.max_bought_price,
+        )
+
+    def __str__(self):
+        return self.core_entity.__str__()
+
+    def __repr__(self):
+        return self.__str__()
+
+    class Meta:
+        verbose_name = 'PositionSummary'
+        verbose_name_plural = 'PositionSummaries'
+        ordering = ('currency_symbol',)
 
 
 class DCryptocurrencyPrice(models.Model):
@@ -45,3 +83,50 @@ class DCryptocurrencyPrice(models.Model):
         verbose_name = 'CryptocurrencyPrice'
         verbose_name_plural = 'CryptocurrencyPrices'
         ordering = ('instant',)
+        indexes = [
+            models.Index(fields=['symbol', 'instant'], name='price_symbol_instant_idx'),
+        ]
+
+
+class DPriceRollup(models.Model):
+    symbol = models.CharField(max_length=10)
+    resolution = models.IntegerField()
+    instant = models.DateTimeField()
+    open_price = models.FloatField()
+    high_price = models.FloatField()
+    low_price = models.FloatField()
+    close_price = models.FloatField()
+    mean_price = models.FloatField()
+    samples = models.IntegerField(default=0)
+    first_instant = models.DateTimeField()
+    last_instant = models.DateTimeField()
+
+    @property
+    def core_entity(self):
+        return PriceRollup(
+            symbol=self.symbol,
+            resolution=self.resolution,
+            instant=self.instant,
+            open_price=self.open_price,
+            high_price=self.high_price,
+            low_price=self.low_price,
+            close_price=self.close_price,
+            mean_price=self.mean_price,
+            samples=self.samples,
+            first_instant=self.first_instant,
+            last_instant=self.last_instant,
+        )
+
+    def __str__(self):
+        return self.core_entity.__str__()
+
+    def __repr__(self):
+        return self.__str__()
+
+    class Meta:
+        verbose_name = 'PriceRollup'
+        verbose_name_plural = 'PriceRollups'
+        ordering = ('instant',)
+        constraints = [
+            models.UniqueConstraint(fields=['symbol', 'resolution', 'instant'], name='price_rollup_bucket_unique'),
+        ]
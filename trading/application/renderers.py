@@ -0,0 +1,84 @@
+import gzip
+import json
+
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import BaseRenderer
+
+from trading.domain.tools.wire import pack_prices, to_columns
+
+try:
+    import orjson
+except ImportError:
+    # optional, columnar JSON falls back to the standard json module
+    orjson = None
+
+
+def accepts_gzip(request) -> bool:
+    """
+    Whether the Accept-Encoding header of the request allows gzip, listed or covered by '*' with a non zero q.
+    """
+    qualities = {}
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    return qualities.get('gzip', qualities.get('x-gzip', qualities.get('*', 0.0))) > 0
+
+
+class PriceColumnsRenderer(BaseRenderer):
+    """
+    Base of the compact price renderers. Views hand them {'i': epoch instants, 's': sell prices, 'b': buy prices}
+    instead of one object per sample, see `columnar`. Anything else (errors) is rendered as plain JSON.
+    Payloads are gzipped when the client accepts it.
+    """
+    columnar = True
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not isinstance(data, dict) or 'i' not in data:
+            # errors, as {'detail': ...}
+            return json.dumps(data).encode()
+        content = self.encode(data)
+        renderer_context = renderer_context or {}
+        request = renderer_context.get('request')
+        response = renderer_context.get('response')
+        if request is not None and response is not None:
+            patch_vary_headers(response, ('Accept-Encoding',))
+            if accepts_gzip(request):
+                response['Content-Encoding'] = 'gzip'
+                content = gzip.compress(content, compresslevel=6)
+        return content
+
+    def encode(self, data) -> bytes:
+        raise NotImplementedError
+
+
+class ColumnarJSONRenderer(PriceColumnsRenderer):
+    media_type = 'application/vnd.robobroker.columnar+json'
+    format = 'columnar'
+
+    def encode(self, data) -> bytes:
+        columns = to_columns(data['i'], data['s'], data['b'])
+        if orjson is not None:
+            return orjson.dumps(columns)
+        return json.dumps(columns, separators=(',', ':')).encode()
+
+
+class PackedPricesRenderer(PriceColumnsRenderer):
+    media_type = 'application/vnd.robobroker.packed-prices'
+    format = 'packed'
+
+    def encode(self, data) -> bytes:
+        return pack_prices(data['i'], data['s'], data['b'])
@@ -0,0 +1,209 @@
+import math
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from shared.domain.dependencies import dependency_dispatcher
+from trading.domain.context import MARKET_WINDOW, TradingContext
+from trading.domain.entities import Trade
+from trading.domain.interfaces import ILocalStorage, IPriceStore
+from trading.domain.strategy import StrategyConfig
+from trading.domain.tools.market import PriceMatrix
+from trading.domain.tools.prices import PriceSeries
+from trading.domain.unit_of_work import UnitOfWork
+
+# configurations of every simulated tick, trading is always enabled
+BACKTEST_CONFIGURATIONS = {
+    'enable_trading': {'activated': True},
+}
+
+
+class BacktestUnitOfWork(UnitOfWork):
+    """
+    Unit of work of a simulated tick: packages are flushed to the in-memory storage and system logs are
+    appended to `system_logs` as (instant, log type, text). Nothing reaches the database.
+    """
+    def __init__(self, storage: ILocalStorage, system_logs: List[Tuple[datetime, str, str]], now: datetime):
+        super().__init__(storage)
+        self.system_logs = system_logs
+        self.now = now
+
+    def commit(self):
+        if self.pending == 0:
+            return
+        self.storage.delete_packages(self._deleted_packages)
+        self.storage.save_packages(self._saved_packages)
+        self.system_logs.extend((self.now, log_type, text) for log_type, text in self._system_logs)
+        self.rollback()
+
+
+class BacktestResult:
+    """
+    Equity of every tick in the stable currency, the trades filled and the system logs written by the strategy.
+    """
+    def __init__(self, instants: np.ndarray, equity: np.ndarray, trades: List[Trade],
+                 system_logs: List[Tuple[datetime, str, str]], stable_symbol: str, initial_amount: float,
+                 step: timedelta, elapsed: float):
+        self.instants = instants
+        self.equity = equity
+        self.trades = trades
+        self.system_logs = system_logs
+        self.stable_symbol = stable_symbol
+        self.initial_amount = initial_amount
+        self.step = step
+        self.elapsed = elapsed
+
+    @property
+    def buys(self) -> List[Trade]:
+        return [trade for trade in self.trades if trade.source_symbol == self.stable_symbol]
+
+    @property
+    def sells(self) -> List[Trade]:
+        return [trade for trade in self.trades if trade.target_symbol == self.stable_symbol]
+
+    def summary(self) -> Dict[str, float]:
+        """
+        Final equity, total return, maximum drawdown, annualized volatility and Sharpe ratio of the tick
+        returns (no risk free rate), trades, fees paid and simulated ticks per second.
+        """
+        final_equity = float(self.equity[-1]) if len(self.equity) > 0 else self.initial_amount
+        volatility = sharpe = max_drawdown = 0.0
+        if len(self.equity) > 1:
+            running_max = np.maximum.accumulate(self.equity)
+            max_drawdown = float(((running_max - self.equity) / running_max).max() * 100)
+            returns = np.diff(self.equity) / self.equity[:-1]
+            periods_per_year = timedelta(days=365) / self.step
+            if returns.std() > 0:
+                volatility = float(returns.std() * math.sqrt(periods_per_year) * 100)
+                sharpe = float(returns.mean() / returns.std() * math.sqrt(periods_per_year))
+        return {
+            'initial_equity': self.initial_amount,
+            'final_equity': final_equity,
+            'total_return': (final_equity - self.initial_amount) / self.initial_amount * 100,
+            'max_drawdown': max_drawdown,
+            'volatility': volatility,
+            'sharpe': sharpe,
+            'trades': len(self.trades),
+            'buys': len(self.buys),
+            'sells': len(self.sells),
+            'fees': sum(trade.fee for trade in self.trades),
+            'ticks': len(self.equity),
+            'ticks_per_second': len(self.equity) / self.elapsed if self.elapsed > 0 else 0.0,
+        }
+
+
+class Backtest:
+    """
+    Replays price history through the trading strategy (services._sell and services._purchase) with a
+    simulated source and an in-memory storage. Every `step` from `since` to `until` is a tick running a
+    sell, as the sell task does every minute; ticks at a multiple of `purchase_every` run a purchase after it,
+    as the purchase task does every hour. Contexts of every tick read prices from a PriceMatrix of the whole
+    history, loaded once, which starts a month before `since` so the first ticks see full windows.
+    `strategy` gives the thresholds of the strategy, the defaults ones otherwise.
+
+        result = Backtest(load_price_series(since - MARKET_WINDOW, until)).run(since, until)
+        result.summary()
+    """
+    def __init__(self, series: List[PriceSeries], stable_symbol='DAI', initial_amount=1000.0, fee=None,
+                 slippage=0.0, step=timedelta(minutes=5), purchase_every=timedelta(hours=1),
+                 strategy: Optional[StrategyConfig] = None):
+        self.series = series
+        self.stable_symbol = stable_symbol
+        self.initial_amount = initial_amount
+        self.fee = fee
+        self.slippage = slippage
+        self.step = step
+        self.purchase_every = purchase_every
+        self.strategy = strategy or StrategyConfig()
+
+    def get_matrix(self, since: datetime, until: datetime) -> PriceMatrix:
+        return PriceMatrix.from_series(self.series, (since - MARKET_WINDOW).timestamp(), until.timestamp(),
+                                       contiguous=True)
+
+    def run(self, since: datetime, until: datetime, matrix: Optional[PriceMatrix] = None) -> BacktestResult:
+        """
+        Replays the ticks from `since` to `until`. A `matrix` given, covering the month before `since` to
+        `until`, is read instead of building one from the series.
+        """
+        from trading.domain.services import _purchase, _sell
+        from trading.infrastructure.simulation import DEFAULT_FEE, InMemoryLocalStorage, \
+            SimulatedCryptoCurrencySource
+
+        source = SimulatedCryptoCurrencySource(
+            matrix if matrix is not None else self.get_matrix(since, until), stable_symbol=self.stable_symbol,
+            balances={self.stable_symbol: self.initial_amount},
+            fee=DEFAULT_FEE if self.fee is None else self.fee, slippage=self.slippage,
+        )
+        storage = InMemoryLocalStorage()
+        system_logs = []
+
+        ticks = int((until - since) / self.step) + 1
+        instants = np.empty(ticks)
+        equity = np.empty(ticks)
+        purchase_seconds = int(self.purchase_every.total_seconds())
+        step_seconds = self.step.total_seconds()
+        start = time.perf_counter()
+        for tick in range(ticks):
+            now = since + self.step * tick
+            source.set_now(now)
+            self._run_strategy(_sell, source, storage, system_logs, now)
+            if now.timestamp() % purchase_seconds < step_seconds:
+                self._run_strategy(_purchase, source, storage, system_logs, now)
+            instants[tick] = now.timestamp()
+            equity[tick] = source.get_equity()
+        elapsed = time.perf_counter() - start
+
+        return BacktestResult(instants, equity, source.trades, system_logs, self.stable_symbol,
+                              self.initial_amount, self.step, elapsed)
+
+    def _run_strategy(self, strategy, source, storage, system_logs, now):
+        context = TradingContext(source, storage, now=now, configurations=BACKTEST_CONFIGURATIONS,
+                                 matrix=source.matrix, strategy=self.strategy)
+        with BacktestUnitOfWork(storage, system_logs, now) as unit_of_work:
+            strategy(context, unit_of_work)
+
+
+def load_price_series(since: datetime, until: datetime, symbols: Optional[List[str]] = None) -> List[PriceSeries]:
+    """
+    Price series of the given symbols (every stored one by default) between since and until, read from
+    the price store when it holds prices and from the database otherwise. Samples without both prices
+    are left out.
+    """
+    price_store: IPriceStore = dependency_dispatcher.request_implementation(IPriceStore)
+    if price_store is not None and len(price_store.get_symbols()) > 0:
+        series_list = [price_store.get_series(symbol, since=since).between(end_ts=until.timestamp())
+                       for symbol in (symbols or price_store.get_symbols())]
+    else:
+        series_list = _load_database_series(since, until, symbols)
+
+    complete = []
+    for series in series_list:
+        sampled = ~(np.isnan(series.sell_prices) | np.isnan(series.buy_prices))
+        if not sampled.all():
+            series = PriceSeries(symbol=series.symbol, instants=series.instants[sampled],
+                                 sell_prices=series.sell_prices[sampled], buy_prices=series.buy_prices[sampled])
+        if len(series) > 0:
+            complete.append(series)
+    return complete
+
+
+def _load_database_series(since, until, symbols=None) -> List[PriceSeries]:
+    from trading.application.django_models import DCryptocurrencyPrice
+
+    rows = DCryptocurrencyPrice.objects.filter(instant__gte=since, instant__lte=until)
+    if symbols:
+        rows = rows.filter(symbol__in=symbols)
+    grouped = defaultdict(lambda: ([], [], []))
+    for symbol, instant, sell_price, buy_price in rows.order_by('symbol', 'instant').values_list(
+            'symbol', 'instant', 'sell_price', 'buy_price').iterator():
+        instants, sell_prices, buy_prices = grouped[symbol]
+        instants.append(instant.timestamp())
+        sell_prices.append(sell_price)
+        buy_prices.append(buy_price)
+    return [PriceSeries(symbol=symbol, instants=np.array(instants, dtype=np.float64),
+                        sell_prices=np.array(sell_prices, dtype=np.float64),
+                        buy_prices=np.array(buy_prices, dtype=np.float64))
+            for symbol, (instants, sell_prices, buy_prices) in grouped.items()]
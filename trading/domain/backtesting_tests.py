@@ -0,0 +1,96 @@
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytz
+
+from trading.domain.backtesting import Backtest
+from trading.domain.entities import Cryptocurrency, Package
+from trading.domain.tools.prices import PriceSeries
+from trading.infrastructure.simulation import InMemoryLocalStorage, SimulatedCryptoCurrencySource
+
+
+def _series(symbol, start, days_prices):
+    """
+    Series sampled every 5 minutes, linear between the given (day, price) points.
+    """
+    days, prices = zip(*days_prices)
+    instants = start.timestamp() + np.arange(0, days[-1] * 288 + 1) * 300.0
+    sell_prices = np.interp(instants, [start.timestamp() + day * 86400 for day in days], prices)
+    return PriceSeries(symbol=symbol, instants=instants, sell_prices=sell_prices, buy_prices=sell_prices.copy())
+
+
+class BacktestTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.start = pytz.utc.localize(datetime(2021, 1, 1))
+        # falls for a month and two days, doubles in eight days and then loses 15% in four
+        self.series = [
+            _series('AAA', self.start, [(0, 100.0), (32, 50.0), (40, 100.0), (44, 85.0), (46, 85.0)]),
+            _series('BBB', self.start, [(0, 10.0), (46, 10.0)]),
+        ]
+
+    def test_simulated_source(self):
+        source = SimulatedCryptoCurrencySource.from_series(self.series, self.start, self.start + timedelta(days=46),
+                                                           balances={'DAI': 100.0}, fee=0.01)
+        source.set_now(self.start + timedelta(days=32))
+        dai, aaa = source.get_stable_cryptocurrency(), source.get_trading_cryptocurrency('AAA')
+        self.assertEqual([currency.symbol for currency in source.get_trading_cryptocurrencies()], ['AAA', 'BBB'])
+
+        trade = source.convert(dai, 50.0, aaa)
+        self.assertAlmostEqual(trade.target_amount, 0.99)
+        self.assertAlmostEqual(trade.fee, 0.5)
+        self.assertAlmostEqual(source.get_equity(), 99.5)
+
+        # sells what is owned at most
+        source.set_now(self.start + timedelta(days=40))
+        trade = source.convert(aaa, '10.00', dai)
+        self.assertEqual((trade.requested_amount, trade.source_amount), (10.0, 0.99))
+        self.assertAlmostEqual(source.get_amount_owned(dai), 50.0 + 99.0 * 0.99)
+        self.assertIsNone(source.convert(aaa, 1.0, dai))
+        self.assertEqual(len(source.trades), 2)
+
+        month = source.get_last_month_prices(aaa)
+        self.assertEqual((len(month), month[0].instant, month[-1].instant),
+                         (30 * 288 + 1, self.start + timedelta(days=10), self.start + timedelta(days=40)))
+        self.assertEqual(month.sell_prices.tolist(), self.series[0].between(
+            (self.start + timedelta(days=10)).timestamp(), (self.start + timedelta(days=40)).timestamp()
+        ).sell_prices.tolist())
+
+    def test_in_memory_storage(self):
+        storage = InMemoryLocalStorage()
+        packages = [Package(currency_symbol=symbol, currency_amount=amount, bought_at_price=price,
+                            operation_datetime=self.start + timedelta(days=day))
+                    for symbol, amount, price, day in [('AAA', 10.0, 50.0, 1), ('AAA', 5.0, 40.0, 2), ('BBB', 1, 9, 3)]]
+        storage.save_packages(packages)
+        self.assertEqual([package.id for package in packages], [1, 2, 3])
+        position = storage.get_position_summaries()['AAA']
+        self.assertEqual((position.packages, position.total_amount, position.cost_basis), (2, 15.0, 700.0))
+        self.assertEqual((position.min_bought_price, position.oldest_datetime), (40.0, packages[0].operation_datetime))
+
+        storage.delete_packages(packages[:2])
+        self.assertEqual(list(storage.get_position_summaries().keys()), ['BBB'])
+        self.assertEqual(storage.get_cryptocurrency_packages(Cryptocurrency(symbol='BBB')), packages[2:])
+
+    def test_replays_strategy(self):
+        since = self.start + timedelta(days=30)
+        result = Backtest(self.series, fee=0.0).run(since, self.start + timedelta(days=46))
+        self.assertEqual(len(result.equity), 16 * 288 + 1)
+        self.assertEqual(result.instants[0], since.timestamp())
+
+        # BBB never moves, AAA is bought every hour while its week is falling and sold once it went down 5%
+        # in 4 days, which gets its week falling again
+        self.assertEqual({trade.target_symbol for trade in result.buys}, {'AAA'})
+        self.assertEqual(len(result.buys), len([log for log in result.system_logs if log[1] == 'BUY']))
+        self.assertEqual(len(result.sells), 1)
+        sell = result.sells[0]
+        self.assertTrue(self.start + timedelta(days=40) < sell.instant <= self.start + timedelta(days=44))
+        bought_before = [trade for trade in result.buys if trade.instant < sell.instant]
+        bought_after = [trade for trade in result.buys if trade.instant > sell.instant]
+        self.assertTrue(all(trade.instant < self.start + timedelta(days=34) for trade in bought_before))
+        self.assertAlmostEqual(sell.source_amount, sum(trade.target_amount for trade in bought_before))
+
+        summary = result.summary()
+        self.assertAlmostEqual(summary['final_equity'], 1000.0 + sell.target_amount - sum(
+            trade.source_amount for trade in result.buys) + sum(trade.target_amount for trade in bought_after) * 85.0)
+        self.assertGreater(summary['total_return'], 0)
+        self.assertEqual((summary['trades'], summary['fees']), (len(result.buys) + 1, 0.0))
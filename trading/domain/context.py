@@ -0,0 +1,226 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pytz
+
+from shared.domain.configurations import server_get_many
+from trading.domain.entities import Cryptocurrency, Package, PositionSummary, WindowStats
+from trading.domain.interfaces import ICryptoCurrencySource, ILocalStorage, IRollingStats
+from trading.domain.strategy import StrategyConfig
+from trading.domain.tools.market import PriceMatrix
+from trading.domain.tools.prices import PriceSeries
+
+# configurations read by a trading tick and their defaults
+TRADING_CONFIGURATIONS = {
+    'enable_trading': {'activated': False},
+    'strategy': {},
+}
+
+MARKET_WINDOW = timedelta(days=30)
+
+# how old the newest sample of a currency can be for its rolling windows to stand for windows ending now
+SAMPLES_TOLERANCE = timedelta(minutes=10)
+
+
+class TradingContext:
+    """
+    Snapshot of everything a trading tick reads, built once per tick and passed to the strategy.
+    Configurations are loaded with a single query when the context is created. The currencies, the stable
+    currency, the position summaries and the packages of every currency, the month prices and their matrix
+    are loaded on first access; balances are loaded on first access of every currency. None of them is
+    reloaded afterwards, so the number of reads of a tick does not depend on how many times the strategy
+    asks for them.
+
+    When rolling window statistics are available, window profits, month samples and last sell prices are
+    read from them and the month prices are not loaded. Rolling windows are anchored at the newest sample,
+    so they are only used when every currency was sampled in the last SAMPLES_TOLERANCE or has no samples
+    in the window at all; otherwise the price matrix answers.
+
+    A preloaded `matrix` covering the month before `now` (it can cover much more, as in a backtest) is used
+    instead of loading the month prices from the trading source.
+
+    The strategy thresholds are the ones of the 'strategy' configuration, with StrategyConfig defaults for
+    the missing ones, unless a `strategy` is given.
+    """
+    def __init__(self, trading_source: ICryptoCurrencySource, storage: ILocalStorage, now: Optional[datetime] = None,
+                 configurations: Optional[Dict[str, dict]] = None, rolling_stats: Optional[IRollingStats] = None,
+                 matrix: Optional[PriceMatrix] = None, strategy: Optional[StrategyConfig] = None):
+        self.trading_source = trading_source
+        self.storage = storage
+        self.rolling_stats = rolling_stats
+        self.now = now or pytz.utc.localize(datetime.utcnow())
+        if configurations is None:
+            configurations = {key: configuration.data for key, configuration in
+                              server_get_many(list(TRADING_CONFIGURATIONS.keys()),
+                                              default_data=TRADING_CONFIGURATIONS).items()}
+        self.configurations = configurations
+        self._strategy = strategy
+        self._currencies = None
+        self._currencies_by_symbol = None
+        self._stable_currency = None
+        self._series = None
+        self._currency_series = {}
+        self._matrix = matrix
+        self._last_prices = {}
+        self._window_stats = {}
+        self._month_samples = None
+        self._balances = {}
+        self._packages = None
+        self._positions = None
+
+    def get_configuration(self, key: str) -> dict:
+        return self.configurations.get(key, TRADING_CONFIGURATIONS.get(key, {}))
+
+    @property
+    def trading_enabled(self) -> bool:
+        return bool(self.get_configuration('enable_trading').get('activated'))
+
+    @property
+    def strategy(self) -> StrategyConfig:
+        if self._strategy is None:
+            self._strategy = StrategyConfig.from_dict(self.get_configuration('strategy'))
+        return self._strategy
+
+    @property
+    def currencies(self) -> List[Cryptocurrency]:
+        if self._currencies is None:
+            self._currencies = self.trading_source.get_trading_cryptocurrencies()
+            self._currencies_by_symbol = {currency.symbol: currency for currency in self._currencies}
+        return self._currencies
+
+    def get_currency(self, symbol: str) -> Optional[Cryptocurrency]:
+        if self._currencies_by_symbol is None:
+            _ = self.currencies
+        return self._currencies_by_symbol.get(symbol)
+
+    @property
+    def stable_currency(self) -> Cryptocurrency:
+        if self._stable_currency is None:
+            self._stable_currency = self.trading_source.get_stable_cryptocurrency()
+        return self._stable_currency
+
+    def get_balance(self, currency: Cryptocurrency) -> float:
+        if currency.symbol not in self._balances:
+            self._balances[currency.symbol] = self.trading_source.get_amount_owned(currency)
+        return self._balances[currency.symbol]
+
+    @property
+    def packages(self) -> Dict[str, List[Package]]:
+        if self._packages is None:
+            self._packages = self.storage.get_all_packages_grouped()
+        return self._packages
+
+    def get_packages(self, currency: Cryptocurrency) -> List[Package]:
+        return self.packages.get(currency.symbol, [])
+
+    @property
+    def positions(self) -> Dict[str, PositionSummary]:
+        if self._positions is None:
+            self._positions = self.storage.get_position_summaries()
+        return self._positions
+
+    def get_position(self, currency: Cryptocurrency) -> PositionSummary:
+        return self.positions.get(currency.symbol) or PositionSummary(currency_symbol=currency.symbol)
+
+    @property
+    def series(self) -> Dict[str, PriceSeries]:
+        if self._series is None:
+            self._series = get_last_month_series(self.trading_source, self.currencies)
+        return self._series
+
+    @property
+    def matrix(self) -> PriceMatrix:
+        if self._matrix is None:
+            self._matrix = get_price_matrix(self.series, self.now)
+        return self._matrix
+
+    def get_window_stats(self, td: timedelta) -> Optional[Dict[str, WindowStats]]:
+        """
+        Rolling window statistics of every currency, None when they cannot stand for the window [now - td, now].
+        """
+        if td not in self._window_stats:
+            self._window_stats[td] = self._load_window_stats(td)
+        return self._window_stats[td]
+
+    def has_prices(self, currency: Cryptocurrency) -> bool:
+        """
+        Whether the currency has samples in the last month.
+        """
+        window_stats = self.get_window_stats(MARKET_WINDOW)
+        if window_stats is not None:
+            return self._in_window(window_stats.get(currency.symbol), MARKET_WINDOW)
+        if self._month_samples is None:
+            self._month_samples = self.matrix.count(MARKET_WINDOW, now=self.now)
+        row = self.matrix.index.get(currency.symbol)
+        return row is not None and self._month_samples[row] > 0
+
+    def window_profits(self, td: timedelta, price='sell') -> Dict[str, float]:
+        window_stats = self.get_window_stats(td) if price == 'sell' else None
+        if window_stats is not None:
+            return {currency.symbol: window_stats[currency.symbol].profit
+                    if self._in_window(window_stats.get(currency.symbol), td) else 0.0
+                    for currency in self.currencies}
+        profits = self.matrix.window_profits([td], now=self.now, price=price)[td]
+        return {symbol: float(profits[row]) for symbol, row in self.matrix.index.items()}
+
+    def get_last_price(self, currency: Cryptocurrency, price='sell') -> Optional[float]:
+        window_stats = self.get_window_stats(MARKET_WINDOW) if price == 'sell' else None
+        if window_stats is not None and currency.symbol in window_stats:
+            return window_stats[currency.symbol].last_price
+        if self._matrix is not None:
+            return self._get_matrix_last_price(currency, price)
+        prices = self._get_currency_series(currency)
+        if len(prices) == 0:
+            return None
+        last_price = (prices.sell_prices if price == 'sell' else prices.buy_prices)[-1]
+        return None if np.isnan(last_price) else float(last_price)
+
+    def _get_matrix_last_price(self, currency: Cryptocurrency, price) -> Optional[float]:
+        if price not in self._last_prices:
+            self._last_prices[price] = self._matrix.last_prices(self.now, price=price)
+        row = self._matrix.index.get(currency.symbol)
+        if row is None or np.isnan(self._last_prices[price][row]):
+            return None
+        return float(self._last_prices[price][row])
+
+    def _get_currency_series(self, currency: Cryptocurrency) -> PriceSeries:
+        if self._series is not None:
+            return self._series.get(currency.symbol, PriceSeries(symbol=currency.symbol))
+        if currency.symbol not in self._currency_series:
+            self._currency_series.update(get_last_month_series(self.trading_source, [currency]))
+        return self._currency_series[currency.symbol]
+
+    def _load_window_stats(self, td: timedelta) -> Optional[Dict[str, WindowStats]]:
+        if self.rolling_stats is None or td not in self.rolling_stats.windows:
+            return None
+        window_stats = self.rolling_stats.get_window_stats([currency.symbol for currency in self.currencies], td)
+        for currency in self.currencies:
+            stats = window_stats.get(currency.symbol)
+            if stats is None:
+                # prices of the currency could come from elsewhere
+                return None
+            if stats.last_instant > self.now:
+                return None
+            if self.now - td <= stats.last_instant < self.now - SAMPLES_TOLERANCE:
+                return None
+        return window_stats
+
+    def _in_window(self, stats: Optional[WindowStats], td: timedelta) -> bool:
+        return stats is not None and stats.samples > 0 and stats.last_instant >= self.now - td
+
+
+def get_last_month_series(trading_source: ICryptoCurrencySource,
+                          currencies: List[Cryptocurrency]) -> Dict[str, PriceSeries]:
+    series = {}
+    for currency in currencies:
+        prices: Sequence = trading_source.get_last_month_prices(currency)
+        if not isinstance(prices, PriceSeries):
+            prices = PriceSeries.from_prices(currency.symbol, prices)
+        series[currency.symbol] = prices
+    return series
+
+
+def get_price_matrix(series: Dict[str, PriceSeries], now: datetime, td: Optional[timedelta] = None) -> PriceMatrix:
+    td = td or MARKET_WINDOW
+    return PriceMatrix.from_series(list(series.values()), (now - td).timestamp(), now.timestamp())
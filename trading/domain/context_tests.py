@@ -0,0 +1,216 @@
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytz
+from django.test import TestCase
+
+from trading.domain.context import TradingContext
+from trading.domain.entities import Cryptocurrency, CryptocurrencyPrice, Package, PositionSummary
+from trading.domain.interfaces import ICryptoCurrencySource, ILocalStorage, IRollingStats
+from trading.domain.services import _purchase, _sell
+from trading.domain.tools.prices import PriceSeries
+from trading.domain.tools.rolling import RollingStats
+from trading.domain.unit_of_work import UnitOfWork
+
+
+class CountingSource(ICryptoCurrencySource):
+    def __init__(self, prices, amounts):
+        super().__init__()
+        self.prices = prices
+        self.amounts = amounts
+        self.calls = Counter()
+        self.conversions = []
+
+    def get_trading_cryptocurrencies(self):
+        self.calls['get_trading_cryptocurrencies'] += 1
+        return [Cryptocurrency(symbol=symbol, metadata={}) for symbol in self.prices.keys()]
+
+    def get_stable_cryptocurrency(self):
+        self.calls['get_stable_cryptocurrency'] += 1
+        return Cryptocurrency(symbol='DAI', metadata={})
+
+    def get_amount_owned(self, cryptocurrency):
+        self.calls['get_amount_owned'] += 1
+        return self.amounts.get(cryptocurrency.symbol, 0.0)
+
+    def get_last_month_prices(self, cryptocurrency):
+        self.calls['get_last_month_prices'] += 1
+        return self.prices[cryptocurrency.symbol]
+
+    def start_conversions(self):
+        pass
+
+    def finish_conversions(self):
+        pass
+
+    def convert(self, source_cryptocurrency, source_amount, target_cryptocurrency):
+        self.conversions.append((source_cryptocurrency.symbol, source_amount, target_cryptocurrency.symbol))
+
+
+class CountingStorage(ILocalStorage):
+    def __init__(self, packages):
+        self.packages = packages
+        self.calls = Counter()
+
+    def save_package(self, package):
+        self.calls['save_package'] += 1
+        self.packages.append(package)
+
+    def delete_package(self, package):
+        self.calls['delete_package'] += 1
+        self.packages.remove(package)
+
+    def get_cryptocurrency_packages(self, cryptocurrency):
+        self.calls['get_cryptocurrency_packages'] += 1
+        return [p for p in self.packages if p.currency_symbol == cryptocurrency.symbol]
+
+    def get_position_summaries(self):
+        self.calls['get_position_summaries'] += 1
+        positions = {}
+        for symbol, packages in self._group(self.packages).items():
+            positions[symbol] = PositionSummary(
+                currency_symbol=symbol,
+                packages=len(packages),
+                total_amount=sum(p.currency_amount for p in packages),
+                cost_basis=sum(p.currency_amount * p.bought_at_price for p in packages),
+                oldest_datetime=min(p.operation_datetime for p in packages),
+                youngest_datetime=max(p.operation_datetime for p in packages),
+                min_bought_price=min(p.bought_at_price for p in packages),
+                max_bought_price=max(p.bought_at_price for p in packages),
+            )
+        return positions
+
+    def get_all_packages_grouped(self):
+        self.calls['get_all_packages_grouped'] += 1
+        return self._group(self.packages)
+
+    def _group(self, packages):
+        grouped = {}
+        for package in packages:
+            grouped.setdefault(package.currency_symbol, []).append(package)
+        return grouped
+
+
+class SeriesRollingStats(IRollingStats):
+    def __init__(self, prices):
+        self.windows = [timedelta(days=4), timedelta(days=7), timedelta(days=30)]
+        self.stats = {}
+        for symbol, symbol_prices in prices.items():
+            self.stats[symbol] = RollingStats(symbol, windows=self.windows)
+            self.stats[symbol].update(PriceSeries.from_prices(symbol, symbol_prices))
+
+    def get_window_stats(self, symbols, td):
+        return {symbol: self.stats[symbol].get_stats(td) for symbol in symbols if symbol in self.stats}
+
+
+class TradingContextTests(TestCase):
+    def setUp(self) -> None:
+        self.now = pytz.utc.localize(datetime(2021, 2, 1))
+        self.prices = {}
+        for n, symbol in enumerate(['BTC', 'ETH', 'LTC', 'ADA', 'XLM']):
+            # every currency falls during the last days, the first ones more than the others
+            start_price, end_price = 100.0, 100.0 - 10.0 * (5 - n)
+            prices = []
+            for m in range(30 * 24):
+                price = start_price + (end_price - start_price) * m / (30 * 24 - 1)
+                prices.append(CryptocurrencyPrice(symbol=symbol, instant=self.now - timedelta(hours=30 * 24 - 1 - m),
+                                                  sell_price=price, buy_price=price * 1.01))
+            self.prices[symbol] = prices
+        self.configurations = {'enable_trading': {'activated': True}}
+
+    def test_loads_once(self):
+        source = CountingSource(self.prices, {'DAI': 100.0, 'BTC': 2.0})
+        storage = CountingStorage([])
+        context = TradingContext(source, storage, now=self.now, configurations=self.configurations)
+
+        self.assertTrue(context.trading_enabled)
+        for _ in range(3):
+            for currency in context.currencies:
+                self.assertTrue(context.has_prices(currency))
+                context.get_last_price(currency)
+                context.get_packages(currency)
+            context.get_balance(context.stable_currency)
+            context.get_balance(context.get_currency('BTC'))
+        self.assertIsNone(context.get_currency('DOGE'))
+        self.assertAlmostEqual(context.get_last_price(context.get_currency('BTC')), 50.0)
+        self.assertAlmostEqual(context.get_last_price(context.get_currency('BTC'), price='buy'), 50.5)
+
+        self.assertEqual(source.calls, Counter({
+            'get_trading_cryptocurrencies': 1,
+            'get_stable_cryptocurrency': 1,
+            'get_amount_owned': 2,
+            'get_last_month_prices': 5,
+        }))
+        self.assertEqual(storage.calls, Counter({'get_all_packages_grouped': 1}))
+
+    def test_purchase_and_sell(self):
+        source = CountingSource(self.prices, {'DAI': 100.0})
+        storage = CountingStorage([])
+        with UnitOfWork(storage) as unit_of_work:
+            _purchase(TradingContext(source, storage, now=self.now, configurations=self.configurations), unit_of_work)
+            self.assertEqual(storage.packages, [])
+
+        self.assertEqual(source.calls['get_stable_cryptocurrency'], 1)
+        self.assertEqual(source.calls['get_amount_owned'], 1)
+        self.assertEqual(source.conversions, [('DAI', 10, symbol) for symbol in ['BTC', 'ETH', 'LTC', 'ADA', 'XLM']])
+        self.assertEqual(len(storage.packages), 5)
+        self.assertEqual(storage.calls, Counter({'get_position_summaries': 1, 'save_package': 5}))
+
+        # packages are only loaded when a summary shows a sale is possible
+        source = CountingSource(self.prices, {})
+        storage = CountingStorage([Package(currency_symbol='BTC', currency_amount=5.0, bought_at_price=49.0,
+                                           operation_datetime=self.now - timedelta(days=1))])
+        with UnitOfWork(storage) as unit_of_work:
+            _sell(TradingContext(source, storage, now=self.now, configurations=self.configurations), unit_of_work)
+        self.assertEqual(source.conversions, [])
+        self.assertEqual(storage.calls, Counter({'get_position_summaries': 1}))
+
+        source = CountingSource(self.prices, {})
+        storage = CountingStorage([Package(id=1, currency_symbol='BTC', currency_amount=5.0, bought_at_price=30.0,
+                                           operation_datetime=self.now - timedelta(days=1)),
+                                   Package(id=2, currency_symbol='BTC', currency_amount=1.0, bought_at_price=45.0,
+                                           operation_datetime=self.now - timedelta(days=1))])
+        with UnitOfWork(storage) as unit_of_work:
+            _sell(TradingContext(source, storage, now=self.now, configurations=self.configurations), unit_of_work)
+
+        self.assertEqual(source.conversions, [('BTC', '5.00', 'DAI')])
+        self.assertEqual([p.bought_at_price for p in storage.packages], [45.0])
+        self.assertEqual(storage.calls, Counter({'get_position_summaries': 1, 'get_all_packages_grouped': 1,
+                                                 'delete_package': 1}))
+        self.assertEqual(source.calls['get_stable_cryptocurrency'], 1)
+
+    def test_strategy_configuration(self):
+        source = CountingSource(self.prices, {'DAI': 100.0})
+        storage = CountingStorage([])
+        configurations = {**self.configurations, 'strategy': {'purchase_currencies': 2, 'max_purchase_amount': 5}}
+        with UnitOfWork(storage) as unit_of_work:
+            _purchase(TradingContext(source, storage, now=self.now, configurations=configurations), unit_of_work)
+        self.assertEqual(source.conversions, [('DAI', 5.0, 'BTC'), ('DAI', 5.0, 'ETH')])
+        self.assertEqual([package.operation_datetime for package in storage.packages], [self.now, self.now])
+
+    def test_rolling_stats(self):
+        source = CountingSource(self.prices, {})
+        context = TradingContext(source, CountingStorage([]), now=self.now, configurations=self.configurations)
+        rolling_context = TradingContext(CountingSource(self.prices, {}), CountingStorage([]), now=self.now,
+                                         configurations=self.configurations,
+                                         rolling_stats=SeriesRollingStats(self.prices))
+        for td in [timedelta(days=4), timedelta(days=7)]:
+            profits = context.window_profits(td)
+            for symbol, profit in rolling_context.window_profits(td).items():
+                self.assertAlmostEqual(profit, profits[symbol])
+        for currency in rolling_context.currencies:
+            self.assertTrue(rolling_context.has_prices(currency))
+            self.assertAlmostEqual(rolling_context.get_last_price(currency), context.get_last_price(currency))
+        self.assertEqual(rolling_context.trading_source.calls['get_last_month_prices'], 0)
+
+        # buy prices are not in the rolling windows, only the series of the requested currency is loaded
+        rolling_context.get_last_price(rolling_context.get_currency('BTC'), price='buy')
+        self.assertEqual(rolling_context.trading_source.calls['get_last_month_prices'], 1)
+
+        # rolling windows ending long before now do not stand for windows ending now
+        late_context = TradingContext(CountingSource(self.prices, {}), CountingStorage([]),
+                                      now=self.now + timedelta(days=1), configurations=self.configurations,
+                                      rolling_stats=SeriesRollingStats(self.prices))
+        self.assertIsNone(late_context.get_window_stats(timedelta(days=4)))
+        late_context.window_profits(timedelta(days=4))
+        self.assertEqual(late_context.trading_source.calls['get_last_month_prices'], 5)
@@ -55,3 +55,150 @@ class Package:
 
     def __repr__(self):
         return self.__str__()
+
+
+class PriceRollup:
+    """
+    Aggregate of the sell prices of a symbol sampled in [instant, instant + resolution seconds).
+    """
+    symbol: str = None
+    resolution: int = None
+    instant: datetime = None
+    open_price: float = None
+    high_price: float = None
+    low_price: float = None
+    close_price: float = None
+    mean_price: float = None
+    samples: int = 0
+    first_instant: datetime = None
+    last_instant: datetime = None
+
+    def __init__(self, symbol=None, resolution=None, instant=None, open_price=None, high_price=None,
+                 low_price=None, close_price=None, mean_price=None, samples=0, first_instant=None,
+                 last_instant=None):
+        self.symbol = symbol
+        self.resolution = resolution
+        self.instant = instant
+        self.open_price = open_price
+        self.high_price = high_price
+        self.low_price = low_price
+        self.close_price = close_price
+        self.mean_price = mean_price
+        self.samples = samples
+        self.first_instant = first_instant
+        self.last_instant = last_instant
+
+    def __str__(self):
+        return f'{self.symbol} {self.instant} ({self.resolution}s) o: {self.open_price} h: {self.high_price} ' \
+               f'l: {self.low_price} c: {self.close_price}'
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class PositionSummary:
+    """
+    Aggregate of the packages of a currency: how many there are, the amount they hold and what it cost,
+    when the oldest and the youngest were bought and their lowest and highest bought prices.
+    """
+    currency_symbol: str = None
+    packages: int = 0
+    total_amount: float = 0.0
+    cost_basis: float = 0.0
+    oldest_datetime: datetime = None
+    youngest_datetime: datetime = None
+    min_bought_price: float = None
+    max_bought_price: float = None
+
+    def __init__(self, currency_symbol=None, packages=0, total_amount=0.0, cost_basis=0.0, oldest_datetime=None,
+                 youngest_datetime=None, min_bought_price=None, max_bought_price=None):
+        self.currency_symbol = currency_symbol
+        self.packages = packages
+        self.total_amount = total_amount
+        self.cost_basis = cost_basis
+        self.oldest_datetime = oldest_datetime
+        self.youngest_datetime = youngest_datetime
+        self.min_bought_price = min_bought_price
+        self.max_bought_price = max_bought_price
+
+    def __str__(self):
+        return f'{self.currency_symbol} {self.total_amount} ({self.packages} packages)'
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class WindowStats:
+    """
+    Statistics of the sell prices of a symbol sampled in the window [last_instant - window seconds, last_instant].
+    `profit` is the percentage between the first and the last price of the window.
+    """
+    symbol: str = None
+    window: int = None
+    samples: int = 0
+    first_instant: datetime = None
+    last_instant: datetime = None
+    first_price: float = None
+    last_price: float = None
+    mean: float = None
+    variance: float = None
+    min_price: float = None
+    max_price: float = None
+    profit: float = 0.0
+
+    def __init__(self, symbol=None, window=None, samples=0, first_instant=None, last_instant=None, first_price=None,
+                 last_price=None, mean=None, variance=None, min_price=None, max_price=None, profit=0.0):
+        self.symbol = symbol
+        self.window = window
+        self.samples = samples
+        self.first_instant = first_instant
+        self.last_instant = last_instant
+        self.first_price = first_price
+        self.last_price = last_price
+        self.mean = mean
+        self.variance = variance
+        self.min_price = min_price
+        self.max_price = max_price
+        self.profit = profit
+
+    def __str__(self):
+        return f'{self.symbol} ({self.window}s, {self.samples} samples) profit: {self.profit}% mean: {self.mean}'
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class Trade:
+    """
+    Conversion filled by a simulated source: `source_amount` of the source currency (what was asked,
+    limited to the balance) converted to `target_amount` of the target currency at the given prices, with
+    `fee` charged in the stable currency.
+    """
+    instant: datetime = None
+    source_symbol: str = None
+    target_symbol: str = None
+    requested_amount: float = None
+    source_amount: float = None
+    target_amount: float = None
+    source_price: float = None
+    target_price: float = None
+    fee: float = 0.0
+
+    def __init__(self, instant=None, source_symbol=None, target_symbol=None, requested_amount=None,
+                 source_amount=None, target_amount=None, source_price=None, target_price=None, fee=0.0):
+        self.instant = instant
+        self.source_symbol = source_symbol
+        self.target_symbol = target_symbol
+        self.requested_amount = requested_amount
+        self.source_amount = source_amount
+        self.target_amount = target_amount
+        self.source_price = source_price
+        self.target_price = target_price
+        self.fee = fee
+
+    def __str__(self):
+        return f'[{self.instant}] {self.source_amount} {self.source_symbol} -> ' \
+               f'{self.target_amount} {self.target_symbol}'
+
+    def __repr__(self):
+        return self.__str__()
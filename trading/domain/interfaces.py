@@ -1,6 +1,10 @@
-from typing import List, Optional
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
 
-from trading.domain.entities import Cryptocurrency, Package, CryptocurrencyPrice
+from trading.domain.entities import Cryptocurrency, Package, CryptocurrencyPrice, PositionSummary, PriceRollup, \
+    WindowStats
+from trading.domain.tools.prices import PriceSeries
+from trading.domain.tools.rollups import DEFAULT_MIN_ROLLUPS
 
 
 class ICryptoCurrencySource:
@@ -25,7 +29,15 @@ class ICryptoCurrencySource:
     def get_current_buy_price(self, cryptocurrency: Cryptocurrency) -> Optional[float]:
         raise NotImplementedError
 
-    def get_last_month_prices(self, cryptocurrency: Cryptocurrency) -> List[CryptocurrencyPrice]:
+    def get_current_prices(self, cryptocurrencies: List[Cryptocurrency], now: Optional[datetime] = None,
+                           max_workers: int = 8) -> List[CryptocurrencyPrice]:
+        """
+        Current sell and buy prices of every cryptocurrency, all of them stamped with a single instant.
+        Cryptocurrencies without price, or whose prices can not be requested, are left out.
+        """
+        raise NotImplementedError
+
+    def get_last_month_prices(self, cryptocurrency: Cryptocurrency) -> Sequence[CryptocurrencyPrice]:
         raise NotImplementedError
 
     def start_conversions(self):
@@ -43,8 +55,77 @@ class ILocalStorage:
     def save_package(self, package: Package):
         raise NotImplementedError
 
+    def save_packages(self, packages: List[Package]):
+        for package in packages:
+            self.save_package(package)
+
     def delete_package(self, package: Package):
         raise NotImplementedError
 
+    def delete_packages(self, packages: List[Package]):
+        for package in packages:
+            self.delete_package(package)
+
     def get_cryptocurrency_packages(self, cryptocurrency: Cryptocurrency) -> List[Package]:
         raise NotImplementedError
+
+    def get_all_packages_grouped(self) -> Dict[str, List[Package]]:
+        """
+        Every package keyed by currency symbol. Currencies without packages are left out.
+        """
+        raise NotImplementedError
+
+    def get_position_summaries(self) -> Dict[str, PositionSummary]:
+        """
+        Summary of the packages of every currency, kept up to date by every package save and delete.
+        Currencies without packages are left out.
+        """
+        raise NotImplementedError
+
+
+class IPriceStore:
+    def append(self, prices: List[CryptocurrencyPrice]):
+        raise NotImplementedError
+
+    def get_series(self, symbol: str, since: Optional[datetime] = None) -> PriceSeries:
+        raise NotImplementedError
+
+    def get_symbols(self) -> List[str]:
+        raise NotImplementedError
+
+    def trim(self, before: datetime) -> int:
+        """
+        Deletes the samples older than `before`, returns how many were deleted.
+        """
+        raise NotImplementedError
+
+
+class IPriceRollups:
+    def update(self, prices: List[CryptocurrencyPrice]):
+        raise NotImplementedError
+
+    def get_rollups(self, symbol: str, td: timedelta, now: Optional[datetime] = None,
+                    min_rollups: int = DEFAULT_MIN_ROLLUPS) -> List[PriceRollup]:
+        """
+        Rollups covering the window [now - td, now] at the coarsest resolution giving at least `min_rollups`
+        of them, raw samples as single sample rollups when the window is shorter.
+        """
+        raise NotImplementedError
+
+
+class IRollingStats:
+    windows: List[timedelta] = []
+
+    def update(self, symbols: Optional[List[str]] = None):
+        """
+        Appends to the rolling windows of the symbols (every one by default) their samples stored since the
+        previous update.
+        """
+        raise NotImplementedError
+
+    def get_window_stats(self, symbols: List[str], td: timedelta) -> Dict[str, WindowStats]:
+        """
+        Statistics of the window `td` of every symbol, anchored at its newest sample.
+        Symbols without samples are left out.
+        """
+        raise NotImplementedError
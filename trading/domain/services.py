@@ -1,5 +1,4 @@
 from datetime import datetime, timedelta
-from json import JSONDecodeError
 
 import pytz
 from matplotlib.dates import DateFormatter
@@ -8,8 +7,12 @@ from shared.domain.configurations import server_get, server_set
 from shared.domain.dependencies import dependency_dispatcher
 from shared.domain.periodic_tasks import schedule
 from shared.domain.system_logs import add_system_log
-from trading.domain.entities import Cryptocurrency, Package
-from trading.domain.interfaces import ILocalStorage, ICryptoCurrencySource
+from trading.domain.context import TradingContext
+from trading.domain.strategy import DEFAULT_STRATEGY, StrategyConfig
+from trading.domain.unit_of_work import UnitOfWork
+from trading.domain.entities import Cryptocurrency, Package, CryptocurrencyPrice, PositionSummary
+from trading.domain.interfaces import ILocalStorage, ICryptoCurrencySource, IPriceRollups, IPriceStore, \
+    IRollingStats
 import matplotlib.pyplot as plt
 from typing import List
 
@@ -22,30 +25,49 @@ from trading.domain.tools.stats import profit_difference_percentage
 
 COMMON_CURRENCY = 'EUR'
 
+# concurrent requests done by fetch_prices unless enable_fetch_prices configuration sets 'workers'
+FETCH_PRICES_WORKERS = 8
+
 
 @schedule(minute='*', unique_name='trade', priority=5)
 def sell():
-    enable_trading_data = server_get('enable_trading', default_data={'activated': False}).data
-    enable_trading = enable_trading_data.get('activated')
-    if not enable_trading:
+    context = _get_trading_context()
+    if not context.trading_enabled:
+        return
+    with UnitOfWork(context.storage) as unit_of_work:
+        _sell(context, unit_of_work)
+
+
+@schedule(minute='0', unique_name='trade', priority=4)
+def purchase():
+    context = _get_trading_context()
+    if not context.trading_enabled:
         return
+    with UnitOfWork(context.storage) as unit_of_work:
+        _purchase(context, unit_of_work)
+
 
+def _get_trading_context(now=None) -> TradingContext:
     trading_source: ICryptoCurrencySource = dependency_dispatcher.request_implementation(ICryptoCurrencySource)
     storage: ILocalStorage = dependency_dispatcher.request_implementation(ILocalStorage)
+    rolling_stats: IRollingStats = dependency_dispatcher.request_implementation(IRollingStats)
+    return TradingContext(trading_source, storage, now=now, rolling_stats=rolling_stats)
 
-    now = pytz.utc.localize(datetime.utcnow())
-    trading_cryptocurrencies = trading_source.get_trading_cryptocurrencies()
+
+def _sell(context: TradingContext, unit_of_work: UnitOfWork):
+    trading_source = context.trading_source
+    strategy = context.strategy
+    now = context.now
 
     trading_source.start_conversions()
 
-    for currency in trading_cryptocurrencies:
-        prices = trading_source.get_last_month_prices(currency)
-        qs = PricesQueryset(prices)
-        if len(qs.filter_by_last(timedelta(days=30), now=now)) == 0:
+    profits_4d = context.window_profits(strategy.sell_window)
+
+    for currency in context.currencies:
+        if not context.has_prices(currency):
             continue
 
-        current_sell_price = prices[-1].sell_price
-        packages = storage.get_cryptocurrency_packages(currency)
+        current_sell_price = context.get_last_price(currency)
 
         """
         1.- Para vender, rentabilidad últimas 4h tendría que ser < -5 y tener paquetes que cumplan:
@@ -53,18 +75,20 @@ def sell():
                 + Que alguno tenga 2 semanas o más con rentabilidad entre 5% y 20%
                 + Que tengan más de n meses de antiguedad. Que sea configurable.
         """
-        profit_4d = qs.profit_percentage(timedelta(days=4), now=now)
-        if profit_4d < -5:
+        profit_4d = profits_4d[currency.symbol]
+        if profit_4d < strategy.sell_market_profit and \
+                _may_sell_packages(context.get_position(currency), current_sell_price, now, strategy):
             amount = 0.0
             remove_packages = []
             profits = []
 
-            for package in packages:
+            for package in context.get_packages(currency):
                 package_profit = profit_difference_percentage(package.bought_at_price, current_sell_price)
                 sell_it = False
-                if package_profit > 20:
+                if package_profit > strategy.sell_profit:
                     sell_it = True
-                elif 5 <= package_profit <= 20 and now - timedelta(days=7) >= package.operation_datetime:
+                elif strategy.hold_profit <= package_profit <= strategy.sell_profit and \
+                        now - strategy.hold_period >= package.operation_datetime:
                     sell_it = True
                 # TODO add auto_sell
 
@@ -78,49 +102,51 @@ def sell():
 
             if round(amount) > 0.0:
                 amount = two_decimals_floor(amount)
-                target = trading_source.get_stable_cryptocurrency()
-                trading_source.convert(currency, amount, target)
-                for package in remove_packages:
-                    storage.delete_package(package)
-                add_system_log(f'SELL', f'SELL {currency.symbol} {amount} profit: {statistics.mean(profits)}%')
+                trading_source.convert(currency, amount, context.stable_currency)
+                unit_of_work.delete_packages(remove_packages)
+                unit_of_work.add_system_log(f'SELL', f'SELL {currency.symbol} {amount} '
+                                                     f'profit: {statistics.mean(profits)}%')
 
     trading_source.finish_conversions()
 
 
-@schedule(minute='0', unique_name='trade', priority=4)
-def purchase():
-    enable_trading_data = server_get('enable_trading', default_data={'activated': False}).data
-    enable_trading = enable_trading_data.get('activated')
-    if not enable_trading:
-        return
+def _may_sell_packages(position: PositionSummary, current_sell_price, now,
+                       strategy: StrategyConfig = DEFAULT_STRATEGY) -> bool:
+    """
+    Whether some package of the position could reach a selling threshold, answered from its summary:
+    the cheapest package gives the best profit and the oldest one the longest holding.
+    """
+    if position.packages == 0 or position.min_bought_price is None or round(position.total_amount) <= 0.0:
+        return False
+    best_profit = profit_difference_percentage(position.min_bought_price, current_sell_price)
+    if best_profit > strategy.sell_profit:
+        return True
+    return best_profit >= strategy.hold_profit and position.oldest_datetime is not None and \
+        now - strategy.hold_period >= position.oldest_datetime
 
-    trading_source: ICryptoCurrencySource = dependency_dispatcher.request_implementation(ICryptoCurrencySource)
-    storage: ILocalStorage = dependency_dispatcher.request_implementation(ILocalStorage)
 
-    source_cryptocurrency = trading_source.get_stable_cryptocurrency()
-    source_amount = trading_source.get_amount_owned(source_cryptocurrency)
+def _purchase(context: TradingContext, unit_of_work: UnitOfWork):
+    trading_source = context.trading_source
+    strategy = context.strategy
+
+    source_cryptocurrency = context.stable_currency
+    source_amount = context.get_balance(source_cryptocurrency)
     if round(source_amount) <= 1:
         return
 
-    now = pytz.utc.localize(datetime.utcnow())
-    trading_cryptocurrencies = trading_source.get_trading_cryptocurrencies()
     purchase_currency_data = []
+    profits_7d = context.window_profits(strategy.purchase_window)
 
-    for currency in trading_cryptocurrencies:
-        prices = trading_source.get_last_month_prices(currency)
-        qs = PricesQueryset(prices)
-        if len(qs.filter_by_last(timedelta(days=30), now=now)) == 0:
+    for currency in context.currencies:
+        if not context.has_prices(currency):
             continue
 
-        packages = storage.get_cryptocurrency_packages(currency)
-        current_sell_price = prices[-1].sell_price
+        current_sell_price = context.get_last_price(currency)
 
-        native_total = 0
-        for package in packages:
-            native_total += package.currency_amount * current_sell_price
+        native_total = context.get_position(currency).total_amount * current_sell_price
         if native_total == 0:
             native_total = 1
-        profitability = qs.profit_percentage(timedelta(days=7), now=now)
+        profitability = profits_7d[currency.symbol]
         score = profitability / native_total
         if score < 0:
             purchase_currency_data.append({
@@ -129,30 +155,28 @@ def purchase():
             })
 
     purchase_currency_data.sort(key=lambda item: item['score'])
-    for_purchase = [item['currency'] for item in purchase_currency_data[0: 10]]
+    for_purchase = [item['currency'] for item in purchase_currency_data[0: strategy.purchase_currencies]]
 
     parts = len(for_purchase)
     if parts == 0:
         parts = 1
     source_fragment_amount = math.floor((source_amount / parts) * 100.0) / 100.0
-    # max of 10 DAI
-    if source_fragment_amount > 10:
-        source_fragment_amount = 10
+    # max of 10 DAI by default
+    if source_fragment_amount > strategy.max_purchase_amount:
+        source_fragment_amount = strategy.max_purchase_amount
 
     trading_source.start_conversions()
 
     for target_currency in for_purchase:
-        prices = trading_source.get_last_month_prices(target_currency)
-        current_buy_price = prices[-1].buy_price
+        current_buy_price = context.get_last_price(target_currency, price='buy')
         trading_source.convert(source_cryptocurrency, source_fragment_amount, target_currency)
-        package = Package(
+        unit_of_work.save_package(Package(
             currency_symbol=target_currency.symbol,
             currency_amount=source_fragment_amount,
             bought_at_price=current_buy_price,
-            operation_datetime=pytz.utc.localize(datetime.utcnow()),
-        )
-        storage.save_package(package)
-        add_system_log(f'BUY', f'BUY {target_currency.symbol} {source_fragment_amount}')
+            operation_datetime=context.now,
+        ))
+        unit_of_work.add_system_log(f'BUY', f'BUY {target_currency.symbol} {source_fragment_amount}')
 
     trading_source.finish_conversions()
 
@@ -168,27 +192,21 @@ def reset_trading():
         'activated': False
     })
 
-    trading_source: ICryptoCurrencySource = dependency_dispatcher.request_implementation(ICryptoCurrencySource)
-    storage: ILocalStorage = dependency_dispatcher.request_implementation(ILocalStorage)
-    now = pytz.utc.localize(datetime.utcnow())
-    trading_cryptocurrencies = trading_source.get_trading_cryptocurrencies()
+    context = _get_trading_context()
+    trading_source = context.trading_source
 
     trading_source.start_conversions()
 
-    for currency in trading_cryptocurrencies:
-        amount = trading_source.get_amount_owned(currency)
-        if round(amount) == 0.0:
-            continue
-        prices = trading_source.get_last_month_prices(currency)
-        qs = PricesQueryset(prices)
-        if len(qs.filter_by_last(timedelta(days=30), now=now)) == 0:
-            continue
-        packages = storage.get_cryptocurrency_packages(currency)
-        amount = two_decimals_floor(amount)
-        target = trading_source.get_stable_cryptocurrency()
-        trading_source.convert(currency, amount, target)
-        for package in packages:
-            storage.delete_package(package)
+    with UnitOfWork(context.storage) as unit_of_work:
+        for currency in context.currencies:
+            amount = context.get_balance(currency)
+            if round(amount) == 0.0:
+                continue
+            if not context.has_prices(currency):
+                continue
+            amount = two_decimals_floor(amount)
+            trading_source.convert(currency, amount, context.stable_currency)
+            unit_of_work.delete_packages(context.get_packages(currency))
 
     trading_source.finish_conversions()
 
@@ -357,21 +375,14 @@ def _plot_prices(currencies, title, now):
 
 
 def _get_global_market_profit(time_delta=None):
-    trading_source: ICryptoCurrencySource = dependency_dispatcher.request_implementation(ICryptoCurrencySource)
     time_delta = time_delta or timedelta(hours=24)
-    now = pytz.utc.localize(datetime.utcnow())
-    trading_cryptocurrencies = trading_source.get_trading_cryptocurrencies()
-    profits = []
-    for currency in trading_cryptocurrencies:
-        prices = trading_source.get_last_month_prices(currency)
-        prices = [price for price in prices if now - time_delta <= price.instant]
-        if len(prices) == 0:
-            continue
-        profit = profit_difference_percentage(prices[0].buy_price, prices[-1].buy_price)
-        profits.append(profit)
+    context = _get_trading_context()
+    matrix = context.matrix
+    profits = matrix.window_profits([time_delta], now=context.now, price='buy')[time_delta]
+    profits = profits[matrix.count(time_delta, now=context.now) > 0]
     if len(profits) == 0:
         return 0.0
-    return statistics.mean(profits)
+    return statistics.mean(profits.tolist())
 
 
 def _check_sell(candidate_currency: Cryptocurrency):
@@ -452,21 +463,59 @@ def fetch_prices():
     if not enable_fetch_prices:
         return
     trading_source: ICryptoCurrencySource = dependency_dispatcher.request_implementation(ICryptoCurrencySource)
-    from trading.application.django_models import DCryptocurrencyPrice
 
-    for cryptocurrency in trading_source.get_trading_cryptocurrencies():
-        try:
-            sell_price = trading_source.get_current_sell_price(cryptocurrency)
-            buy_price = trading_source.get_current_buy_price(cryptocurrency)
-        except JSONDecodeError:
-            continue
-        if sell_price is None or buy_price is None:
-            continue
-        now = pytz.utc.localize(datetime.utcnow())
+    prices = trading_source.get_current_prices(
+        trading_source.get_trading_cryptocurrencies(),
+        now=now,
+        max_workers=enable_fetch_prices_data.get('workers', FETCH_PRICES_WORKERS)
+    )
+    store_prices(prices)
+
+
+@schedule(minute='30', hour='3', unique_name='retention', priority=1)
+def compact_prices():
+    """
+    Applies the `prices_retention` policy: raw prices older than `raw_days` are deleted in bounded batches,
+    keeping their daily and hourly rollups, the price stores are trimmed and the database is compacted.
+    """
+    from trading.infrastructure.django_retention import DEFAULT_BATCH_SIZE, DEFAULT_MAX_BATCHES, \
+        DEFAULT_RAW_DAYS, DEFAULT_VACUUM_PAGES, apply_prices_retention
+
+    retention_data = server_get('prices_retention', default_data={'activated': False}).data
+    if not retention_data.get('activated'):
+        return
+    report = apply_prices_retention(
+        raw_days=retention_data.get('raw_days', DEFAULT_RAW_DAYS),
+        batch_size=retention_data.get('batch_size', DEFAULT_BATCH_SIZE),
+        max_batches=retention_data.get('max_batches', DEFAULT_MAX_BATCHES),
+        vacuum_pages=retention_data.get('vacuum_pages', DEFAULT_VACUUM_PAGES),
+    )
+    add_system_log('RETENTION', f'Deleted {report["rows_deleted"]} prices and {report["blobs_deleted"]} price '
+                                f'blobs, {report["bytes_reclaimed"]} bytes reclaimed')
+
+
+def store_prices(prices: List[CryptocurrencyPrice]):
+    """
+    Persists a price sample with a single insert in one transaction, together with the rollups it updates,
+    and appends it to the price store and its rolling windows.
+    """
+    from django.db import transaction
+    from trading.application.django_models import DCryptocurrencyPrice
 
-        DCryptocurrencyPrice.objects.create(
-            symbol=cryptocurrency.symbol,
-            instant=now,
-            sell_price=sell_price,
-            buy_price=buy_price,
-        )
+    price_rollups: IPriceRollups = dependency_dispatcher.request_implementation(IPriceRollups)
+    with transaction.atomic():
+        DCryptocurrencyPrice.objects.bulk_create([DCryptocurrencyPrice(
+            symbol=price.symbol,
+            instant=price.instant,
+            sell_price=price.sell_price,
+            buy_price=price.buy_price,
+        ) for price in prices])
+        if price_rollups is not None:
+            price_rollups.update(prices)
+
+    price_store: IPriceStore = dependency_dispatcher.request_implementation(IPriceStore)
+    if price_store is not None:
+        price_store.append(prices)
+        rolling_stats: IRollingStats = dependency_dispatcher.request_implementation(IRollingStats)
+        if rolling_stats is not None:
+            rolling_stats.update(sorted({price.symbol for price in prices}))
@@ -0,0 +1,73 @@
+from dataclasses import dataclass
+from datetime import timedelta
+
+
+@dataclass(frozen=True, repr=False)
+class StrategyConfig:
+    """
+    Thresholds of the trading strategy (services._sell and services._purchase).
+
+    Packages of a currency are sold when its profit in the last `sell_window` is below `sell_market_profit`
+    and the package profit is above `sell_profit`, or between `hold_profit` and `sell_profit` once the
+    package is `hold_period` old. Every purchase buys the `purchase_currencies` currencies with the worst
+    `purchase_window` profit for their position, `max_purchase_amount` of the stable currency each at most.
+
+    Windows and periods are timedeltas, they are given in hours in `to_dict`/`from_dict` so a strategy
+    can be kept as a configuration. Strategies are immutable, so they can be compared and hashed.
+    """
+    sell_window: timedelta = timedelta(days=4)
+    sell_market_profit: float = -5.0
+    sell_profit: float = 20.0
+    hold_profit: float = 5.0
+    hold_period: timedelta = timedelta(days=7)
+    purchase_window: timedelta = timedelta(days=7)
+    purchase_currencies: int = 10
+    max_purchase_amount: float = 10.0
+
+    def to_dict(self) -> dict:
+        return {
+            'sell_window': self.sell_window.total_seconds() / 3600,
+            'sell_market_profit': self.sell_market_profit,
+            'sell_profit': self.sell_profit,
+            'hold_profit': self.hold_profit,
+            'hold_period': self.hold_period.total_seconds() / 3600,
+            'purchase_window': self.purchase_window.total_seconds() / 3600,
+            'purchase_currencies': self.purchase_currencies,
+            'max_purchase_amount': self.max_purchase_amount,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """
+        Strategy with the values of `data`, as given by `to_dict`, and the defaults for the missing ones.
+        """
+        values = {}
+        for key, value in data.items():
+            if key not in STRATEGY_PARAMETERS:
+                raise ValueError(f'Unknown strategy parameter {key}. Available: {", ".join(STRATEGY_PARAMETERS)}')
+            values[key] = timedelta(hours=float(value)) if key in TIMEDELTA_PARAMETERS else \
+                STRATEGY_PARAMETERS[key](value)
+        return cls(**values)
+
+    def __str__(self):
+        return ' '.join(f'{key}={value:g}' for key, value in self.to_dict().items())
+
+    def __repr__(self):
+        return self.__str__()
+
+
+# type of every strategy parameter as given by StrategyConfig.to_dict
+STRATEGY_PARAMETERS = {
+    'sell_window': float,
+    'sell_market_profit': float,
+    'sell_profit': float,
+    'hold_profit': float,
+    'hold_period': float,
+    'purchase_window': float,
+    'purchase_currencies': int,
+    'max_purchase_amount': float,
+}
+
+TIMEDELTA_PARAMETERS = {'sell_window', 'hold_period', 'purchase_window'}
+
+DEFAULT_STRATEGY = StrategyConfig()
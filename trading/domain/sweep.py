@@ -0,0 +1,144 @@
+import copy
+import itertools
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from trading.domain.backtesting import Backtest
+from trading.domain.strategy import STRATEGY_PARAMETERS, StrategyConfig
+from trading.domain.tools.market import PriceMatrix
+
+# parameter sets handed to a worker at once, for every worker
+CHUNKS_PER_WORKER = 4
+
+# state of a sweep worker process, set by _init_worker
+_worker = {}
+
+
+class SharedPriceMatrix:
+    """
+    Arrays of a PriceMatrix copied once to shared memory blocks. Processes attach the blocks from `spec`
+    with `attach` and read the same pages, instead of every process getting a copy of the matrix.
+    The process that created the blocks frees them with `close`.
+    """
+    def __init__(self, matrix: PriceMatrix):
+        self._blocks = []
+        blocks = {}
+        for name, array in matrix.to_arrays().items():
+            block = SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=np.float64, buffer=block.buf)[:] = array
+            self._blocks.append(block)
+            blocks[name] = (block.name, len(array))
+        self.spec = {
+            'symbols': matrix.symbols,
+            'origin': matrix.origin,
+            'slots': len(matrix.instants),
+            'resolution': matrix.resolution,
+            'blocks': blocks,
+        }
+
+    @staticmethod
+    def attach(spec: dict) -> Tuple[PriceMatrix, List[SharedMemory]]:
+        """
+        Matrix over the shared blocks of `spec`, with the blocks, which must be kept open while it is used.
+        """
+        blocks, arrays = [], {}
+        for name, (block_name, length) in spec['blocks'].items():
+            # workers share the resource tracker of the pool process, attaching registers the block again
+            block = SharedMemory(name=block_name)
+            blocks.append(block)
+            arrays[name] = np.ndarray((length,), dtype=np.float64, buffer=block.buf)
+        matrix = PriceMatrix.from_arrays(spec['symbols'], spec['origin'], spec['slots'], arrays,
+                                         resolution=spec['resolution'])
+        return matrix, blocks
+
+    def close(self):
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def grid_parameters(grid: Dict[str, Sequence]) -> List[Dict[str, float]]:
+    """
+    Every combination of the values of the strategy parameters of the grid.
+    """
+    names = list(grid.keys())
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def random_parameters(space: Dict[str, Union[Sequence, Tuple[float, float]]], samples: int,
+                      seed: Optional[int] = None) -> List[Dict[str, float]]:
+    """
+    `samples` parameter sets drawn from the space: a (low, high) tuple is a range sampled uniformly
+    (integers for integer parameters), a list is a set of values sampled uniformly.
+    """
+    generator = random.Random(seed)
+    parameter_sets = []
+    for _ in range(samples):
+        parameters = {}
+        for name, values in space.items():
+            if isinstance(values, tuple):
+                low, high = values
+                parameters[name] = generator.randint(int(low), int(high)) if STRATEGY_PARAMETERS[name] is int \
+                    else generator.uniform(low, high)
+            else:
+                parameters[name] = generator.choice(list(values))
+        parameter_sets.append(parameters)
+    return parameter_sets
+
+
+def run_sweep(backtest: Backtest, since: datetime, until: datetime, parameter_sets: List[Dict[str, float]],
+              workers: Optional[int] = None, rank_by='total_return') -> List[dict]:
+    """
+    Backtests every parameter set on top of the strategy of `backtest` in a pool of `workers` processes
+    (one per core by default). The price matrix is built once and shared read only with the workers.
+    Returns a row per parameter set, with its parameters and the backtest summary, best `rank_by` first.
+    """
+    for parameters in parameter_sets:
+        # fails early on unknown parameters
+        StrategyConfig.from_dict(parameters)
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(parameter_sets) // (workers * CHUNKS_PER_WORKER))
+    base_strategy = backtest.strategy.to_dict()
+    # workers read prices from the shared matrix, the series are not sent to them
+    worker_backtest = copy.copy(backtest)
+    worker_backtest.series = []
+
+    with SharedPriceMatrix(backtest.get_matrix(since, until)) as shared:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shared.spec, worker_backtest, since, until)) as executor:
+            strategies = [{**base_strategy, **parameters} for parameters in parameter_sets]
+            summaries = list(executor.map(_evaluate, strategies, chunksize=chunksize))
+
+    rows = [{**parameters, **summary} for parameters, summary in zip(parameter_sets, summaries)]
+    rows.sort(key=lambda row: row[rank_by], reverse=True)
+    return rows
+
+
+def _init_worker(spec, backtest: Backtest, since, until):
+    from django.apps import apps
+
+    if not apps.ready:
+        # spawned workers do not inherit the django setup
+        import django
+        django.setup()
+    matrix, blocks = SharedPriceMatrix.attach(spec)
+    _worker.update(matrix=matrix, blocks=blocks, backtest=backtest, since=since, until=until)
+
+
+def _evaluate(parameters: Dict[str, float]) -> dict:
+    backtest = _worker['backtest']
+    backtest.strategy = StrategyConfig.from_dict(parameters)
+    return backtest.run(_worker['since'], _worker['until'], matrix=_worker['matrix']).summary()
@@ -0,0 +1,73 @@
+import unittest
+from datetime import datetime, timedelta
+
+import pytz
+
+from trading.domain.backtesting import Backtest
+from trading.domain.backtesting_tests import _series
+from trading.domain.strategy import StrategyConfig
+from trading.domain.sweep import grid_parameters, random_parameters, run_sweep, SharedPriceMatrix
+
+
+class StrategyConfigTests(unittest.TestCase):
+    def test_dict_round_trip(self):
+        strategy = StrategyConfig.from_dict({'sell_window': 48, 'purchase_currencies': '5'})
+        self.assertEqual((strategy.sell_window, strategy.purchase_currencies), (timedelta(days=2), 5))
+        self.assertEqual(strategy.sell_profit, 20.0)
+        self.assertEqual(StrategyConfig.from_dict(strategy.to_dict()), strategy)
+        self.assertEqual(StrategyConfig.from_dict({}), StrategyConfig())
+        self.assertEqual(len({strategy, StrategyConfig.from_dict(strategy.to_dict()), StrategyConfig(),
+                              StrategyConfig.from_dict({'sell_window': 96})}), 2)
+        with self.assertRaises(ValueError):
+            StrategyConfig.from_dict({'sell_price': 10})
+
+
+class SweepTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.start = pytz.utc.localize(datetime(2021, 1, 1))
+        self.series = [
+            _series('AAA', self.start, [(0, 100.0), (32, 50.0), (40, 100.0), (44, 85.0), (46, 85.0)]),
+            _series('BBB', self.start, [(0, 10.0), (20, 8.0), (46, 12.0)]),
+        ]
+        self.since, self.until = self.start + timedelta(days=30), self.start + timedelta(days=46)
+
+    def test_parameters(self):
+        self.assertEqual(grid_parameters({'sell_profit': [10, 20], 'purchase_currencies': [1, 2]}), [
+            {'sell_profit': 10, 'purchase_currencies': 1}, {'sell_profit': 10, 'purchase_currencies': 2},
+            {'sell_profit': 20, 'purchase_currencies': 1}, {'sell_profit': 20, 'purchase_currencies': 2},
+        ])
+        parameter_sets = random_parameters({'sell_profit': (10, 30), 'purchase_currencies': (1, 3),
+                                            'hold_period': [24, 48]}, 20, seed=3)
+        self.assertEqual(parameter_sets, random_parameters({'sell_profit': (10, 30), 'purchase_currencies': (1, 3),
+                                                            'hold_period': [24, 48]}, 20, seed=3))
+        self.assertTrue(all(10 <= parameters['sell_profit'] <= 30 for parameters in parameter_sets))
+        self.assertEqual({parameters['purchase_currencies'] for parameters in parameter_sets}, {1, 2, 3})
+        self.assertEqual({parameters['hold_period'] for parameters in parameter_sets}, {24, 48})
+
+    def test_shared_matrix(self):
+        matrix = Backtest(self.series).get_matrix(self.since, self.until)
+        with SharedPriceMatrix(matrix) as shared:
+            attached, blocks = SharedPriceMatrix.attach(shared.spec)
+            now = self.start + timedelta(days=41)
+            self.assertEqual(attached.symbols, ['AAA', 'BBB'])
+            self.assertEqual(attached.last_prices(now).tolist(), matrix.last_prices(now).tolist())
+            self.assertEqual(attached.window_profits([timedelta(days=4)], now)[timedelta(days=4)].tolist(),
+                             matrix.window_profits([timedelta(days=4)], now)[timedelta(days=4)].tolist())
+            for block in blocks:
+                block.close()
+
+    def test_ranks_parameter_sets(self):
+        parameter_sets = grid_parameters({'sell_market_profit': [-5, -50], 'max_purchase_amount': [10, 50]})
+        rows = run_sweep(Backtest(self.series), self.since, self.until, parameter_sets, workers=2)
+        self.assertEqual(len(rows), 4)
+        self.assertEqual([row['total_return'] for row in rows], sorted((row['total_return'] for row in rows),
+                                                                       reverse=True))
+        for row in rows:
+            strategy = StrategyConfig(sell_market_profit=row['sell_market_profit'],
+                                      max_purchase_amount=row['max_purchase_amount'])
+            summary = Backtest(self.series, strategy=strategy).run(self.since, self.until).summary()
+            self.assertEqual((row['final_equity'], row['trades']), (summary['final_equity'], summary['trades']))
+        self.assertEqual([(row['sell_market_profit'], row['max_purchase_amount']) for row in rows],
+                         [(-5, 50), (-50, 50), (-5, 10), (-50, 10)])
+        # AAA never falls 50% in 4 days
+        self.assertTrue(all(row['sells'] == 0 for row in rows if row['sell_market_profit'] == -50))
@@ -0,0 +1,182 @@
+import math
+from datetime import timedelta
+from typing import Dict, List
+
+import numpy as np
+
+from trading.domain.tools.prices import PriceSeries
+
+DEFAULT_RESOLUTION = 300
+
+
+class PriceMatrix:
+    """
+    Currencies x time matrix of sell and buy prices covering [start_ts, end_ts].
+
+    Samples of every currency are stored one row after the other, keyed by row * span + (instant - origin),
+    so a single searchsorted call locates the windows of every currency at once.
+    The dense aligned view (`sell_prices`, `buy_prices`) puts every sample in its `resolution` seconds slot
+    of `instants`, with NaN for missing samples, and is only allocated when accessed.
+    """
+    def __init__(self, symbols, origin, slots, keys, sell_values, buy_values, resolution=DEFAULT_RESOLUTION):
+        self.symbols = list(symbols)
+        self.index = {symbol: n for n, symbol in enumerate(self.symbols)}
+        self.origin = origin
+        self.resolution = resolution
+        self.instants = origin + np.arange(slots, dtype=np.float64) * resolution
+        # one spare slot between rows, so keys of a row never reach the next one
+        self.span = (slots + 1) * resolution
+        self._keys = keys
+        self._values = {'sell': sell_values, 'buy': buy_values}
+        self._dense = {}
+
+    @classmethod
+    def from_series(cls, series_list: List[PriceSeries], start_ts, end_ts, resolution=DEFAULT_RESOLUTION,
+                    contiguous=False):
+        """
+        Matrix of the samples of the series in [start_ts, end_ts]. Price values are read from the series
+        unless `contiguous`, which copies them into single arrays: slower to build, faster to index, for
+        matrices queried many times.
+        """
+        origin = math.floor(start_ts / resolution) * resolution
+        slots = math.floor((end_ts - origin) / resolution) + 1
+        span = (slots + 1) * resolution
+
+        series_list = [series.between(start_ts, end_ts) for series in series_list]
+        keys = np.empty(sum(len(series) for series in series_list))
+        position = 0
+        for row, series in enumerate(series_list):
+            np.add(series.instants, row * span - origin, out=keys[position:position + len(series)])
+            position += len(series)
+        if contiguous:
+            sell_values = np.concatenate([series.sell_prices for series in series_list] or [np.empty(0)])
+            buy_values = np.concatenate([series.buy_prices for series in series_list] or [np.empty(0)])
+        else:
+            # price values are not copied, they are read from the series of every row
+            sell_values = RowValues([series.sell_prices for series in series_list])
+            buy_values = RowValues([series.buy_prices for series in series_list])
+        return cls([series.symbol for series in series_list], origin, slots, keys, sell_values, buy_values,
+                   resolution=resolution)
+
+    @classmethod
+    def from_arrays(cls, symbols, origin, slots, arrays: Dict[str, np.ndarray], resolution=DEFAULT_RESOLUTION):
+        """
+        Matrix over the arrays given by `to_arrays`, which are not copied.
+        """
+        return cls(symbols, origin, slots, arrays['keys'], arrays['sell'], arrays['buy'], resolution=resolution)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Sample keys and contiguous sell and buy prices, which with the symbols, origin, slots and resolution
+        rebuild the matrix with `from_arrays`.
+        """
+        positions = np.arange(len(self._keys))
+        return {
+            'keys': self._keys,
+            'sell': np.asarray(self._values['sell'][positions], dtype=np.float64),
+            'buy': np.asarray(self._values['buy'][positions], dtype=np.float64),
+        }
+
+    def window_profits(self, windows: List[timedelta], now, price='sell') -> Dict[timedelta, np.ndarray]:
+        """
+        Profit percentage between the first and the last sample of every window [now - td, now]
+        for every currency, as PricesQueryset.profit_percentage does for one.
+        Currencies without samples in a window get 0.
+        """
+        first, last, has_samples = self._locate(windows, now)
+        values = self._values[price]
+        if len(values) == 0:
+            return {td: np.zeros(len(self.symbols)) for td in windows}
+        first_prices = values[np.where(has_samples, first, 0)]
+        last_prices = values[np.where(has_samples, last, 0)]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            profits = np.where(has_samples, ((last_prices - first_prices) / first_prices) * 100, 0.0)
+        return {td: profits[n] for n, td in enumerate(windows)}
+
+    def count(self, td, now) -> np.ndarray:
+        first, last, has_samples = self._locate([td], now)
+        return np.where(has_samples, last - first + 1, 0)[0]
+
+    def last_prices(self, now, price='sell') -> np.ndarray:
+        """
+        Last price at or before now of every currency, NaN for currencies without samples.
+        """
+        _, last, has_samples = self._locate([timedelta(seconds=self.span)], now)
+        values = self._values[price]
+        if len(values) == 0:
+            return np.full(len(self.symbols), np.nan)
+        return np.where(has_samples[0], values[np.where(has_samples[0], last[0], 0)], np.nan)
+
+    def get_series(self, symbol, start_ts=None, end_ts=None) -> PriceSeries:
+        """
+        Samples of a currency in [start_ts, end_ts], the whole matrix by default.
+        """
+        row = self.index.get(symbol)
+        if row is None:
+            return PriceSeries(symbol=symbol)
+        start = row * self.span + max((start_ts if start_ts is not None else self.origin) - self.origin, 0.0)
+        end = row * self.span + min((end_ts if end_ts is not None else math.inf) - self.origin,
+                                    self.span - self.resolution)
+        first = int(np.searchsorted(self._keys, start, side='left'))
+        last = int(np.searchsorted(self._keys, end, side='right'))
+        positions = np.arange(first, last)
+        return PriceSeries(symbol=symbol, instants=self._keys[first:last] - row * self.span + self.origin,
+                           sell_prices=self._values['sell'][positions], buy_prices=self._values['buy'][positions])
+
+    @property
+    def sell_prices(self) -> np.ndarray:
+        return self._get_dense('sell')
+
+    @property
+    def buy_prices(self) -> np.ndarray:
+        return self._get_dense('buy')
+
+    def _locate(self, windows, now):
+        # first and last sample positions of every window (rows) and currency (columns)
+        now_ts = now.timestamp()
+        end = min(now_ts - self.origin, self.span - self.resolution)
+        starts = np.array([max(now_ts - td.total_seconds() - self.origin, 0.0) for td in windows])
+        if end < 0:
+            empty = np.zeros((len(windows), len(self.symbols)), dtype=np.int64)
+            return empty, empty, empty.astype(bool)
+        row_offsets = np.arange(len(self.symbols)) * self.span
+        first = np.searchsorted(self._keys, row_offsets[np.newaxis, :] + starts[:, np.newaxis], side='left')
+        last = np.searchsorted(self._keys, row_offsets + end, side='right') - 1
+        last = np.broadcast_to(last, first.shape)
+        return first, last, (first <= last) & (starts[:, np.newaxis] <= end)
+
+    def _get_dense(self, price):
+        if price not in self._dense:
+            rows = (self._keys // self.span).astype(np.int64)
+            columns = ((self._keys - rows * self.span) / self.resolution).astype(np.int64)
+            dense = np.full((len(self.symbols), len(self.instants)), np.nan)
+            dense[rows, columns] = self._values[price][np.arange(len(self._keys))]
+            self._dense[price] = dense
+        return self._dense[price]
+
+
+class RowValues:
+    """
+    Concatenation of per row arrays that is never materialized: integer array indexes
+    are translated to (row, position) and gathered from the rows.
+    """
+    def __init__(self, rows):
+        self.rows = rows
+        self.row_starts = np.cumsum([0] + [len(row) for row in rows])
+
+    def __len__(self):
+        return int(self.row_starts[-1])
+
+    def __getitem__(self, positions):
+        positions = np.asarray(positions)
+        flat_positions = positions.reshape(-1)
+        row_numbers = np.searchsorted(self.row_starts, flat_positions, side='right') - 1
+        order = np.argsort(row_numbers, kind='stable')
+        bounds = np.searchsorted(row_numbers[order], np.arange(len(self.rows) + 1))
+        result = np.empty(len(flat_positions))
+        for row in range(len(self.rows)):
+            if bounds[row] == bounds[row + 1]:
+                continue
+            selected = order[bounds[row]:bounds[row + 1]]
+            result[selected] = self.rows[row][flat_positions[selected] - self.row_starts[row]]
+        return result.reshape(positions.shape)
@@ -0,0 +1,74 @@
+import random
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytz
+
+from trading.domain.entities import CryptocurrencyPrice
+from trading.domain.tools.market import PriceMatrix
+from trading.domain.tools.prices import PricesQueryset, PriceSeries
+
+
+class PriceMatrixTests(unittest.TestCase):
+    def setUp(self) -> None:
+        random.seed(7)
+        self.now = pytz.utc.localize(datetime(2021, 2, 1))
+        self.prices = {}
+        for symbol in ['BTC', 'ETH', 'LTC', 'OLD']:
+            start = self.now - timedelta(days=30) if symbol != 'OLD' else self.now - timedelta(days=60)
+            prices = []
+            for n in range(30 * 288):
+                if random.random() < 0.1:
+                    continue
+                price = random.uniform(10, 20)
+                prices.append(CryptocurrencyPrice(symbol=symbol, instant=start + timedelta(minutes=5 * n),
+                                                  sell_price=price, buy_price=price * 1.01))
+            self.prices[symbol] = prices
+        self.matrix = PriceMatrix.from_series(
+            [PriceSeries.from_prices(symbol, prices) for symbol, prices in self.prices.items()],
+            (self.now - timedelta(days=40)).timestamp(), self.now.timestamp())
+
+    def test_window_profits_match_queryset(self):
+        windows = [timedelta(days=30), timedelta(days=7), timedelta(days=4), timedelta(hours=1)]
+        for now in [self.now, self.now - timedelta(days=3, minutes=5)]:
+            profits = self.matrix.window_profits(windows, now=now)
+            for symbol, prices in self.prices.items():
+                qs = PricesQueryset(prices)
+                for td in windows:
+                    self.assertAlmostEqual(profits[td][self.matrix.index[symbol]], qs.profit_percentage(td, now=now))
+
+    def test_buy_prices_and_counts(self):
+        profits = self.matrix.window_profits([timedelta(days=1)], now=self.now, price='buy')[timedelta(days=1)]
+        counts = self.matrix.count(timedelta(days=1), now=self.now)
+        for symbol, prices in self.prices.items():
+            window = [p for p in prices if self.now - timedelta(days=1) <= p.instant <= self.now]
+            row = self.matrix.index[symbol]
+            self.assertEqual(counts[row], len(window))
+            if len(window) == 0:
+                self.assertEqual(profits[row], 0.0)
+            else:
+                self.assertAlmostEqual(profits[row],
+                                       (window[-1].buy_price - window[0].buy_price) / window[0].buy_price * 100)
+        self.assertEqual(counts[self.matrix.index['OLD']], 0)
+
+    def test_dense_view_and_last_prices(self):
+        sell_prices = self.matrix.sell_prices
+        self.assertEqual(sell_prices.shape, (4, len(self.matrix.instants)))
+        for symbol, prices in self.prices.items():
+            row = self.matrix.index[symbol]
+            window = [p for p in prices if p.instant >= self.now - timedelta(days=40)]
+            self.assertEqual(np.count_nonzero(~np.isnan(sell_prices[row])), len(window))
+            if len(window) > 0:
+                column = int((window[-1].instant.timestamp() - self.matrix.instants[0]) // 300)
+                self.assertEqual(sell_prices[row, column], window[-1].sell_price)
+                self.assertEqual(self.matrix.last_prices(self.now, price='buy')[row], window[-1].buy_price)
+
+    def test_now_outside_matrix(self):
+        profits = self.matrix.window_profits([timedelta(days=1)], now=self.now - timedelta(days=50))
+        self.assertTrue(np.all(profits[timedelta(days=1)] == 0.0))
+        self.assertTrue(np.all(self.matrix.count(timedelta(days=1), now=self.now - timedelta(days=50)) == 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,21 +1,146 @@
+from bisect import bisect_left, bisect_right
 from datetime import datetime
 
+import numpy as np
 import pytz
 
+from trading.domain.entities import CryptocurrencyPrice
 from trading.domain.tools.stats import profit_difference_percentage
 
 
 class PricesQueryset:
-    def __init__(self, prices):
+    """
+    Time window queries over a price series sorted by instant (a PriceSeries or a list of CryptocurrencyPrice).
+    Windows are located by bisecting the instants and memoized per (timedelta, now) when now is given.
+    With the RollingStats of the series, profits of its windows are read from them when `now` is not given
+    (windows then end at the newest sample) or is the instant of the newest sample.
+    """
+    def __init__(self, prices, rolling_stats=None):
         self.prices = prices
+        self.rolling_stats = rolling_stats
+        self._instants = None
+        self._windows = {}
+
+    @property
+    def instants(self):
+        if self._instants is None:
+            if isinstance(self.prices, PriceSeries):
+                self._instants = self.prices.instants
+            else:
+                self._instants = [price.instant for price in self.prices]
+        return self._instants
 
     def filter_by_last(self, td, now=None):
-        now = now or pytz.utc.localize(datetime.utcnow())
-        filtered_prices = [price for price in self.prices if now - td <= price.instant <= now]
-        return filtered_prices
+        if now is None:
+            now = pytz.utc.localize(datetime.utcnow())
+            return self._filter_between(now - td, now)
+        key = (td, now)
+        if key not in self._windows:
+            self._windows[key] = self._filter_between(now - td, now)
+        return self._windows[key]
 
     def profit_percentage(self, td, now=None):
+        if self.rolling_stats is not None and self.rolling_stats.has_window(td):
+            stats = self.rolling_stats.get_stats(td)
+            if stats.samples > 0 and (now is None or now == stats.last_instant):
+                return stats.profit
         prices = self.filter_by_last(td, now=now)
         if len(prices) == 0:
             return 0
         return profit_difference_percentage(prices[0].sell_price, prices[-1].sell_price)
+
+    def _filter_between(self, start, end):
+        if isinstance(self.prices, PriceSeries):
+            return self.prices.between(start.timestamp(), end.timestamp())
+        instants = self.instants
+        return self.prices[bisect_left(instants, start):bisect_right(instants, end)]
+
+
+class PriceSeries:
+    """
+    Columnar price history of a single symbol: epoch instants, sell and buy prices as float64 arrays
+    sorted by instant. Arrays can be memory-mapped, slicing a series never copies them.
+    It also behaves as a read only sequence of CryptocurrencyPrice, built on demand.
+    """
+    def __init__(self, symbol=None, instants=None, sell_prices=None, buy_prices=None):
+        self.symbol = symbol
+        self.instants = instants if instants is not None else np.empty(0, dtype=np.float64)
+        self.sell_prices = sell_prices if sell_prices is not None else np.empty(0, dtype=np.float64)
+        self.buy_prices = buy_prices if buy_prices is not None else np.empty(0, dtype=np.float64)
+
+    @classmethod
+    def from_prices(cls, symbol, prices):
+        return cls(
+            symbol=symbol,
+            instants=np.array([p.instant.timestamp() for p in prices], dtype=np.float64),
+            sell_prices=np.array([p.sell_price for p in prices], dtype=np.float64),
+            buy_prices=np.array([p.buy_price for p in prices], dtype=np.float64),
+        )
+
+    def between(self, start_ts=None, end_ts=None):
+        start = 0 if start_ts is None else int(np.searchsorted(self.instants, start_ts, side='left'))
+        end = len(self.instants) if end_ts is None else int(np.searchsorted(self.instants, end_ts, side='right'))
+        return self[start:end]
+
+    def __len__(self):
+        return len(self.instants)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return PriceSeries(
+                symbol=self.symbol,
+                instants=self.instants[item],
+                sell_prices=self.sell_prices[item],
+                buy_prices=self.buy_prices[item],
+            )
+        return CryptocurrencyPrice(
+            symbol=self.symbol,
+            instant=pytz.utc.localize(datetime.utcfromtimestamp(self.instants[item])),
+            sell_price=float(self.sell_prices[item]),
+            buy_price=float(self.buy_prices[item]),
+        )
+
+    def __iter__(self):
+        for n in range(len(self)):
+            yield self[n]
+
+    def __str__(self):
+        return f'{self.symbol} ({len(self)} prices)'
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class PricesIndex:
+    """
+    Symbol -> sorted price series index built from raw price rows
+    ({'symbol', 'instant', 'sell_price', 'buy_price'}, instant as epoch seconds).
+    Rows are walked once when building it, later lookups only bisect the series of the requested symbol.
+    """
+    def __init__(self, rows):
+        grouped_rows = {}
+        for row in rows:
+            grouped_rows.setdefault(row['symbol'], []).append(row)
+
+        self._instants = {}
+        self._prices = {}
+        for symbol, symbol_rows in grouped_rows.items():
+            symbol_rows.sort(key=lambda r: r['instant'])
+            self._instants[symbol] = [row['instant'] for row in symbol_rows]
+            self._prices[symbol] = [CryptocurrencyPrice(
+                symbol=symbol,
+                instant=pytz.utc.localize(datetime.utcfromtimestamp(row['instant'])),
+                sell_price=row['sell_price'],
+                buy_price=row['buy_price'],
+            ) for row in symbol_rows]
+
+    @property
+    def symbols(self):
+        return list(self._prices.keys())
+
+    def get_prices(self, symbol, since=None):
+        prices = self._prices.get(symbol, [])
+        if since is None:
+            return list(prices)
+        start = bisect_left(self._instants[symbol], since.timestamp()) if len(prices) > 0 else 0
+        return prices[start:]
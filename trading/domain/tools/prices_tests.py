@@ -0,0 +1,73 @@
+import unittest
+from datetime import datetime, timedelta
+
+import pytz
+
+from trading.domain.tools.prices import PricesIndex, PricesQueryset, PriceSeries
+
+
+class PricesIndexTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.now = pytz.utc.localize(datetime(2021, 2, 1))
+        start_ts = (self.now - timedelta(days=40)).timestamp()
+        self.rows = []
+        for n in reversed(range(40 * 24)):
+            for symbol in ['BTC', 'ETH']:
+                self.rows.append({
+                    'symbol': symbol,
+                    'instant': start_ts + n * 3600,
+                    'sell_price': float(n),
+                    'buy_price': float(n) + 1,
+                })
+
+    def test_series_are_sorted_by_instant(self):
+        prices = PricesIndex(self.rows).get_prices('BTC')
+        self.assertEqual(len(prices), 40 * 24)
+        self.assertEqual([p.instant for p in prices], sorted(p.instant for p in prices))
+        self.assertTrue(all(p.symbol == 'BTC' for p in prices))
+
+    def test_since_matches_linear_filter(self):
+        since = self.now - timedelta(days=30)
+        prices = PricesIndex(self.rows).get_prices('ETH', since=since)
+        expected = sorted([r['instant'] for r in self.rows if r['symbol'] == 'ETH' and r['instant'] >= since.timestamp()])
+        self.assertEqual([p.instant.timestamp() for p in prices], expected)
+        self.assertEqual(prices[0].buy_price, prices[0].sell_price + 1)
+
+    def test_unknown_symbol(self):
+        index = PricesIndex(self.rows)
+        self.assertEqual(index.get_prices('DAI'), [])
+        self.assertEqual(index.get_prices('DAI', since=self.now), [])
+        self.assertEqual(sorted(index.symbols), ['BTC', 'ETH'])
+
+
+class PricesQuerysetTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.now = pytz.utc.localize(datetime(2021, 2, 1))
+        start_ts = (self.now - timedelta(days=30)).timestamp()
+        self.prices = PricesIndex([{
+            'symbol': 'BTC',
+            'instant': start_ts + n * 300,
+            'sell_price': 100.0 + n,
+            'buy_price': 101.0 + n,
+        } for n in range(30 * 288)]).get_prices('BTC')
+
+    def test_windows_match_linear_filter(self):
+        for source in [self.prices, PriceSeries.from_prices('BTC', self.prices)]:
+            qs = PricesQueryset(source)
+            for td in [timedelta(days=30), timedelta(days=4), timedelta(hours=1), timedelta(minutes=7)]:
+                for now in [self.now, self.now - timedelta(minutes=2, seconds=30), self.now + timedelta(days=1)]:
+                    expected = [p for p in self.prices if now - td <= p.instant <= now]
+                    window = qs.filter_by_last(td, now=now)
+                    self.assertEqual([p.instant for p in window], [p.instant for p in expected])
+
+    def test_windows_are_memoized(self):
+        qs = PricesQueryset(self.prices)
+        window = qs.filter_by_last(timedelta(days=7), now=self.now)
+        self.assertIs(qs.filter_by_last(timedelta(days=7), now=self.now), window)
+        self.assertAlmostEqual(qs.profit_percentage(timedelta(days=7), now=self.now),
+                               (window[-1].sell_price - window[0].sell_price) / window[0].sell_price * 100)
+        self.assertEqual(qs.profit_percentage(timedelta(days=7), now=self.now - timedelta(days=60)), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
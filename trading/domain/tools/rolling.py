@@ -0,0 +1,189 @@
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+import pytz
+
+from trading.domain.entities import WindowStats
+from trading.domain.tools.prices import PriceSeries
+from trading.domain.tools.stats import profit_difference_percentage
+
+DEFAULT_WINDOWS = [timedelta(days=4), timedelta(days=7), timedelta(days=30)]
+
+# sums are recomputed from the window samples after this many appends at least, see RollingWindow
+MIN_RESYNC_APPENDS = 64
+
+
+class RollingWindow:
+    """
+    Statistics of the sell prices of the samples in the last `seconds` of a series, anchored at its newest sample.
+    Samples are appended one by one by position, the ones leaving the window are read back from the series.
+    Count, sum and sum of squares (shifted by a reference price for precision) are updated on every append
+    and expiry, minimum and maximum come from monotonic queues, so every sample costs O(1) amortized.
+    Sums drift after many additions and subtractions, so they are recomputed from the window samples once as
+    many samples as the window holds have been appended, which is still O(1) amortized per sample.
+    """
+    def __init__(self, seconds, start=0, end=0, count=0, total=0.0, total_squares=0.0, reference=None,
+                 min_queue=None, max_queue=None, appends=0, first=None, last=None):
+        self.seconds = seconds
+        self.start = start
+        self.end = end
+        self.count = count
+        self.total = total
+        self.total_squares = total_squares
+        self.reference = reference
+        # (position, price) pairs, prices increasing in min_queue and decreasing in max_queue
+        self.min_queue = deque(tuple(item) for item in (min_queue or []))
+        self.max_queue = deque(tuple(item) for item in (max_queue or []))
+        self.appends = appends
+        # (instant, price) of the first and the last sample of the window
+        self.first = tuple(first) if first is not None else None
+        self.last = tuple(last) if last is not None else None
+
+    def append(self, position, instants, prices):
+        instant, price = float(instants[position]), float(prices[position])
+        if self.reference is None:
+            self.reference = price
+        shifted = price - self.reference
+        self.count += 1
+        self.total += shifted
+        self.total_squares += shifted * shifted
+        while len(self.min_queue) > 0 and self.min_queue[-1][1] >= price:
+            self.min_queue.pop()
+        self.min_queue.append((position, price))
+        while len(self.max_queue) > 0 and self.max_queue[-1][1] <= price:
+            self.max_queue.pop()
+        self.max_queue.append((position, price))
+        self.end = position + 1
+        self.last = (instant, price)
+
+        window_start = instant - self.seconds
+        while float(instants[self.start]) < window_start:
+            expired = float(prices[self.start]) - self.reference
+            self.count -= 1
+            self.total -= expired
+            self.total_squares -= expired * expired
+            if self.min_queue[0][0] == self.start:
+                self.min_queue.popleft()
+            if self.max_queue[0][0] == self.start:
+                self.max_queue.popleft()
+            self.start += 1
+        self.first = (float(instants[self.start]), float(prices[self.start]))
+
+        self.appends += 1
+        if self.appends >= max(self.count, MIN_RESYNC_APPENDS):
+            self._resync(prices)
+
+    def get_stats(self, symbol=None) -> WindowStats:
+        if self.count == 0:
+            return WindowStats(symbol=symbol, window=self.seconds)
+        mean = self.total / self.count
+        variance = 0.0
+        if self.count > 1:
+            variance = max((self.total_squares - self.count * mean * mean) / (self.count - 1), 0.0)
+        return WindowStats(
+            symbol=symbol,
+            window=self.seconds,
+            samples=self.count,
+            first_instant=pytz.utc.localize(datetime.utcfromtimestamp(self.first[0])),
+            last_instant=pytz.utc.localize(datetime.utcfromtimestamp(self.last[0])),
+            first_price=self.first[1],
+            last_price=self.last[1],
+            mean=mean + self.reference,
+            variance=variance,
+            min_price=self.min_queue[0][1],
+            max_price=self.max_queue[0][1],
+            profit=profit_difference_percentage(self.first[1], self.last[1]),
+        )
+
+    def to_state(self) -> dict:
+        return {
+            'seconds': self.seconds,
+            'start': self.start,
+            'end': self.end,
+            'count': self.count,
+            'total': self.total,
+            'total_squares': self.total_squares,
+            'reference': self.reference,
+            'min_queue': list(self.min_queue),
+            'max_queue': list(self.max_queue),
+            'appends': self.appends,
+            'first': self.first,
+            'last': self.last,
+        }
+
+    @classmethod
+    def from_state(cls, state: dict):
+        return cls(**state)
+
+    def _resync(self, prices):
+        window_prices = np.asarray(prices[self.start:self.end], dtype=np.float64)
+        self.reference = float(window_prices[0])
+        shifted = window_prices - self.reference
+        self.total = float(shifted.sum())
+        self.total_squares = float((shifted * shifted).sum())
+        self.appends = 0
+
+
+class RollingStats:
+    """
+    Rolling windows of one symbol fed from its price series. `update` appends the samples added to the
+    series since the previous call, so the windows can be kept across restarts with `to_state`/`from_state`
+    and caught up with the series afterwards.
+    """
+    def __init__(self, symbol, windows: Optional[List[timedelta]] = None, length=0,
+                 rolling_windows: Optional[Dict[int, RollingWindow]] = None):
+        self.symbol = symbol
+        self.length = length
+        seconds = [int(td.total_seconds()) for td in (windows or DEFAULT_WINDOWS)]
+        self.windows = rolling_windows or {s: RollingWindow(s) for s in seconds}
+
+    def update(self, series: PriceSeries) -> int:
+        """
+        Appends the new samples of the series, returns how many of them there were.
+        """
+        last = next(iter(self.windows.values())).last
+        if len(series) < self.length or \
+                (self.length > 0 and (last is None or float(series.instants[self.length - 1]) != last[0])):
+            # the series was rebuilt or trimmed (the samples appended so far moved), windows start over
+            self.length = 0
+            self.windows = {s: RollingWindow(s) for s in self.windows.keys()}
+        if len(series) == self.length:
+            return 0
+
+        instants, prices = series.instants, series.sell_prices
+        start = self.length
+        if start == 0:
+            # samples older than the largest window would be expired right away
+            start = int(np.searchsorted(instants, float(instants[-1]) - max(self.windows.keys()), side='left'))
+            for window in self.windows.values():
+                window.start = window.end = start
+        for position in range(start, len(series)):
+            for window in self.windows.values():
+                window.append(position, instants, prices)
+        appended = len(series) - self.length
+        self.length = len(series)
+        return appended
+
+    def has_window(self, td: timedelta) -> bool:
+        return int(td.total_seconds()) in self.windows
+
+    def get_stats(self, td: timedelta) -> WindowStats:
+        seconds = int(td.total_seconds())
+        if seconds not in self.windows:
+            raise ValueError(f'No rolling window of {td}. Available: {", ".join(str(s) for s in self.windows)}')
+        return self.windows[seconds].get_stats(symbol=self.symbol)
+
+    def to_state(self) -> dict:
+        return {
+            'symbol': self.symbol,
+            'length': self.length,
+            'windows': [window.to_state() for window in self.windows.values()],
+        }
+
+    @classmethod
+    def from_state(cls, state: dict):
+        windows = [RollingWindow.from_state(window) for window in state['windows']]
+        return cls(state['symbol'], length=state['length'],
+                   rolling_windows={window.seconds: window for window in windows})
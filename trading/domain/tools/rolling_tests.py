@@ -0,0 +1,81 @@
+import random
+import statistics
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytz
+
+from trading.domain.tools.prices import PricesQueryset, PriceSeries
+from trading.domain.tools.rolling import RollingStats
+
+
+def _random_series(symbol='BTC', samples=3000, seed=3):
+    random.seed(seed)
+    start = pytz.utc.localize(datetime(2021, 1, 1)).timestamp()
+    instants, prices = [], []
+    instant, price = start, 100.0
+    for _ in range(samples):
+        # irregular sampling, with some gaps of hours
+        instant += 300 if random.random() < 0.98 else random.randint(2, 30) * 3600
+        price *= random.uniform(0.98, 1.02)
+        instants.append(instant)
+        prices.append(price)
+    instants, prices = np.array(instants), np.array(prices)
+    return PriceSeries(symbol=symbol, instants=instants, sell_prices=prices, buy_prices=prices * 1.01)
+
+
+class RollingStatsTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.series = _random_series()
+        self.windows = [timedelta(days=1), timedelta(days=4)]
+
+    def _assert_matches(self, stats, series):
+        last_instant = series.instants[-1]
+        for td in self.windows:
+            window = series.between(start_ts=last_instant - td.total_seconds())
+            window_stats = stats.get_stats(td)
+            prices = window.sell_prices.tolist()
+            self.assertEqual(window_stats.samples, len(prices))
+            self.assertEqual(window_stats.first_price, prices[0])
+            self.assertEqual(window_stats.last_price, prices[-1])
+            self.assertEqual(window_stats.min_price, min(prices))
+            self.assertEqual(window_stats.max_price, max(prices))
+            self.assertAlmostEqual(window_stats.mean, statistics.mean(prices), places=9)
+            if len(prices) > 1:
+                self.assertAlmostEqual(window_stats.variance, statistics.variance(prices), places=6)
+            self.assertAlmostEqual(window_stats.profit, (prices[-1] - prices[0]) / prices[0] * 100)
+
+    def test_incremental_updates(self):
+        stats = RollingStats('BTC', windows=self.windows)
+        length = 0
+        while length < len(self.series):
+            length = min(length + random.randint(1, 50), len(self.series))
+            appended = stats.update(self.series[:length])
+            self.assertEqual(stats.length, length)
+            self.assertTrue(appended > 0)
+            self._assert_matches(stats, self.series[:length])
+        self.assertEqual(stats.update(self.series), 0)
+
+    def test_state_round_trip(self):
+        stats = RollingStats('BTC', windows=self.windows)
+        stats.update(self.series[:2000])
+        restored = RollingStats.from_state(stats.to_state())
+        restored.update(self.series)
+        self._assert_matches(restored, self.series)
+
+        # a shorter series means it was rebuilt, windows start over from it
+        restored.update(self.series[:1000])
+        self._assert_matches(restored, self.series[:1000])
+
+    def test_queryset_reads_windows(self):
+        stats = RollingStats('BTC', windows=self.windows)
+        stats.update(self.series)
+        qs = PricesQueryset(self.series, rolling_stats=stats)
+        now = self.series[-1].instant
+        for td in self.windows:
+            self.assertAlmostEqual(qs.profit_percentage(td, now=now), PricesQueryset(self.series).profit_percentage(
+                td, now=now))
+            self.assertEqual(qs.profit_percentage(td), stats.get_stats(td).profit)
+        self.assertAlmostEqual(qs.profit_percentage(timedelta(hours=6), now=now),
+                               PricesQueryset(self.series).profit_percentage(timedelta(hours=6), now=now))
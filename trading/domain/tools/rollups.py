@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pytz
+
+from trading.domain.entities import CryptocurrencyPrice, PriceRollup
+
+HOURLY = 3600
+DAILY = 86400
+ROLLUP_RESOLUTIONS = (HOURLY, DAILY)
+RAW_RESOLUTION = 300
+DEFAULT_MIN_ROLLUPS = 24
+
+RollupKey = Tuple[str, int, datetime]
+
+
+def get_bucket_instant(instant: datetime, resolution: int) -> datetime:
+    ts = instant.timestamp()
+    return pytz.utc.localize(datetime.utcfromtimestamp(ts - ts % resolution))
+
+
+def select_resolution(td: timedelta, min_rollups=DEFAULT_MIN_ROLLUPS,
+                      resolutions=ROLLUP_RESOLUTIONS) -> Optional[int]:
+    """
+    Coarsest resolution that still splits the window in at least `min_rollups` rollups,
+    None when the window is too short for any of them and raw samples must be read.
+    """
+    candidates = [r for r in resolutions if td.total_seconds() / r >= min_rollups]
+    return max(candidates) if len(candidates) > 0 else None
+
+
+def get_rollup_keys(prices: Iterable[CryptocurrencyPrice], resolutions=ROLLUP_RESOLUTIONS) -> List[RollupKey]:
+    keys = set()
+    for price in prices:
+        for resolution in resolutions:
+            keys.add((price.symbol, resolution, get_bucket_instant(price.instant, resolution)))
+    return sorted(keys)
+
+
+def add_prices_to_rollups(rollups: Dict[RollupKey, PriceRollup], prices: Iterable[CryptocurrencyPrice],
+                          resolutions=ROLLUP_RESOLUTIONS) -> Dict[RollupKey, PriceRollup]:
+    """
+    Adds the sell price of every sample to the rollups of its buckets, creating the missing ones in `rollups`.
+    Samples can arrive in any order, open and close prices follow the first and last instants seen.
+    Returns the rollups that were modified.
+    """
+    modified = {}
+    for price in prices:
+        if price.sell_price is None:
+            continue
+        for resolution in resolutions:
+            key = (price.symbol, resolution, get_bucket_instant(price.instant, resolution))
+            rollup = rollups.get(key)
+            if rollup is None:
+                rollup = PriceRollup(symbol=price.symbol, resolution=resolution, instant=key[2])
+                rollups[key] = rollup
+            _add_price(rollup, price)
+            modified[key] = rollup
+    return modified
+
+
+def raw_rollups(prices: Iterable[CryptocurrencyPrice]) -> List[PriceRollup]:
+    """
+    Raw samples exposed as single sample rollups, for windows too short for any rollup resolution.
+    """
+    return [PriceRollup(symbol=p.symbol, resolution=RAW_RESOLUTION, instant=p.instant, open_price=p.sell_price,
+                        high_price=p.sell_price, low_price=p.sell_price, close_price=p.sell_price,
+                        mean_price=p.sell_price, samples=1, first_instant=p.instant, last_instant=p.instant)
+            for p in prices if p.sell_price is not None]
+
+
+def _add_price(rollup: PriceRollup, price: CryptocurrencyPrice):
+    value = price.sell_price
+    if rollup.samples == 0:
+        rollup.open_price = rollup.high_price = rollup.low_price = rollup.close_price = rollup.mean_price = value
+        rollup.first_instant = rollup.last_instant = price.instant
+        rollup.samples = 1
+        return
+    rollup.high_price = max(rollup.high_price, value)
+    rollup.low_price = min(rollup.low_price, value)
+    rollup.mean_price += (value - rollup.mean_price) / (rollup.samples + 1)
+    rollup.samples += 1
+    if price.instant < rollup.first_instant:
+        rollup.open_price = value
+        rollup.first_instant = price.instant
+    if price.instant >= rollup.last_instant:
+        rollup.close_price = value
+        rollup.last_instant = price.instant
@@ -0,0 +1,65 @@
+import random
+import unittest
+from datetime import datetime, timedelta
+
+import pytz
+
+from trading.domain.entities import CryptocurrencyPrice
+from trading.domain.tools.rollups import DAILY, HOURLY, add_prices_to_rollups, get_bucket_instant, \
+    get_rollup_keys, select_resolution
+
+
+class RollupsTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.start = pytz.utc.localize(datetime(2021, 2, 1))
+        self.prices = [CryptocurrencyPrice(symbol='BTC', instant=self.start + timedelta(minutes=5 * n),
+                                           sell_price=float(n), buy_price=float(n) + 1) for n in range(2 * 288)]
+
+    def test_select_resolution(self):
+        self.assertIsNone(select_resolution(timedelta(hours=6)))
+        self.assertEqual(select_resolution(timedelta(days=1)), HOURLY)
+        self.assertEqual(select_resolution(timedelta(days=7)), HOURLY)
+        self.assertEqual(select_resolution(timedelta(days=30)), DAILY)
+        self.assertEqual(select_resolution(timedelta(days=7), min_rollups=7), DAILY)
+
+    def test_get_bucket_instant(self):
+        instant = self.start + timedelta(hours=5, minutes=35)
+        self.assertEqual(get_bucket_instant(instant, HOURLY), self.start + timedelta(hours=5))
+        self.assertEqual(get_bucket_instant(instant, DAILY), self.start)
+
+    def test_rollups(self):
+        rollups = {}
+        modified = add_prices_to_rollups(rollups, self.prices)
+        self.assertEqual(len(modified), 48 + 2)
+        self.assertEqual(sorted(modified.keys()), get_rollup_keys(self.prices))
+
+        hour = rollups[('BTC', HOURLY, self.start + timedelta(hours=1))]
+        self.assertEqual((hour.open_price, hour.high_price, hour.low_price, hour.close_price), (12, 23, 12, 23))
+        self.assertEqual(hour.samples, 12)
+        self.assertAlmostEqual(hour.mean_price, 17.5)
+
+        day = rollups[('BTC', DAILY, self.start + timedelta(days=1))]
+        self.assertEqual((day.open_price, day.close_price, day.samples), (288, 575, 288))
+        self.assertAlmostEqual(day.mean_price, (288 + 575) / 2)
+
+    def test_incremental_rollups(self):
+        rollups = {}
+        add_prices_to_rollups(rollups, self.prices)
+        shuffled = list(self.prices)
+        random.Random(1).shuffle(shuffled)
+        incremental = {}
+        for n in range(0, len(shuffled), 50):
+            add_prices_to_rollups(incremental, shuffled[n:n + 50])
+
+        self.assertEqual(incremental.keys(), rollups.keys())
+        for key, rollup in rollups.items():
+            other = incremental[key]
+            self.assertEqual((rollup.open_price, rollup.high_price, rollup.low_price, rollup.close_price,
+                              rollup.samples, rollup.first_instant, rollup.last_instant),
+                             (other.open_price, other.high_price, other.low_price, other.close_price,
+                              other.samples, other.first_instant, other.last_instant))
+            self.assertAlmostEqual(rollup.mean_price, other.mean_price)
+
+
+if __name__ == '__main__':
+    unittest.main()
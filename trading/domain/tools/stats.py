@@ -1,4 +1,7 @@
+import math
 import statistics
+from collections import deque
+
 import numpy as np
 
 from scipy import misc
@@ -9,6 +12,7 @@ from sklearn.preprocessing import PolynomialFeatures
 from patsy.highlevel import dmatrix
 import statsmodels.api as sm
 import matplotlib.pyplot as plt
+from sortedcontainers import SortedList
 
 
 def plot_with_f(x, y, f):
@@ -97,3 +101,188 @@ def to_profit(prices):
             profit.append(profit_difference_percentage(last, price))
         last = price
     return profit
+
+
+"""
+Sliding windows
+"""
+
+# running sums of SlidingWindowStats are recomputed after this many removals at least
+MIN_RESYNC_REMOVALS = 64
+
+
+class SlidingWindowStats:
+    """
+    Order statistics and moments of a sliding window of values. Values are appended with a key (an instant,
+    or their position by default) and leave the window when it is over `max_size` values or when `expire`
+    is given an older key. Values are kept sorted in a SortedList, so appends, expiries, the median and any
+    quantile cost O(log n); mean, variance and stdev come from running sums in O(1).
+    """
+    def __init__(self, max_size=None):
+        self.max_size = max_size
+        self._values = deque()
+        self._sorted = SortedList()
+        self._reference = None
+        self._total = 0.0
+        self._total_squares = 0.0
+        self._appended = 0
+        self._removals = 0
+
+    def __len__(self):
+        return len(self._values)
+
+    @property
+    def last_key(self):
+        return self._values[-1][0] if len(self._values) > 0 else None
+
+    def append(self, value, key=None):
+        value = float(value)
+        key = self._appended if key is None else key
+        if self._reference is None:
+            self._reference = value
+        shifted = value - self._reference
+        self._values.append((key, value))
+        self._sorted.add(value)
+        self._total += shifted
+        self._total_squares += shifted * shifted
+        self._appended += 1
+        if self.max_size is not None and len(self._values) > self.max_size:
+            self._pop()
+
+    def expire(self, key):
+        """
+        Removes the values appended with a key older than `key`.
+        """
+        while len(self._values) > 0 and self._values[0][0] < key:
+            self._pop()
+
+    def clear(self):
+        self.__init__(max_size=self.max_size)
+
+    def median(self):
+        return self.quantile(0.5)
+
+    def quantile(self, q):
+        """
+        Quantile with linear interpolation between the closest ranks, as numpy.quantile does.
+        """
+        if len(self._sorted) == 0:
+            raise statistics.StatisticsError('quantile requires at least one value')
+        position = q * (len(self._sorted) - 1)
+        lower = math.floor(position)
+        upper = min(lower + 1, len(self._sorted) - 1)
+        fraction = position - lower
+        return self._sorted[lower] + (self._sorted[upper] - self._sorted[lower]) * fraction
+
+    def percentile(self, p):
+        return self.quantile(p / 100.0)
+
+    def min(self):
+        return self._sorted[0]
+
+    def max(self):
+        return self._sorted[-1]
+
+    def mean(self):
+        if len(self._values) == 0:
+            raise statistics.StatisticsError('mean requires at least one value')
+        return self._reference + self._total / len(self._values)
+
+    def variance(self):
+        """
+        Sample variance, as statistics.variance.
+        """
+        n = len(self._values)
+        if n < 2:
+            raise statistics.StatisticsError('variance requires at least two values')
+        shifted_mean = self._total / n
+        return max((self._total_squares - n * shifted_mean * shifted_mean) / (n - 1), 0.0)
+
+    def stdev(self):
+        return math.sqrt(self.variance())
+
+    def _pop(self):
+        _, value = self._values.popleft()
+        self._sorted.remove(value)
+        shifted = value - self._reference
+        self._total -= shifted
+        self._total_squares -= shifted * shifted
+        self._removals += 1
+        if len(self._values) == 0:
+            self._reference = None
+            self._total = self._total_squares = 0.0
+            self._removals = 0
+        elif self._removals >= max(len(self._values), MIN_RESYNC_REMOVALS):
+            # running sums drift after many subtractions, recomputed once as many values as the window holds left it
+            self._removals = 0
+            self._reference = self._values[0][1]
+            self._total = math.fsum(v - self._reference for _, v in self._values)
+            self._total_squares = math.fsum((v - self._reference) ** 2 for _, v in self._values)
+
+
+class P2Quantile:
+    """
+    Streaming estimate of the `q` quantile of every value seen, in O(1) time and memory per value,
+    with the P-square algorithm (Jain and Chlamtac, 1985). Exact for the first five values.
+    Useful for quantiles of long histories that are not worth keeping in a SlidingWindowStats.
+    """
+    def __init__(self, q):
+        self.q = q
+        self._heights = []
+        self._positions = [1, 2, 3, 4, 5]
+        self._desired = [1, 1 + 2 * q, 1 + 4 * q, 3 + 2 * q, 5]
+        self._increments = [0, q / 2, q, (1 + q) / 2, 1]
+        self.count = 0
+
+    def append(self, value):
+        value = float(value)
+        self.count += 1
+        if len(self._heights) < 5:
+            self._heights.append(value)
+            self._heights.sort()
+            return
+
+        heights, positions = self._heights, self._positions
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            cell = 3
+        else:
+            cell = next(n for n in range(4) if heights[n] <= value < heights[n + 1])
+        for n in range(cell + 1, 5):
+            positions[n] += 1
+        for n in range(5):
+            self._desired[n] += self._increments[n]
+
+        for n in range(1, 4):
+            delta = self._desired[n] - positions[n]
+            if (delta >= 1 and positions[n + 1] - positions[n] > 1) or \
+                    (delta <= -1 and positions[n - 1] - positions[n] < -1):
+                step = 1 if delta > 0 else -1
+                height = self._parabolic(n, step)
+                if not heights[n - 1] < height < heights[n + 1]:
+                    height = self._linear(n, step)
+                heights[n] = height
+                positions[n] += step
+
+    def value(self):
+        if self.count == 0:
+            raise statistics.StatisticsError('quantile requires at least one value')
+        if self.count < 5:
+            return float(np.quantile(self._heights, self.q))
+        return self._heights[2]
+
+    def _linear(self, n, step):
+        heights, positions = self._heights, self._positions
+        return heights[n] + step * (heights[n + step] - heights[n]) / (positions[n + step] - positions[n])
+
+    def _parabolic(self, n, step):
+        heights, positions = self._heights, self._positions
+        upper_slope = (heights[n + 1] - heights[n]) / (positions[n + 1] - positions[n])
+        lower_slope = (heights[n] - heights[n - 1]) / (positions[n] - positions[n - 1])
+        return heights[n] + step / (positions[n + 1] - positions[n - 1]) * (
+            (positions[n] - positions[n - 1] + step) * upper_slope +
+            (positions[n + 1] - positions[n] - step) * lower_slope
+        )
@@ -0,0 +1,53 @@
+import random
+import statistics
+import unittest
+
+import numpy as np
+
+from trading.domain.tools.stats import SlidingWindowStats, P2Quantile
+
+
+class SlidingWindowStatsTests(unittest.TestCase):
+    def setUp(self) -> None:
+        random.seed(5)
+        self.values = [random.lognormvariate(5, 1) for _ in range(2000)]
+
+    def _assert_matches(self, window, values):
+        self.assertEqual(len(window), len(values))
+        self.assertAlmostEqual(window.median(), statistics.median(values))
+        for q in (0.0, 0.1, 0.25, 0.9, 1.0):
+            self.assertAlmostEqual(window.quantile(q), float(np.quantile(values, q)))
+        self.assertEqual((window.min(), window.max()), (min(values), max(values)))
+        self.assertAlmostEqual(window.mean(), statistics.mean(values), places=9)
+        self.assertAlmostEqual(window.stdev(), statistics.stdev(values), places=6)
+
+    def test_max_size(self):
+        window = SlidingWindowStats(max_size=300)
+        for position, value in enumerate(self.values):
+            window.append(value)
+            if position % 97 == 1:
+                self._assert_matches(window, self.values[max(position - 299, 0):position + 1])
+
+    def test_expire_by_key(self):
+        window = SlidingWindowStats()
+        for position, value in enumerate(self.values):
+            window.append(value, key=position * 60)
+            window.expire(position * 60 - 3600 * 4)
+        self.assertEqual(window.last_key, (len(self.values) - 1) * 60)
+        self._assert_matches(window, self.values[-241:])
+
+        window.expire(len(self.values) * 60)
+        self.assertEqual(len(window), 0)
+        with self.assertRaises(statistics.StatisticsError):
+            window.median()
+
+    def test_p2_quantile(self):
+        for q in (0.5, 0.9):
+            sketch = P2Quantile(q)
+            for value in self.values[:4]:
+                sketch.append(value)
+            self.assertAlmostEqual(sketch.value(), float(np.quantile(self.values[:4], q)))
+            for value in self.values[4:]:
+                sketch.append(value)
+            exact = float(np.quantile(self.values, q))
+            self.assertLess(abs(sketch.value() - exact) / exact, 0.05)
@@ -1,46 +1,179 @@
-import random
+import math
 from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Union
 
+import numpy as np
 import pytz
+from scipy.signal import lfilter
 
 from trading.domain.entities import CryptocurrencyPrice
+from trading.domain.tools.prices import PriceSeries
 
+# market regimes: daily drift of the market log price, multiplier of its volatility and mean duration in days
+DEFAULT_REGIMES = {
+    'calm': {'drift': 0.0, 'volatility': 0.6, 'days': 10},
+    'bull': {'drift': 0.01, 'volatility': 1.0, 'days': 20},
+    'bear': {'drift': -0.01, 'volatility': 1.3, 'days': 15},
+}
 
-def generate_currency_prices(phases, symbol=None, now=None):
-    now = now or pytz.utc.localize(datetime.utcnow())
+# crashes: share of the price lost, duration in days and multiplier of the volatility while they last
+CRASH_DROP = (0.2, 0.5)
+CRASH_DAYS = (0.5, 3.0)
+CRASH_VOLATILITY = 3.0
 
-    generated_prices = []
 
-    all_deltas = []
-    for phase in phases:
-        td = phase.get('timedelta')
-        all_deltas.append(td)
+def generate_currency_prices(phases, symbol=None, now=None, seed=None) -> List[CryptocurrencyPrice]:
+    """
+    Prices every 5 minutes up to now, going linearly from the start price to the end price of every phase
+    (dicts with 'timedelta', 'start_price' and 'end_price') with a noise of 0.5%, rounded to cents.
+    """
+    return list(generate_currency_series(phases, symbol=symbol, now=now, seed=seed))
+
 
-    current_dt = now
-    for td in all_deltas:
-        current_dt -= td
+def generate_currency_series(phases, symbol=None, now=None, seed=None) -> PriceSeries:
+    """
+    Prices of generate_currency_prices as a PriceSeries, whose entities are only built when read.
+    """
+    now = now or pytz.utc.localize(datetime.utcnow())
+    generator = _get_generator(seed)
+    start_ts = (now - sum((phase.get('timedelta') for phase in phases), timedelta())).timestamp()
+
+    instants, prices = [], []
     for phase in phases:
         td = phase.get('timedelta')
         start_price = phase.get('start_price')
         end_price = phase.get('end_price')
+        iterations = int(td.total_seconds() / 300)
+        current_prices = start_price + (end_price - start_price) / iterations * np.arange(iterations)
+        noise = current_prices * 0.005
+        cents = generator.integers(((current_prices - noise) * 100).astype(np.int64),
+                                   ((current_prices + noise) * 100).astype(np.int64), endpoint=True)
+        instants.append(start_ts + np.arange(iterations) * 300.0)
+        prices.append(cents / 100)
+        start_ts += iterations * 300.0
+
+    prices = np.concatenate(prices) if prices else np.empty(0)
+    return PriceSeries(symbol=symbol, instants=np.concatenate(instants) if instants else np.empty(0),
+                       sell_prices=prices, buy_prices=prices.copy())
+
+
+class SyntheticMarket:
+    """
+    Prices of several symbols sampled at the same instants: (symbols x instants) sell and buy price arrays,
+    and the regime of the market at every instant. `get_series` gives a PriceSeries view of a symbol and
+    `iter_prices` every sample as a CryptocurrencyPrice, both building the entities only when read.
+    """
+    def __init__(self, symbols: List[str], instants: np.ndarray, sell_prices: np.ndarray, buy_prices: np.ndarray,
+                 regimes: np.ndarray, regime_names: List[str]):
+        self.symbols = list(symbols)
+        self.index = {symbol: n for n, symbol in enumerate(self.symbols)}
+        self.instants = instants
+        self.sell_prices = sell_prices
+        self.buy_prices = buy_prices
+        self.regimes = regimes
+        self.regime_names = regime_names
+
+    def __len__(self):
+        return self.sell_prices.size
+
+    def get_series(self, symbol) -> PriceSeries:
+        row = self.index[symbol]
+        return PriceSeries(symbol=symbol, instants=self.instants, sell_prices=self.sell_prices[row],
+                           buy_prices=self.buy_prices[row])
+
+    def to_series(self) -> List[PriceSeries]:
+        return [self.get_series(symbol) for symbol in self.symbols]
+
+    def get_regime(self, position) -> str:
+        return self.regime_names[self.regimes[position]]
+
+    def iter_prices(self) -> Iterator[CryptocurrencyPrice]:
+        """
+        Every sample, instant after instant.
+        """
+        for column, instant in enumerate(self.instants):
+            instant = pytz.utc.localize(datetime.utcfromtimestamp(instant))
+            for row, symbol in enumerate(self.symbols):
+                yield CryptocurrencyPrice(symbol=symbol, instant=instant,
+                                          sell_price=float(self.sell_prices[row, column]),
+                                          buy_price=float(self.buy_prices[row, column]))
+
+    def __str__(self):
+        return f'{len(self.symbols)} symbols x {len(self.instants)} instants'
+
+    def __repr__(self):
+        return self.__str__()
+
+
+def generate_market(symbols: Union[int, List[str]], days: float, start: Optional[datetime] = None, seed=None,
+                    resolution=300, daily_volatility=0.04, correlation=0.6, spread=0.005,
+                    regimes: Optional[Dict[str, dict]] = None, crashes_per_year=2.0, volatility_persistence=0.999,
+                    volatility_of_volatility=0.02, start_prices: Optional[List[float]] = None) -> SyntheticMarket:
+    """
+    Random market of `symbols` (a number of them, named SYN0, SYN1... or their names) sampled every
+    `resolution` seconds for `days` from `start` (days before now by default), generated with arrays only.
+
+    Log returns of every symbol are its sensitivity to the market times the market drift plus a shock whose
+    correlation with the shocks of the other symbols is `correlation`. The market drift comes from regimes
+    of random durations (DEFAULT_REGIMES) and crashes happening `crashes_per_year` times on average.
+    Volatility clusters: it is `daily_volatility` times the regime multiplier times a factor that follows
+    a persistent random walk in log space. `seed` is an int or a numpy Generator, same seed same market.
+    """
+    generator = _get_generator(seed)
+    if isinstance(symbols, int):
+        symbols = [f'SYN{n}' for n in range(symbols)]
+    regimes = regimes or DEFAULT_REGIMES
+    steps = int(days * 86400 / resolution)
+    steps_per_day = 86400 / resolution
+    start = start or pytz.utc.localize(datetime.utcnow()) - timedelta(days=days)
+    instants = start.timestamp() + np.arange(steps) * float(resolution)
+
+    # regime of every step, consecutive regimes differ
+    regime_names = list(regimes.keys())
+    regime_codes = _sample_regimes(generator, steps, steps_per_day, [regimes[name]['days'] for name in regime_names])
+    drift = np.array([regimes[name]['drift'] for name in regime_names])[regime_codes] / steps_per_day
+    volatility = np.array([regimes[name]['volatility'] for name in regime_names])[regime_codes]
+
+    # volatility clustering: log volatility is an AR(1) process, normalized to a mean factor of 1
+    log_volatility = lfilter([1.0], [1.0, -volatility_persistence],
+                             generator.normal(0.0, volatility_of_volatility, steps))
+    variance = volatility_of_volatility ** 2 / (1 - volatility_persistence ** 2)
+    volatility = volatility * np.exp(log_volatility - variance / 2) * daily_volatility / math.sqrt(steps_per_day)
+
+    for _ in range(generator.poisson(crashes_per_year * days / 365)):
+        length = max(int(generator.uniform(*CRASH_DAYS) * steps_per_day), 1)
+        first = int(generator.integers(0, max(steps - length, 1)))
+        drift[first:first + length] += math.log(1 - generator.uniform(*CRASH_DROP)) / length
+        volatility[first:first + length] *= CRASH_VOLATILITY
+
+    sensitivities = generator.uniform(0.7, 1.5, len(symbols))[:, np.newaxis]
+    symbol_volatilities = generator.lognormal(0.0, 0.3, len(symbols))[:, np.newaxis]
+    shocks = math.sqrt(correlation) * generator.standard_normal(steps) + \
+        math.sqrt(1 - correlation) * generator.standard_normal((len(symbols), steps))
+    returns = sensitivities * drift + symbol_volatilities * volatility * shocks
+    returns[:, 0] = 0.0
+
+    if start_prices is None:
+        start_prices = np.exp(generator.uniform(math.log(0.1), math.log(1000.0), len(symbols)))
+    sell_prices = np.asarray(start_prices, dtype=np.float64)[:, np.newaxis] * np.exp(np.cumsum(returns, axis=1))
+    return SyntheticMarket(symbols, instants, sell_prices, sell_prices * (1 + spread), regime_codes, regime_names)
+
+
+def _sample_regimes(generator, steps, steps_per_day, mean_days) -> np.ndarray:
+    codes, lengths, total = [], [], 0
+    previous = int(generator.integers(len(mean_days)))
+    while total < steps:
+        # enough regimes to cover the steps on average, more batches are drawn when they fall short
+        count = int(steps / (steps_per_day * min(mean_days))) + 1
+        batch = (previous + np.cumsum(generator.integers(1, len(mean_days), count))) % len(mean_days) \
+            if len(mean_days) > 1 else np.zeros(count, dtype=np.int64)
+        batch_lengths = np.maximum(generator.exponential(np.array(mean_days)[batch] * steps_per_day), 1).astype(int)
+        codes.append(batch)
+        lengths.append(batch_lengths)
+        total += int(batch_lengths.sum())
+        previous = int(batch[-1])
+    return np.repeat(np.concatenate(codes), np.concatenate(lengths))[:steps]
+
 
-        five_minutes_iterations = int(((current_dt + td) - current_dt).total_seconds() / 300)
-        current_iteration = 0
-        for _ in range(five_minutes_iterations):
-            current_price = (((end_price - start_price) / five_minutes_iterations) * current_iteration) + start_price
-
-            noise = current_price * 0.005
-            rand_a = int((current_price - noise) * 100)
-            rand_b = int((current_price + noise) * 100)
-            final_price = random.randint(rand_a, rand_b) / 100
-            currency_price = CryptocurrencyPrice(
-                symbol=symbol,
-                instant=current_dt,
-                sell_price=final_price,
-                buy_price=final_price
-            )
-            generated_prices.append(currency_price)
-            current_iteration += 1
-            current_dt += timedelta(seconds=300)
-
-    return generated_prices
+def _get_generator(seed) -> np.random.Generator:
+    return seed if isinstance(seed, np.random.Generator) else np.random.default_rng(seed)
@@ -0,0 +1,75 @@
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytz
+
+from trading.domain.tools.testing import generate_currency_prices, generate_currency_series, generate_market
+
+
+class GenerateCurrencyPricesTests(unittest.TestCase):
+    def test_phases(self):
+        now = pytz.utc.localize(datetime(2021, 3, 1))
+        phases = [
+            {'timedelta': timedelta(days=1), 'start_price': 100, 'end_price': 200},
+            {'timedelta': timedelta(hours=2), 'start_price': 200, 'end_price': 50},
+        ]
+        prices = generate_currency_prices(phases, symbol='BTC', now=now, seed=1)
+        self.assertEqual(len(prices), 288 + 24)
+        self.assertEqual(prices[0].instant, now - timedelta(days=1, hours=2))
+        self.assertEqual(prices[-1].instant, now - timedelta(minutes=5))
+        self.assertTrue(all(price.symbol == 'BTC' and price.sell_price == price.buy_price for price in prices))
+        self.assertTrue(99.5 <= prices[0].sell_price <= 100.5)
+        self.assertTrue(199 <= prices[288].sell_price <= 201)
+        self.assertEqual([price.sell_price for price in prices],
+                         generate_currency_series(phases, symbol='BTC', now=now, seed=1).sell_prices.tolist())
+
+
+class GenerateMarketTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.start = pytz.utc.localize(datetime(2021, 1, 1))
+
+    def test_reproducible(self):
+        market = generate_market(4, days=30, start=self.start, seed=7)
+        self.assertEqual(market.symbols, ['SYN0', 'SYN1', 'SYN2', 'SYN3'])
+        self.assertEqual(market.sell_prices.shape, (4, 30 * 288))
+        self.assertEqual(market.instants[0], self.start.timestamp())
+        self.assertTrue(np.all(np.diff(market.instants) == 300))
+        self.assertTrue(np.all(market.sell_prices > 0))
+        self.assertTrue(np.all(market.buy_prices > market.sell_prices))
+        other = generate_market(4, days=30, start=self.start, seed=7)
+        self.assertTrue(np.array_equal(market.sell_prices, other.sell_prices))
+        self.assertFalse(np.array_equal(market.sell_prices,
+                                        generate_market(4, days=30, start=self.start, seed=8).sell_prices))
+
+    def test_correlated_regimes_and_crashes(self):
+        market = generate_market(['AAA', 'BBB', 'CCC'], days=365, start=self.start, seed=3, correlation=0.8,
+                                 crashes_per_year=0)
+        returns = np.diff(np.log(market.sell_prices), axis=1)
+        self.assertTrue(np.all(np.corrcoef(returns)[np.triu_indices(3, 1)] > 0.6))
+        self.assertEqual(set(np.unique(market.regimes)), {0, 1, 2})
+        self.assertTrue(all(market.regime_names[market.regimes[n]] != market.regime_names[market.regimes[n + 1]]
+                            for n in np.flatnonzero(np.diff(market.regimes))))
+
+        # the same market with a crash, it is steeper than anything the regimes give
+        crashed = generate_market(['AAA', 'BBB', 'CCC'], days=365, start=self.start, seed=3, correlation=0.8,
+                                  crashes_per_year=10)
+        day = 288
+
+        def worst_day(prices):
+            return np.min(prices[:, day:] / prices[:, :-day])
+        self.assertLess(worst_day(crashed.sell_prices), worst_day(market.sell_prices))
+        self.assertLess(worst_day(crashed.sell_prices), 0.8)
+
+    def test_lazy_entities(self):
+        market = generate_market(['AAA', 'BBB'], days=1, start=self.start, seed=1, start_prices=[10.0, 20.0])
+        series = market.get_series('BBB')
+        self.assertTrue(np.shares_memory(series.sell_prices, market.sell_prices))
+        self.assertEqual((series[0].symbol, series[0].sell_price), ('BBB', 20.0))
+        self.assertEqual(series[5].instant, self.start + timedelta(minutes=25))
+
+        prices = list(market.iter_prices())
+        self.assertEqual(len(prices), len(market))
+        self.assertEqual([price.symbol for price in prices[:4]], ['AAA', 'BBB', 'AAA', 'BBB'])
+        self.assertEqual(prices[3].instant, self.start + timedelta(minutes=5))
+        self.assertEqual(prices[3].buy_price, market.buy_prices[1, 1])
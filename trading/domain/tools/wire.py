@@ -0,0 +1,53 @@
+import struct
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+PACKED_MAGIC = b'RBP1'
+_PACKED_HEADER = struct.Struct('<4sIq')
+
+
+def to_columns(instants: Sequence[float], sell_prices: Sequence, buy_prices: Sequence) -> Dict[str, list]:
+    """
+    Columnar form of a price series: integer epoch seconds of the first sample (`i0`), deltas in seconds
+    between consecutive samples (`di`, starting with 0) and the sell (`s`) and buy (`b`) prices.
+    """
+    seconds = np.asarray(instants, dtype=np.float64).round().astype(np.int64)
+    return {
+        'i0': int(seconds[0]) if len(seconds) > 0 else 0,
+        'di': np.diff(seconds, prepend=seconds[:1]).tolist(),
+        's': list(sell_prices),
+        'b': list(buy_prices),
+    }
+
+
+def from_columns(columns: Dict[str, list]) -> (List[int], List, List):
+    instants = (columns['i0'] + np.cumsum(np.asarray(columns['di'], dtype=np.int64))).tolist()
+    return instants, columns['s'], columns['b']
+
+
+def pack_prices(instants: Sequence[float], sell_prices: Sequence, buy_prices: Sequence) -> bytes:
+    """
+    Little-endian binary form of a price series: magic, sample count and first epoch second, then int32 deltas
+    in seconds, float64 sell prices and float64 buy prices (NaN for missing prices).
+    """
+    columns = to_columns(instants, [], [])
+    return b''.join([
+        _PACKED_HEADER.pack(PACKED_MAGIC, len(columns['di']), columns['i0']),
+        np.asarray(columns['di'], dtype='<i4').tobytes(),
+        np.asarray(sell_prices, dtype='<f8').tobytes(),
+        np.asarray(buy_prices, dtype='<f8').tobytes(),
+    ])
+
+
+def unpack_prices(data: bytes) -> (np.ndarray, np.ndarray, np.ndarray):
+    magic, count, first = _PACKED_HEADER.unpack_from(data)
+    if magic != PACKED_MAGIC:
+        raise ValueError('Not a packed prices payload')
+    offset = _PACKED_HEADER.size
+    deltas = np.frombuffer(data, dtype='<i4', count=count, offset=offset)
+    offset += 4 * count
+    sell_prices = np.frombuffer(data, dtype='<f8', count=count, offset=offset)
+    offset += 8 * count
+    buy_prices = np.frombuffer(data, dtype='<f8', count=count, offset=offset)
+    return first + np.cumsum(deltas, dtype=np.int64), sell_prices, buy_prices
@@ -0,0 +1,42 @@
+import unittest
+
+import numpy as np
+
+from trading.domain.tools.wire import from_columns, pack_prices, to_columns, unpack_prices
+
+
+class WireTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.instants = [1612137600.25 + n * 300 + (n % 3) for n in range(100)]
+        self.sell_prices = [100.0 + n * 0.125 for n in range(100)]
+        self.buy_prices = [101.0 + n * 0.125 for n in range(100)]
+        self.buy_prices[10] = None
+
+    def test_columns(self):
+        columns = to_columns(self.instants, self.sell_prices, self.buy_prices)
+        self.assertEqual(columns['i0'], 1612137600)
+        self.assertEqual(columns['di'][:4], [0, 301, 301, 298])
+        instants, sell_prices, buy_prices = from_columns(columns)
+        self.assertEqual(instants, [round(i) for i in self.instants])
+        self.assertEqual(sell_prices, self.sell_prices)
+        self.assertEqual(buy_prices, self.buy_prices)
+
+    def test_packed(self):
+        data = pack_prices(self.instants, self.sell_prices, self.buy_prices)
+        self.assertEqual(len(data), 16 + 100 * 20)
+        instants, sell_prices, buy_prices = unpack_prices(data)
+        self.assertEqual(instants.tolist(), [round(i) for i in self.instants])
+        self.assertEqual(sell_prices.tolist(), self.sell_prices)
+        self.assertTrue(np.isnan(buy_prices[10]))
+        self.assertEqual(buy_prices[11], self.buy_prices[11])
+
+    def test_empty(self):
+        self.assertEqual(from_columns(to_columns([], [], [])), ([], [], []))
+        instants, sell_prices, buy_prices = unpack_prices(pack_prices([], [], []))
+        self.assertEqual(len(instants), 0)
+        with self.assertRaises(ValueError):
+            unpack_prices(b'NOPE' + b'\x00' * 12)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+from typing import Dict, List, Tuple
+
+from shared.domain.configurations import server_set_many
+from shared.domain.system_logs import add_system_logs
+from trading.domain.entities import Cryptocurrency, Package, PositionSummary
+from trading.domain.interfaces import ILocalStorage
+
+
+class UnitOfWork(ILocalStorage):
+    """
+    Local storage that buffers the package writes, system logs and server configurations of a trading tick
+    and flushes all of them in a single transaction.
+    Reads go to the wrapped storage and do not see the buffered writes.
+
+        with UnitOfWork(storage) as unit_of_work:
+            unit_of_work.save_package(package)
+            unit_of_work.add_system_log('BUY', 'BUY BTC 10')
+
+    The buffer is flushed when the block exits, also when it raises: the writes record conversions already
+    done at the source, which must not be forgotten because a later one failed.
+    """
+    def __init__(self, storage: ILocalStorage):
+        self.storage = storage
+        self._saved_packages: List[Package] = []
+        self._deleted_packages: List[Package] = []
+        self._system_logs: List[Tuple[str, str]] = []
+        self._server_configurations: Dict[str, dict] = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.commit()
+
+    def save_package(self, package: Package):
+        if not any(saved is package for saved in self._saved_packages):
+            self._saved_packages.append(package)
+
+    def save_packages(self, packages: List[Package]):
+        for package in packages:
+            self.save_package(package)
+
+    def delete_package(self, package: Package):
+        # packages created in the same unit of work are never written
+        self._saved_packages = [saved for saved in self._saved_packages if saved is not package]
+        if package.id is not None:
+            self._deleted_packages.append(package)
+
+    def delete_packages(self, packages: List[Package]):
+        for package in packages:
+            self.delete_package(package)
+
+    def get_cryptocurrency_packages(self, cryptocurrency: Cryptocurrency) -> List[Package]:
+        return self.storage.get_cryptocurrency_packages(cryptocurrency)
+
+    def get_all_packages_grouped(self) -> Dict[str, List[Package]]:
+        return self.storage.get_all_packages_grouped()
+
+    def get_position_summaries(self) -> Dict[str, PositionSummary]:
+        return self.storage.get_position_summaries()
+
+    def add_system_log(self, log_type: str, text):
+        self._system_logs.append((log_type, str(text)))
+
+    def server_set(self, key: str, data: dict):
+        self._server_configurations[key] = data
+
+    @property
+    def pending(self) -> int:
+        return len(self._saved_packages) + len(self._deleted_packages) + len(self._system_logs) + \
+            len(self._server_configurations)
+
+    def commit(self):
+        from django.db import transaction
+
+        if self.pending == 0:
+            return
+        with transaction.atomic():
+            self.storage.delete_packages(self._deleted_packages)
+            self.storage.save_packages(self._saved_packages)
+            add_system_logs(self._system_logs)
+            if len(self._server_configurations) > 0:
+                server_set_many(self._server_configurations)
+        self.rollback()
+
+    def rollback(self):
+        self._saved_packages = []
+        self._deleted_packages = []
+        self._system_logs = []
+        self._server_configurations = {}
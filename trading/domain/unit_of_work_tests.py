@@ -0,0 +1,53 @@
+from datetime import datetime
+
+import pytz
+from django.test import TestCase
+
+from shared.application.models import DSystemLog
+from shared.domain.configurations import server_get
+from trading.application.django_models import DPackage, DPositionSummary
+from trading.domain.entities import Package
+from trading.domain.unit_of_work import UnitOfWork
+from trading.infrastructure.django_storage import DjangoLocalStorage
+
+
+class UnitOfWorkTests(TestCase):
+    def setUp(self) -> None:
+        self.storage = DjangoLocalStorage()
+        self.now = pytz.utc.localize(datetime(2021, 2, 1))
+
+    def _package(self, symbol, amount):
+        return Package(currency_symbol=symbol, currency_amount=amount, bought_at_price=10.0,
+                       operation_datetime=self.now)
+
+    def test_buffers_until_exit(self):
+        sold = self._package('BTC', 1.0)
+        self.storage.save_package(sold)
+
+        with UnitOfWork(self.storage) as unit_of_work:
+            bought = [self._package('ETH', 2.0), self._package('ADA', 3.0)]
+            unit_of_work.save_packages(bought)
+            unit_of_work.save_package(bought[0])
+            unit_of_work.delete_package(sold)
+            unit_of_work.add_system_log('BUY', 'BUY ETH 2.0')
+            unit_of_work.server_set('unit_of_work_key', {'value': 1})
+            self.assertEqual(unit_of_work.pending, 5)
+            self.assertEqual(list(DPackage.objects.values_list('currency_symbol', flat=True)), ['BTC'])
+            self.assertFalse(DSystemLog.objects.filter(log_type='BUY').exists())
+
+        self.assertEqual(unit_of_work.pending, 0)
+        self.assertEqual(sorted(DPackage.objects.values_list('currency_symbol', flat=True)), ['ADA', 'ETH'])
+        self.assertEqual(sorted(DPositionSummary.objects.values_list('currency_symbol', flat=True)), ['ADA', 'ETH'])
+        self.assertTrue(all(package.id is not None for package in bought))
+        self.assertEqual(DSystemLog.objects.filter(log_type='BUY').count(), 1)
+        self.assertEqual(server_get('unit_of_work_key').data, {'value': 1})
+
+    def test_flushes_when_raising(self):
+        with self.assertRaises(RuntimeError):
+            with UnitOfWork(self.storage) as unit_of_work:
+                unit_of_work.save_package(self._package('BTC', 1.0))
+                discarded = self._package('ETH', 1.0)
+                unit_of_work.save_package(discarded)
+                unit_of_work.delete_package(discarded)
+                raise RuntimeError('conversion failed')
+        self.assertEqual(list(DPackage.objects.values_list('currency_symbol', flat=True)), ['BTC'])
@@ -1,23 +1,40 @@
 import os
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from json.decoder import JSONDecodeError
-from typing import List, Optional
+from typing import Dict, List, Optional, Sequence
 
 import pytz
 import requests
-from coinbase.wallet.error import NotFoundError
+from django.conf import settings
+from coinbase.wallet.error import NotFoundError, APIError
 from requests.auth import HTTPBasicAuth
 
-from shared.domain.configurations import server_get, server_set
+from shared.domain.configurations import server_get, server_get_many, server_set
+from shared.domain.dependencies import dependency_dispatcher
 from shared.domain.periodic_tasks import schedule
 from trading.application.django_models import DCryptocurrencyPrice
 from trading.domain.entities import Cryptocurrency, CryptocurrencyPrice
-from trading.domain.interfaces import ICryptoCurrencySource
-from coinbase.wallet.client import Client
+from trading.domain.interfaces import ICryptoCurrencySource, IPriceStore
+from trading.infrastructure.coinbase_pool import CoinbaseClientPool, PooledClientProxy
+from trading.infrastructure.memmap_price_store import MemmapPriceStore
+from trading.infrastructure.remote_prices import RemotePricesCache
 
 from trading.domain.tools.browser import get_current_browser_driver
 from trading.domain.tools.money import two_decimals_floor
+from trading.domain.tools.prices import PricesIndex
+
+# seconds that the decoded price blobs are reused before reading them again
+PRICES_INDEX_TTL = 60
+
+REMOTE_URL = 'https://rob.idiet.fit/'
+
+# pairs quoted again on every price sample to refresh their spreads, the ones learned longest ago first
+SPREAD_REFRESHES = 4
+# seconds after which a learned spread is not applied anymore, its pair is quoted instead
+SPREAD_MAX_AGE = 2 * 3600
 
 coinbase_attribute_conv_table = {
     'BTC': 'convert-to-select-bitcoin',
@@ -66,18 +83,48 @@ coinbase_attribute_conv_table = {
 class CoinbaseCryptoCurrencySource(ICryptoCurrencySource):
     driver = None
 
+    _prices_index = None
+    _prices_index_keys = None
+    _prices_index_ts = None
+    _remote_prices_cache = None
+
+    def __init__(self, native_currency='EUR', api_uri=None, api_key=None, api_secret=None,
+                 client_pool_size=8, client_timeout=10.0):
+        super().__init__(native_currency=native_currency)
+        self.api_uri = api_uri
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.client_pool_size = client_pool_size
+        self.client_timeout = client_timeout
+        self._client_pool = None
+        self._client_pool_lock = threading.Lock()
+        # symbol: (sell price / mid price - 1, buy price / mid price - 1, epoch learned at)
+        self._spreads = {}
+        self._spreads_lock = threading.Lock()
+
     @property
     def _client(self):
-        api_key = os.environ['API_KEY']
-        api_secret = os.environ['API_SECRET']
-        return Client(api_key, api_secret, api_version='2016-04-12')
+        if self._client_pool is None:
+            with self._client_pool_lock:
+                if self._client_pool is None:
+                    self._client_pool = CoinbaseClientPool(
+                        self.api_key or os.environ['API_KEY'],
+                        self.api_secret or os.environ['API_SECRET'],
+                        api_uri=self.api_uri,
+                        size=self.client_pool_size,
+                        timeout=self.client_timeout,
+                    )
+        return PooledClientProxy(self._client_pool)
 
     def get_trading_cryptocurrencies(self) -> List[Cryptocurrency]:
-        ignored_coinbase_currencies_data = server_get('ignored_coinbase_currencies', default_data={'items': []}).data
-        ignored_coinbase_currencies = ignored_coinbase_currencies_data.get('items')
+        configurations = server_get_many(['ignored_coinbase_currencies', 'trading_cryptocurrencies'], default_data={
+            'ignored_coinbase_currencies': {'items': []},
+            'trading_cryptocurrencies': {},
+        })
+        ignored_coinbase_currencies = configurations['ignored_coinbase_currencies'].data.get('items')
 
         now_ts = pytz.utc.localize(datetime.utcnow()).timestamp()
-        trading_cryptocurrencies_data = server_get('trading_cryptocurrencies', default_data={}).data
+        trading_cryptocurrencies_data = configurations['trading_cryptocurrencies'].data
         last_ts = trading_cryptocurrencies_data.get('ts', None)
         cryptocurrencies = trading_cryptocurrencies_data.get('cryptocurrencies', [])
 
@@ -137,45 +184,137 @@ class CoinbaseCryptoCurrencySource(ICryptoCurrencySource):
         except NotFoundError:
             return None
 
-    def get_last_month_prices(self, cryptocurrency: Cryptocurrency) -> List[CryptocurrencyPrice]:
+    def get_current_prices(self, cryptocurrencies: List[Cryptocurrency], now: Optional[datetime] = None,
+                           max_workers: int = 8) -> List[CryptocurrencyPrice]:
+        """
+        Snapshot of every price from a single exchange rates request, which gives the mid price of each pair.
+        Sell and buy prices are the mid price moved by the spread of the pair, learned from its real sell and
+        buy quotes. Pairs are quoted by a bounded pool of threads, and those quotes are the stored prices,
+        when their spread is unknown or older than SPREAD_MAX_AGE, or when they are missing from the rates.
+        Every sample also quotes the SPREAD_REFRESHES pairs whose spreads were learned longest ago.
+        """
+        now = now or pytz.utc.localize(datetime.utcnow())
+        if len(cryptocurrencies) == 0:
+            return []
+        mid_prices = self._get_mid_prices()
+        with self._spreads_lock:
+            spreads = {symbol: spread for symbol, spread in self._spreads.items()
+                       if symbol in mid_prices and now.timestamp() - spread[2] <= SPREAD_MAX_AGE}
+        refreshed = sorted((c.symbol for c in cryptocurrencies if c.symbol in spreads),
+                           key=lambda symbol: spreads[symbol][2])[:SPREAD_REFRESHES]
+
+        prices = []
+        quoted = []
+        for cryptocurrency in cryptocurrencies:
+            spread = spreads.get(cryptocurrency.symbol)
+            if spread is None or cryptocurrency.symbol in refreshed:
+                quoted.append(cryptocurrency)
+                continue
+            mid_price = mid_prices[cryptocurrency.symbol]
+            prices.append(CryptocurrencyPrice(
+                symbol=cryptocurrency.symbol,
+                instant=now,
+                sell_price=mid_price * (1.0 + spread[0]),
+                buy_price=mid_price * (1.0 + spread[1]),
+            ))
+        if len(quoted) == 0:
+            return prices
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(quoted)))) as executor:
+            quoted_prices = [price for price in executor.map(lambda c: self._get_pair_price(c, now), quoted)
+                             if price is not None]
+        with self._spreads_lock:
+            for price in quoted_prices:
+                mid_price = mid_prices.get(price.symbol)
+                if mid_price is not None:
+                    self._spreads[price.symbol] = (price.sell_price / mid_price - 1.0,
+                                                   price.buy_price / mid_price - 1.0, now.timestamp())
+        return prices + quoted_prices
+
+    def _get_mid_prices(self) -> Dict[str, float]:
+        """
+        Price in the native currency of every cryptocurrency in the exchange rates, empty if they can not
+        be requested, so every pair is quoted.
+        """
+        try:
+            rates = self._client.get_exchange_rates(currency=self.native_currency).rates
+        except (APIError, JSONDecodeError, requests.RequestException) as e:
+            print(f'EXCHANGE RATES ERROR: {e!r}')
+            return {}
+        mid_prices = {}
+        for symbol, rate in rates.items():
+            try:
+                rate = float(rate)
+            except (TypeError, ValueError):
+                continue
+            if rate > 0.0 and symbol != self.native_currency:
+                mid_prices[symbol] = 1.0 / rate
+        return mid_prices
+
+    def _get_pair_price(self, cryptocurrency: Cryptocurrency, now: datetime) -> Optional[CryptocurrencyPrice]:
+        # a failing currency is left out of the sample instead of losing the whole sample
+        try:
+            sell_price = self.get_current_sell_price(cryptocurrency)
+            buy_price = self.get_current_buy_price(cryptocurrency)
+        except (APIError, JSONDecodeError, requests.RequestException) as e:
+            print(f'PRICE ERROR {cryptocurrency.symbol}: {e!r}')
+            return None
+        if sell_price is None or buy_price is None:
+            return None
+        return CryptocurrencyPrice(
+            symbol=cryptocurrency.symbol,
+            instant=now,
+            sell_price=sell_price,
+            buy_price=buy_price,
+        )
+
+    def get_last_month_prices(self, cryptocurrency: Cryptocurrency) -> Sequence[CryptocurrencyPrice]:
         if cryptocurrency is None:
             return []
 
         # return self._get_last_month_prices_remote(cryptocurrency)
         now = pytz.utc.localize(datetime.utcnow())
-
-        current_prices_data = server_get(_get_current_prices_key(), default_data={}).data
-        previous_prices_data = server_get(_get_previous_prices_key(), default_data={}).data
-
-        current_prices = current_prices_data.get('current_prices', [])
-        current_prices += previous_prices_data.get('current_prices', [])
-
-        native_prices = []
-        for price in current_prices:
-            if price['symbol'] != cryptocurrency.symbol:
-                continue
-            instant = pytz.utc.localize(datetime.utcfromtimestamp(price['instant']))
-            if instant < now - timedelta(days=30):
-                continue
-            native_prices.append(CryptocurrencyPrice(
-                symbol=price['symbol'],
-                instant=instant,
-                sell_price=price['sell_price'],
-                buy_price=price['buy_price'],
-            ))
-        native_prices.sort(key=lambda p: p.instant)
-        return native_prices
-
-    def _get_last_month_prices_remote(self, cryptocurrency: Cryptocurrency):
-        auth = HTTPBasicAuth(os.environ.get('REMOTE_USER'), os.environ.get('REMOTE_PASS'))
-        response = requests.get(f'https://rob.idiet.fit/api/month-prices/{cryptocurrency.symbol}/', auth=auth)
-        data = response.json()
-        return [CryptocurrencyPrice(
-            symbol=p['symbol'],
-            instant=pytz.utc.localize(datetime.utcfromtimestamp(p['instant'])),
-            sell_price=p['sell_price'],
-            buy_price=p['buy_price'],
-        ) for p in data]
+        price_store: IPriceStore = dependency_dispatcher.request_implementation(IPriceStore)
+        if price_store is not None:
+            series = price_store.get_series(cryptocurrency.symbol, since=now - timedelta(days=30))
+            if len(series) > 0:
+                return series
+        return self._get_prices_index(now=now).get_prices(cryptocurrency.symbol, since=now - timedelta(days=30))
+
+    def _get_prices_index(self, now=None) -> PricesIndex:
+        """
+        The bimonthly price blobs hold every symbol, so they are decoded once and indexed by symbol.
+        The index is reused by every currency of the same tick and rebuilt when it gets older than
+        PRICES_INDEX_TTL seconds or the blob keys rotate.
+        """
+        now = now or pytz.utc.localize(datetime.utcnow())
+        keys = (_get_current_prices_key(now=now), _get_previous_prices_key(now=now))
+        if self._prices_index is not None and self._prices_index_keys == keys and \
+                now.timestamp() - self._prices_index_ts < PRICES_INDEX_TTL:
+            return self._prices_index
+
+        configurations = server_get_many(list(keys), default_data={key: {} for key in keys})
+        current_prices_data = configurations[keys[0]].data
+        previous_prices_data = configurations[keys[1]].data
+        rows = current_prices_data.get('current_prices', []) + previous_prices_data.get('current_prices', [])
+
+        self._prices_index = PricesIndex(rows)
+        self._prices_index_keys = keys
+        self._prices_index_ts = now.timestamp()
+        return self._prices_index
+
+    def _get_last_month_prices_remote(self, cryptocurrency: Cryptocurrency) -> Sequence[CryptocurrencyPrice]:
+        return self._get_remote_prices_cache().get_prices(cryptocurrency.symbol)
+
+    def _get_remote_prices_cache(self) -> RemotePricesCache:
+        if self._remote_prices_cache is None:
+            auth = HTTPBasicAuth(os.environ.get('REMOTE_USER'), os.environ.get('REMOTE_PASS'))
+            self._remote_prices_cache = RemotePricesCache(
+                os.environ.get('REMOTE_URL', REMOTE_URL),
+                MemmapPriceStore(settings.REMOTE_PRICES_STORE_DIR),
+                auth=auth,
+            )
+        return self._remote_prices_cache
 
     def start_conversions(self):
         # TODO test login
@@ -0,0 +1,158 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+from coinbase.wallet.client import Client
+from requests.adapters import HTTPAdapter
+
+API_VERSION = '2016-04-12'
+
+
+class _TimeoutSession(requests.Session):
+    def __init__(self, timeout=None):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+class _PooledClient(Client):
+    """
+    Coinbase client whose session applies default timeouts and keeps its connections alive.
+    """
+    def __init__(self, api_key, api_secret, base_api_uri=None, api_version=None, timeout=None):
+        self._timeout = timeout
+        super().__init__(api_key, api_secret, base_api_uri=base_api_uri, api_version=api_version)
+        self.last_used = time.monotonic()
+
+    def _build_session(self, auth_class, *args, **kwargs):
+        session = _TimeoutSession(timeout=self._timeout)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.auth = auth_class(*args, **kwargs)
+        session.headers.update({'CB-VERSION': self.API_VERSION,
+                                'Accept': 'application/json',
+                                'Content-Type': 'application/json',
+                                'User-Agent': 'coinbase/python/2.0'})
+        return session
+
+
+class CoinbaseClientPool:
+    """
+    Bounded pool of Coinbase clients with persistent HTTP sessions.
+    Clients idle for more than `health_check_interval` seconds are checked against the API before being
+    reused. Clients that failed with a connection error are replaced by new ones.
+    """
+    def __init__(self, api_key, api_secret, api_uri=None, size=4, timeout=10.0, health_check_interval=60.0):
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.api_uri = api_uri
+        self.size = size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def client(self):
+        client = self._acquire()
+        try:
+            yield client
+        except requests.ConnectionError:
+            self._discard(client)
+            raise
+        except BaseException:
+            self._release(client)
+            raise
+        else:
+            self._release(client)
+
+    def health_check(self):
+        """
+        Checks every idle client, returns how many of them were discarded.
+        """
+        discarded = 0
+        clients = []
+        while True:
+            try:
+                clients.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        for client in clients:
+            if self._is_healthy(client):
+                self._release(client)
+            else:
+                self._discard(client)
+                discarded += 1
+        return discarded
+
+    def close(self):
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+    def _acquire(self):
+        while True:
+            try:
+                client = self._idle.get_nowait()
+            except queue.Empty:
+                client = self._create_or_wait()
+            if time.monotonic() - client.last_used < self.health_check_interval or self._is_healthy(client):
+                return client
+            self._discard(client)
+
+    def _create_or_wait(self):
+        with self._lock:
+            can_create = self._created < self.size
+            if can_create:
+                self._created += 1
+        if can_create:
+            try:
+                return _PooledClient(self.api_key, self.api_secret, base_api_uri=self.api_uri,
+                                     api_version=API_VERSION, timeout=self.timeout)
+            except BaseException:
+                with self._lock:
+                    self._created -= 1
+                raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f'No Coinbase client released in {self.timeout} seconds')
+
+    def _release(self, client):
+        client.last_used = time.monotonic()
+        self._idle.put(client)
+
+    def _discard(self, client):
+        client.session.close()
+        with self._lock:
+            self._created -= 1
+
+    def _is_healthy(self, client):
+        try:
+            client.get_time()
+            return True
+        except Exception:
+            return False
+
+
+class PooledClientProxy:
+    """
+    Exposes the Coinbase client API, borrowing a client from the pool for every call.
+    """
+    def __init__(self, pool: CoinbaseClientPool):
+        self._pool = pool
+
+    def __getattr__(self, name):
+        def _call(*args, **kwargs):
+            with self._pool.client() as client:
+                return getattr(client, name)(*args, **kwargs)
+        return _call
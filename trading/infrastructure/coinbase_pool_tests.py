@@ -0,0 +1,59 @@
+import threading
+import unittest
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+from trading.infrastructure.coinbase_pool import CoinbaseClientPool, PooledClientProxy
+from trading.infrastructure.coinbase_testing import FakeCoinbaseServer
+
+
+class CoinbaseClientPoolTests(unittest.TestCase):
+    def setUp(self) -> None:
+        warnings.simplefilter('ignore', UserWarning)
+
+    def tearDown(self) -> None:
+        warnings.resetwarnings()
+
+    def test_clients_are_reused(self):
+        with FakeCoinbaseServer({'BTC': (100.0, 101.0)}) as server:
+            pool = CoinbaseClientPool('key', 'secret', api_uri=server.base_url, size=4)
+            with pool.client() as first_client:
+                pass
+            for _ in range(5):
+                with pool.client() as client:
+                    self.assertIs(client, first_client)
+                    self.assertEqual(client.get_sell_price(currency_pair='BTC-EUR').amount, '100.0')
+            pool.close()
+
+    def test_pool_size_is_bounded(self):
+        clients = set()
+        clients_lock = threading.Lock()
+        with FakeCoinbaseServer({'BTC': (100.0, 101.0)}, latency=0.05) as server:
+            pool = CoinbaseClientPool('key', 'secret', api_uri=server.base_url, size=2)
+
+            def call(_):
+                with pool.client() as client:
+                    with clients_lock:
+                        clients.add(id(client))
+                    return client.get_sell_price(currency_pair='BTC-EUR').amount
+
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                amounts = list(executor.map(call, range(8)))
+            pool.close()
+        self.assertEqual(amounts, ['100.0'] * 8)
+        self.assertLessEqual(len(clients), 2)
+
+    def test_health_check_discards_unresponsive_clients(self):
+        with FakeCoinbaseServer({'BTC': (100.0, 101.0)}) as server:
+            pool = CoinbaseClientPool('key', 'secret', api_uri=server.base_url, size=2, timeout=0.2)
+            PooledClientProxy(pool).get_time()
+            self.assertEqual(pool.health_check(), 0)
+            server.latency = 0.5
+            self.assertEqual(pool.health_check(), 1)
+            server.latency = 0.0
+            self.assertIsNotNone(PooledClientProxy(pool).get_time())
+            pool.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
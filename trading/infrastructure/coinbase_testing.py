@@ -0,0 +1,119 @@
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+
+class FakeCoinbaseServer:
+    """
+    Local HTTP stand-in of the Coinbase API endpoints used by CoinbaseCryptoCurrencySource.
+    `prices` maps symbols to (sell_price, buy_price). Every request waits `latency` seconds.
+    Prices of `failing_symbols` are answered with 429 (rate limit exceeded).
+    Exchange rates hold the mid price of `rate_symbols` (every priced symbol by default), or are answered
+    with 404 when `exchange_rates` is False.
+    `max_in_flight` is the peak of requests being answered at the same time.
+
+        with FakeCoinbaseServer({'BTC': (100.0, 101.0)}) as server:
+            source = CoinbaseCryptoCurrencySource(api_uri=server.base_url, api_key='k', api_secret='s')
+    """
+    def __init__(self, prices=None, latency=0.0, native_currency='EUR', failing_symbols=None, exchange_rates=True,
+                 rate_symbols=None):
+        self.prices = prices or {}
+        self.latency = latency
+        self.native_currency = native_currency
+        self.failing_symbols = failing_symbols or []
+        self.exchange_rates = exchange_rates
+        self.rate_symbols = rate_symbols
+        self.requests = []
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def start(self):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._build_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def handle(self, path):
+        with self._lock:
+            self.requests.append(path)
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        try:
+            if self.latency > 0:
+                time.sleep(self.latency)
+            return self._answer(path)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _answer(self, path):
+        match = re.match(r'^/v2/prices/([^/]+)-([^/]+)/(sell|buy|spot)$', path)
+        if match is not None:
+            symbol, currency, side = match.groups()
+            if symbol in self.failing_symbols:
+                return 429, {'errors': [{'id': 'rate_limit_exceeded', 'message': 'Too many requests'}]}
+            if symbol not in self.prices or currency != self.native_currency:
+                return 404, {'errors': [{'id': 'not_found', 'message': 'Invalid currency'}]}
+            sell_price, buy_price = self.prices[symbol]
+            amount = sell_price if side == 'sell' else buy_price
+            return 200, {'data': {'base': symbol, 'currency': currency, 'amount': str(amount)}}
+
+        if path == '/v2/exchange-rates' and self.exchange_rates:
+            rate_symbols = self.rate_symbols if self.rate_symbols is not None else self.prices.keys()
+            rates = {symbol: str(2.0 / sum(self.prices[symbol])) for symbol in rate_symbols}
+            rates[self.native_currency] = '1.0'
+            return 200, {'data': {'currency': self.native_currency, 'rates': rates}}
+
+        if path == '/v2/time':
+            return 200, {'data': {'iso': '2021-02-16T10:00:00Z', 'epoch': int(time.time())}}
+
+        return 404, {'errors': [{'id': 'not_found', 'message': 'Not found'}]}
+
+    def _build_handler(self):
+        fake_server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # headers and body are written separately, Nagle would delay keep-alive responses
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                status, body = fake_server.handle(urlparse(self.path).path)
+                content = json.dumps(body).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(content)))
+                    self.end_headers()
+                    self.wfile.write(content)
+                except (BrokenPipeError, ConnectionResetError):
+                    # the client gave up waiting (timeouts tests)
+                    self.close_connection = True
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
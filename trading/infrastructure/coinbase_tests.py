@@ -1,12 +1,15 @@
-import time
 import unittest
-from datetime import datetime
+import warnings
+from datetime import datetime, timedelta
 
+import pytz
 from selenium.common.exceptions import NoSuchElementException
 
+from trading.domain.entities import Cryptocurrency
 from trading.domain.tools.browser import get_current_browser_driver
 from trading.infrastructure.coinbase import _get_current_prices_key, _get_previous_prices_key, \
-    coinbase_attribute_conv_table, CoinbaseCryptoCurrencySource
+    coinbase_attribute_conv_table, CoinbaseCryptoCurrencySource, SPREAD_MAX_AGE
+from trading.infrastructure.coinbase_testing import FakeCoinbaseServer
 
 
 class CoinbaseTests(unittest.TestCase):
@@ -77,3 +80,77 @@ class CoinbaseTests(unittest.TestCase):
         target = source.get_trading_cryptocurrency('BTC')
         source.convert(sour, 10.0, target, test=True)
         source.finish_conversions()
+
+
+class CoinbasePricesSamplingTests(unittest.TestCase):
+    def setUp(self) -> None:
+        warnings.simplefilter('ignore', UserWarning)
+        self.prices = {f'C{n}': (float(n), float(n) + 0.5) for n in range(1, 13)}
+        self.currencies = [Cryptocurrency(symbol=symbol, metadata={}) for symbol in self.prices.keys()]
+
+    def tearDown(self) -> None:
+        warnings.resetwarnings()
+
+    def _source(self, server):
+        return CoinbaseCryptoCurrencySource(native_currency='EUR', api_uri=server.base_url,
+                                            api_key='key', api_secret='secret')
+
+    def test_prices(self):
+        with FakeCoinbaseServer(self.prices, latency=0.05) as server:
+            prices = self._source(server).get_current_prices(
+                self.currencies + [Cryptocurrency(symbol='MISSING', metadata={})], max_workers=13)
+
+        self.assertEqual(sorted(p.symbol for p in prices), sorted(self.prices.keys()))
+        for price in prices:
+            self.assertEqual((price.sell_price, price.buy_price), self.prices[price.symbol])
+        self.assertEqual(len(set(p.instant for p in prices)), 1)
+        # exchange rates and every pair, no spread is known yet
+        self.assertEqual(len(server.requests), 27)
+        # the pairs are requested concurrently
+        self.assertGreater(server.max_in_flight, 1)
+
+    def test_bounded_pool(self):
+        with FakeCoinbaseServer(self.prices, latency=0.05) as server:
+            prices = self._source(server).get_current_prices(self.currencies, max_workers=4)
+        self.assertEqual(len(prices), 12)
+        self.assertLessEqual(server.max_in_flight, 4)
+
+    def test_failing_pair(self):
+        # without exchange rates every pair is quoted
+        with FakeCoinbaseServer(self.prices, failing_symbols=['C2'], exchange_rates=False) as server:
+            prices = self._source(server).get_current_prices(self.currencies[:4])
+        self.assertEqual(sorted(p.symbol for p in prices), ['C1', 'C3', 'C4'])
+        for price in prices:
+            self.assertEqual((price.sell_price, price.buy_price), self.prices[price.symbol])
+
+    def _sample(self, server, source, now):
+        del server.requests[:]
+        prices = source.get_current_prices(self.currencies, now=now)
+        self.assertEqual(len(prices), 12)
+        self.assertEqual(len(set(p.instant for p in prices)), 1)
+        return {price.symbol: price for price in prices}, sorted({path.split('/')[3] for path in server.requests
+                                                                  if path.startswith('/v2/prices/')})
+
+    def test_snapshot_prices(self):
+        now = pytz.utc.localize(datetime(2021, 2, 16, 10))
+        with FakeCoinbaseServer(self.prices, rate_symbols=[f'C{n}' for n in range(1, 12)]) as server:
+            source = self._source(server)
+            prices, quoted = self._sample(server, source, now)
+            self.assertEqual(len(quoted), 12)
+            self.assertEqual(server.requests[0], '/v2/exchange-rates')
+
+            # the oldest spreads are refreshed and C12 has no mid price, the rest follow the mid prices
+            server.prices['C8'] = (16.0, 17.0)
+            prices, quoted = self._sample(server, source, now + timedelta(minutes=5))
+            self.assertEqual(quoted, ['C1-EUR', 'C12-EUR', 'C2-EUR', 'C3-EUR', 'C4-EUR'])
+            self.assertEqual(len(server.requests), 11)
+            for symbol, price in prices.items():
+                self.assertAlmostEqual(price.sell_price, server.prices[symbol][0])
+                self.assertAlmostEqual(price.buy_price, server.prices[symbol][1])
+
+            prices, quoted = self._sample(server, source, now + timedelta(minutes=10))
+            self.assertEqual(quoted, ['C12-EUR', 'C5-EUR', 'C6-EUR', 'C7-EUR', 'C8-EUR'])
+
+            # spreads too old are not applied
+            prices, quoted = self._sample(server, source, now + timedelta(seconds=SPREAD_MAX_AGE + 1200))
+            self.assertEqual(len(quoted), 12)
@@ -0,0 +1,184 @@
+import re
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+import pytz
+from django.conf import settings
+from django.db import connection, transaction
+
+from shared.domain.configurations import invalidate_configurations_cache
+from shared.domain.dependencies import dependency_dispatcher
+from trading.application.django_models import DCryptocurrencyPrice, DPriceRollup
+from trading.domain.entities import CryptocurrencyPrice
+from trading.domain.interfaces import IPriceStore
+from trading.domain.tools.rollups import DAILY, ROLLUP_RESOLUTIONS, add_prices_to_rollups, get_bucket_instant
+from trading.infrastructure.django_rollups import ROLLUP_FIELDS
+from trading.infrastructure.memmap_price_store import MemmapPriceStore
+
+DEFAULT_RAW_DAYS = 90
+DEFAULT_BATCH_SIZE = 5000
+DEFAULT_MAX_BATCHES = 100
+DEFAULT_VACUUM_PAGES = 10000
+
+_PRICES_KEY_REGEX = re.compile(r'^prices_(\d+)_(\d+)$')
+
+
+def apply_prices_retention(raw_days=DEFAULT_RAW_DAYS, batch_size=DEFAULT_BATCH_SIZE,
+                           max_batches: Optional[int] = DEFAULT_MAX_BATCHES, vacuum_pages=DEFAULT_VACUUM_PAGES,
+                           now=None, price_stores: Optional[List[IPriceStore]] = None) -> dict:
+    """
+    Deletes raw prices of the days older than `raw_days` in batches of whole days of a symbol, about `batch_size`
+    rows, each batch in its own transaction, and at most `max_batches` batches per run. Hourly and daily rollups
+    holding fewer samples than the raw prices of their bucket are rebuilt from them before they are deleted, so
+    the downsampled history is kept. Price blobs (prices_{year}_{n}) whose two months period ended before the
+    cutoff are deleted as well, then the database is compacted and analyzed.
+
+    Samples older than the cutoff are trimmed from the `price_stores` too, by default the price store and the
+    local copy of the remote prices. Rolling windows are not trimmed: their files only keep the state of the
+    windows of every symbol, which does not grow, and they start over by themselves from a trimmed series.
+    """
+    now = now or pytz.utc.localize(datetime.utcnow())
+    cutoff = get_bucket_instant(now - timedelta(days=raw_days), DAILY)
+    size_before = get_database_size()
+
+    rows_deleted, rows_rolled_up, complete = _delete_raw_prices(cutoff, batch_size, max_batches)
+    blobs_deleted = _delete_price_blobs(cutoff)
+    samples_trimmed = _trim_price_stores(cutoff, price_stores)
+    compact_database(vacuum_pages=vacuum_pages)
+
+    return {
+        'cutoff': cutoff.isoformat(),
+        'rows_deleted': rows_deleted,
+        'rows_rolled_up': rows_rolled_up,
+        'blobs_deleted': blobs_deleted,
+        'samples_trimmed': samples_trimmed,
+        'complete': complete,
+        'bytes_reclaimed': max(size_before - get_database_size(), 0),
+    }
+
+
+def get_database_size() -> int:
+    if connection.vendor != 'sqlite':
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA page_count')
+        page_count = cursor.fetchone()[0]
+        cursor.execute('PRAGMA page_size')
+        page_size = cursor.fetchone()[0]
+    return page_count * page_size
+
+
+def compact_database(vacuum_pages=DEFAULT_VACUUM_PAGES, full=False):
+    """
+    Returns up to `vacuum_pages` free pages of a SQLite database to the file system and refreshes the query
+    planner statistics. Incremental vacuum needs auto_vacuum=INCREMENTAL, which only a full VACUUM can
+    enable on an existing database: that is done once when `full` is requested.
+    Other databases vacuum themselves, only ANALYZE is run.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor != 'sqlite':
+            cursor.execute('ANALYZE')
+            return
+        cursor.execute('PRAGMA auto_vacuum')
+        incremental = cursor.fetchone()[0] == 2
+        if full:
+            cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            cursor.execute('VACUUM')
+        elif incremental:
+            # the pragma frees one page per step, execute() would only step it once
+            connection.connection.executescript(f'PRAGMA incremental_vacuum({int(vacuum_pages)})')
+        cursor.execute('ANALYZE')
+
+
+def _delete_raw_prices(cutoff, batch_size, max_batches):
+    rows_deleted = 0
+    rows_rolled_up = 0
+    batches = 0
+    symbols = list(DCryptocurrencyPrice.objects.filter(instant__lt=cutoff).order_by('symbol')
+                   .values_list('symbol', flat=True).distinct())
+    for symbol in symbols:
+        while max_batches is None or batches < max_batches:
+            with transaction.atomic():
+                rows = _get_expired_days(symbol, cutoff, batch_size)
+                if len(rows) == 0:
+                    break
+                rows_rolled_up += _roll_up_missing_buckets(symbol, rows)
+                DCryptocurrencyPrice.objects.filter(symbol=symbol, instant__lte=rows[-1][2]).delete()
+            rows_deleted += len(rows)
+            batches += 1
+    return rows_deleted, rows_rolled_up, not DCryptocurrencyPrice.objects.filter(instant__lt=cutoff).exists()
+
+
+def _get_expired_days(symbol, cutoff, batch_size):
+    """
+    Raw prices of the oldest whole days of the symbol before the cutoff, about `batch_size` of them but
+    at least a day. The rollups of a day are checked against every sample of the day at once.
+    """
+    expired = DCryptocurrencyPrice.objects.filter(symbol=symbol, instant__lt=cutoff)
+    instants = list(expired.order_by('instant').values_list('instant', flat=True)[:batch_size])
+    if len(instants) == 0:
+        return []
+    end = cutoff
+    if len(instants) == batch_size:
+        first_day, last_day = get_bucket_instant(instants[0], DAILY), get_bucket_instant(instants[-1], DAILY)
+        end = last_day if last_day > first_day else last_day + timedelta(days=1)
+    return list(expired.filter(instant__lt=end).order_by('instant').values_list(
+        'id', 'symbol', 'instant', 'sell_price', 'buy_price'))
+
+
+def _roll_up_missing_buckets(symbol, rows) -> int:
+    """
+    Rebuilds from the raw prices the rollups of the buckets holding fewer samples than there are raw prices,
+    or missing. Returns the number of raw prices added to rebuilt rollups.
+    """
+    rolled_up = set()
+    for resolution in ROLLUP_RESOLUTIONS:
+        raw_buckets = {}
+        for row in rows:
+            raw_buckets.setdefault(get_bucket_instant(row[2], resolution), []).append(row)
+        samples = dict(DPriceRollup.objects.filter(symbol=symbol, resolution=resolution, instant__in=raw_buckets.keys())
+                       .values_list('instant', 'samples'))
+        # a rollup with more samples than raw prices holds history already deleted, it is kept
+        missing = [bucket for bucket, bucket_rows in raw_buckets.items() if samples.get(bucket, 0) < len(bucket_rows)]
+        if len(missing) == 0:
+            continue
+        bucket_rows = [row for bucket in missing for row in raw_buckets[bucket]]
+        rollups = add_prices_to_rollups({}, [CryptocurrencyPrice(symbol=symbol, instant=instant, sell_price=sell_price,
+                                                                 buy_price=buy_price)
+                                             for _, _, instant, sell_price, buy_price in bucket_rows],
+                                        resolutions=(resolution,))
+        DPriceRollup.objects.filter(symbol=symbol, resolution=resolution, instant__in=missing).delete()
+        DPriceRollup.objects.bulk_create([DPriceRollup(
+            symbol=rollup.symbol,
+            resolution=rollup.resolution,
+            instant=rollup.instant,
+            **{field: getattr(rollup, field) for field in ROLLUP_FIELDS}
+        ) for rollup in rollups.values()], batch_size=500)
+        rolled_up.update(row[0] for row in bucket_rows)
+    return len(rolled_up)
+
+
+def _delete_price_blobs(cutoff) -> int:
+    from shared.application.models import DServerConfiguration
+
+    expired_pks = []
+    for pk, key in DServerConfiguration.objects.filter(key__startswith='prices_').values_list('pk', 'key'):
+        match = _PRICES_KEY_REGEX.match(key)
+        if match is None:
+            continue
+        year, period = int(match.group(1)), int(match.group(2))
+        # period n holds months 2n + 1 and 2n + 2
+        end_year, end_month = (year + 1, 1) if period >= 5 else (year, 2 * period + 3)
+        if pytz.utc.localize(datetime(end_year, end_month, 1)) <= cutoff:
+            expired_pks.append(pk)
+    if len(expired_pks) > 0:
+        DServerConfiguration.objects.filter(pk__in=expired_pks).delete()
+        invalidate_configurations_cache()
+    return len(expired_pks)
+
+
+def _trim_price_stores(cutoff, price_stores: Optional[List[IPriceStore]]) -> int:
+    if price_stores is None:
+        price_stores = [dependency_dispatcher.request_implementation(IPriceStore),
+                        MemmapPriceStore(settings.REMOTE_PRICES_STORE_DIR)]
+    return sum(price_store.trim(cutoff) for price_store in price_stores if price_store is not None)
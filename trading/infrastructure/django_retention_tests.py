@@ -0,0 +1,99 @@
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+import pytz
+from django.test import TestCase
+
+from shared.application.models import DServerConfiguration
+from trading.application.django_models import DCryptocurrencyPrice, DPriceRollup
+from trading.domain.entities import CryptocurrencyPrice
+from trading.infrastructure.django_retention import _delete_price_blobs, apply_prices_retention
+from trading.infrastructure.django_rollups import DjangoPriceRollups
+from trading.infrastructure.memmap_price_store import MemmapPriceStore
+
+
+def _prices(symbol, start, days, step=timedelta(minutes=30)):
+    return [CryptocurrencyPrice(symbol=symbol, instant=start + step * n, sell_price=float(n % 17), buy_price=1.0)
+            for n in range(int(timedelta(days=days) / step))]
+
+
+def _rollups():
+    return {(r.symbol, r.resolution, r.instant): (r.samples, r.mean_price, r.low_price, r.high_price, r.open_price,
+                                                  r.close_price) for r in DPriceRollup.objects.all()}
+
+
+class PricesRetentionTests(TestCase):
+    def setUp(self) -> None:
+        self.start = pytz.utc.localize(datetime(2021, 1, 1))
+        # 3 days before the cutoff and one after it, the cutoff is aligned to the start of its day
+        self.now = self.start + timedelta(days=4, hours=10)
+        self.prices = _prices('AAA', self.start, 4) + _prices('BBB', self.start + timedelta(days=2), 2)
+
+    def _store(self, prices):
+        DCryptocurrencyPrice.objects.bulk_create([DCryptocurrencyPrice(
+            symbol=p.symbol, instant=p.instant, sell_price=p.sell_price, buy_price=p.buy_price) for p in prices])
+
+    def _retention(self, **kwargs):
+        return apply_prices_retention(raw_days=1, vacuum_pages=0, now=self.now, price_stores=[], **kwargs)
+
+    def test_batches(self):
+        self._store(self.prices)
+        DjangoPriceRollups().update(self.prices)
+        rollups = _rollups()
+
+        # 60 rows hold a day and a half, the batch stops at the end of the first day
+        report = self._retention(batch_size=60, max_batches=2)
+        self.assertEqual((report['rows_deleted'], report['rows_rolled_up'], report['complete']), (96, 0, False))
+        self.assertEqual(report['cutoff'], (self.start + timedelta(days=3)).isoformat())
+        self.assertEqual(DCryptocurrencyPrice.objects.filter(symbol='AAA').earliest('instant').instant,
+                         self.start + timedelta(days=2))
+
+        # batches hold a day at least
+        report = self._retention(batch_size=10, max_batches=None)
+        self.assertEqual((report['rows_deleted'], report['complete']), (96, True))
+        self.assertEqual(DCryptocurrencyPrice.objects.count(), 48 + 48)
+        self.assertFalse(DCryptocurrencyPrice.objects.filter(instant__lt=self.start + timedelta(days=3)).exists())
+        self.assertEqual(_rollups(), rollups)
+
+    def test_rolls_up_missing_samples(self):
+        self._store(self.prices)
+        DjangoPriceRollups().update(self.prices)
+        bbb_day = ('BBB', 86400, self.start + timedelta(days=2))
+        expected = {**_rollups(), bbb_day: (100,) + _rollups()[bbb_day][1:]}
+        DPriceRollup.objects.all().delete()
+
+        # a sample in the middle of the first day never reached the rollups, nor the second day of AAA
+        missed = self.prices[5]
+        DjangoPriceRollups().update([p for p in self.prices if p is not missed and
+                                     not (p.symbol == 'AAA' and p.instant.day == 2)])
+        # history of a day whose raw prices were already deleted, it is kept
+        DPriceRollup.objects.filter(symbol=bbb_day[0], resolution=bbb_day[1], instant=bbb_day[2]).update(samples=100)
+
+        report = self._retention(max_batches=None)
+        self.assertEqual((report['rows_deleted'], report['rows_rolled_up']), (48 * 4, 48 * 2))
+        self.assertEqual(_rollups(), expected)
+
+    def test_trims_price_stores(self):
+        directory = tempfile.mkdtemp()
+        try:
+            store = MemmapPriceStore(directory)
+            store.append(self.prices)
+            report = apply_prices_retention(raw_days=1, vacuum_pages=0, now=self.now, price_stores=[store])
+            self.assertEqual(report['samples_trimmed'], 48 * 4)
+            self.assertEqual([store.get_series(symbol)[0].instant for symbol in ['AAA', 'BBB']],
+                             [self.start + timedelta(days=3)] * 2)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_price_blobs(self):
+        for key in ['prices_2020_4', 'prices_2020_5', 'prices_2021_0', 'prices_2021_1', 'prices_retention']:
+            DServerConfiguration.objects.create(key=key, data={})
+
+        # period 5 holds november and december, it ends with the year
+        self.assertEqual(_delete_price_blobs(pytz.utc.localize(datetime(2020, 12, 31))), 1)
+        self.assertEqual(_delete_price_blobs(pytz.utc.localize(datetime(2021, 1, 1))), 1)
+        self.assertEqual(_delete_price_blobs(pytz.utc.localize(datetime(2021, 2, 28))), 0)
+        self.assertEqual(_delete_price_blobs(pytz.utc.localize(datetime(2021, 3, 1))), 1)
+        self.assertEqual(sorted(DServerConfiguration.objects.values_list('key', flat=True)),
+                         ['prices_2021_1', 'prices_retention'])
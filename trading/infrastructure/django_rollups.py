@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+import pytz
+from django.db import transaction
+
+from trading.application.django_models import DCryptocurrencyPrice, DPriceRollup
+from trading.domain.entities import CryptocurrencyPrice, PriceRollup
+from trading.domain.interfaces import IPriceRollups
+from trading.domain.tools.rollups import DEFAULT_MIN_ROLLUPS, ROLLUP_RESOLUTIONS, add_prices_to_rollups, \
+    get_bucket_instant, get_rollup_keys, raw_rollups, select_resolution
+
+ROLLUP_FIELDS = ['open_price', 'high_price', 'low_price', 'close_price', 'mean_price', 'samples',
+                  'first_instant', 'last_instant']
+
+
+class DjangoPriceRollups(IPriceRollups):
+    def __init__(self, resolutions=ROLLUP_RESOLUTIONS):
+        self.resolutions = resolutions
+
+    def update(self, prices: List[CryptocurrencyPrice]):
+        if len(prices) == 0:
+            return
+        keys = get_rollup_keys(prices, resolutions=self.resolutions)
+        with transaction.atomic():
+            existing = {}
+            for resolution in self.resolutions:
+                instants = {instant for _, r, instant in keys if r == resolution}
+                symbols = {symbol for symbol, r, _ in keys if r == resolution}
+                for drollup in DPriceRollup.objects.filter(resolution=resolution, symbol__in=symbols,
+                                                           instant__in=instants):
+                    existing[(drollup.symbol, drollup.resolution, drollup.instant)] = drollup
+
+            rollups = {key: drollup.core_entity for key, drollup in existing.items()}
+            modified = add_prices_to_rollups(rollups, prices, resolutions=self.resolutions)
+
+            # rows are replaced rather than updated, a bulk_update builds one CASE per field and row
+            DPriceRollup.objects.filter(pk__in=[existing[key].pk for key in modified.keys() if key in existing])\
+                .delete()
+            DPriceRollup.objects.bulk_create([DPriceRollup(
+                symbol=rollup.symbol,
+                resolution=rollup.resolution,
+                instant=rollup.instant,
+                **{field: getattr(rollup, field) for field in ROLLUP_FIELDS}
+            ) for rollup in modified.values()], batch_size=500)
+
+    def get_rollups(self, symbol: str, td: timedelta, now: Optional[datetime] = None,
+                    min_rollups: int = DEFAULT_MIN_ROLLUPS) -> List[PriceRollup]:
+        now = now or pytz.utc.localize(datetime.utcnow())
+        resolution = select_resolution(td, min_rollups=min_rollups, resolutions=self.resolutions)
+        if resolution is None:
+            rows = DCryptocurrencyPrice.objects.filter(symbol=symbol, instant__gte=now - td, instant__lte=now)\
+                .order_by('instant').values_list('instant', 'sell_price', 'buy_price')
+            return raw_rollups(CryptocurrencyPrice(symbol=symbol, instant=instant, sell_price=sell_price,
+                                                   buy_price=buy_price) for instant, sell_price, buy_price in rows)
+        return [drollup.core_entity for drollup in DPriceRollup.objects.filter(
+            symbol=symbol,
+            resolution=resolution,
+            instant__gte=get_bucket_instant(now - td, resolution),
+            instant__lte=now,
+        ).order_by('instant')]
@@ -1,34 +1,115 @@
-from typing import List
+from typing import Dict, Iterable, List, Optional
 
-from trading.application.django_models import DPackage
-from trading.domain.entities import Cryptocurrency, Package
+from django.db import connection, transaction
+from django.db.models import Count, F, Max, Min, Sum
+
+from trading.application.django_models import DPackage, DPositionSummary
+from trading.domain.entities import Cryptocurrency, Package, PositionSummary
 from trading.domain.interfaces import ILocalStorage
 
+PACKAGE_FIELDS = ['currency_symbol', 'currency_amount', 'bought_at_price', 'operation_datetime']
+
 
 class DjangoLocalStorage(ILocalStorage):
     def save_package(self, package: Package):
-        if package.id is None:
-            dinstance = DPackage.objects.create(
-                currency_symbol=package.currency_symbol,
-                currency_amount=package.currency_amount,
-                bought_at_price=package.bought_at_price,
-                operation_datetime=package.operation_datetime,
-            )
-            package.id = dinstance.pk
-        else:
-            dinstance = DPackage.objects.get(pk=package.id)
-            dinstance.currency_symbol = package.currency_symbol
-            dinstance.currency_amount = package.currency_amount
-            dinstance.bought_at_price = package.bought_at_price
-            dinstance.operation_datetime = package.operation_datetime
-            dinstance.save()
+        self.save_packages([package])
+
+    def save_packages(self, packages: List[Package]):
+        """
+        New packages are inserted with a single statement and get their ids, existing ones are
+        updated with another one.
+        """
+        new_packages = [package for package in packages if package.id is None]
+        updated_packages = [package for package in packages if package.id is not None]
+        symbols = {package.currency_symbol for package in packages}
+        with transaction.atomic():
+            if len(new_packages) > 0:
+                self._create_packages(new_packages)
+            if len(updated_packages) > 0:
+                # packages moved to another currency also change the summary of the previous one
+                symbols.update(DPackage.objects.filter(pk__in=[package.id for package in updated_packages])
+                               .values_list('currency_symbol', flat=True))
+                DPackage.objects.bulk_update([self._to_model(package) for package in updated_packages],
+                                             PACKAGE_FIELDS)
+            self.refresh_position_summaries(symbols)
 
     def delete_package(self, package: Package):
-        if package.id is None:
+        self.delete_packages([package])
+
+    def delete_packages(self, packages: List[Package]):
+        ids = [package.id for package in packages if package.id is not None]
+        if len(ids) == 0:
             return
-        p = DPackage.objects.filter(pk=package.id).first()
-        if p is not None:
-            p.delete()
+        with transaction.atomic():
+            deleted = DPackage.objects.filter(pk__in=ids)
+            symbols = set(deleted.values_list('currency_symbol', flat=True))
+            deleted.delete()
+            self.refresh_position_summaries(symbols)
 
     def get_cryptocurrency_packages(self, cryptocurrency: Cryptocurrency) -> List[Package]:
         return [p.core_entity for p in DPackage.objects.filter(currency_symbol=cryptocurrency.symbol)]
+
+    def get_all_packages_grouped(self) -> Dict[str, List[Package]]:
+        grouped = {}
+        for p in DPackage.objects.order_by('currency_symbol', 'pk'):
+            grouped.setdefault(p.currency_symbol, []).append(p.core_entity)
+        return grouped
+
+    def get_position_summaries(self) -> Dict[str, PositionSummary]:
+        return {p.currency_symbol: p.core_entity for p in DPositionSummary.objects.all()}
+
+    def refresh_position_summaries(self, symbols: Optional[Iterable[str]] = None):
+        """
+        Recomputes the position summaries of the given currencies (every one by default) from their packages
+        with a single aggregation query. Currencies left without packages lose their summary.
+        """
+        packages = DPackage.objects.order_by()
+        summaries = DPositionSummary.objects.all()
+        if symbols is not None:
+            symbols = list(symbols)
+            if len(symbols) == 0:
+                return
+            packages = packages.filter(currency_symbol__in=symbols)
+            summaries = summaries.filter(currency_symbol__in=symbols)
+        rows = packages.values('currency_symbol').annotate(
+            packages=Count('pk'),
+            total_amount=Sum('currency_amount'),
+            cost_basis=Sum(F('currency_amount') * F('bought_at_price')),
+            oldest_datetime=Min('operation_datetime'),
+            youngest_datetime=Max('operation_datetime'),
+            min_bought_price=Min('bought_at_price'),
+            max_bought_price=Max('bought_at_price'),
+        )
+        with transaction.atomic():
+            summaries.delete()
+            DPositionSummary.objects.bulk_create([DPositionSummary(**{
+                **row,
+                'total_amount': row['total_amount'] or 0.0,
+                'cost_basis': row['cost_basis'] or 0.0,
+            }) for row in rows])
+
+    def _create_packages(self, packages: List[Package]):
+        dinstances = [self._to_model(package) for package in packages]
+        if connection.features.can_return_rows_from_bulk_insert:
+            DPackage.objects.bulk_create(dinstances)
+            ids = [dinstance.pk for dinstance in dinstances]
+        elif connection.vendor == 'sqlite':
+            # sqlite does not return the inserted ids, but writers are serialized and ids autoincrement,
+            # so inside the transaction the newest rows are the inserted ones
+            DPackage.objects.bulk_create(dinstances)
+            ids = sorted(DPackage.objects.order_by('-pk').values_list('pk', flat=True)[:len(dinstances)])
+        else:
+            for dinstance in dinstances:
+                dinstance.save()
+            ids = [dinstance.pk for dinstance in dinstances]
+        for package, id_ in zip(packages, ids):
+            package.id = id_
+
+    def _to_model(self, package: Package) -> DPackage:
+        return DPackage(
+            pk=package.id,
+            currency_symbol=package.currency_symbol,
+            currency_amount=package.currency_amount,
+            bought_at_price=package.bought_at_price,
+            operation_datetime=package.operation_datetime,
+        )
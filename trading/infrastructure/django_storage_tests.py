@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+
+import pytz
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from trading.application.django_models import DPackage
+from trading.domain.entities import Cryptocurrency, Package
+from trading.infrastructure.django_storage import DjangoLocalStorage
+
+
+class DjangoLocalStorageTests(TestCase):
+    def setUp(self) -> None:
+        self.storage = DjangoLocalStorage()
+        self.now = pytz.utc.localize(datetime(2021, 2, 1))
+
+    def _package(self, symbol, amount):
+        return Package(currency_symbol=symbol, currency_amount=amount, bought_at_price=10.0,
+                       operation_datetime=self.now)
+
+    def test_save_and_group_packages(self):
+        DPackage.objects.create(currency_symbol='OLD', currency_amount=1.0)
+        packages = [self._package(symbol, n) for n, symbol in enumerate(['BTC', 'ETH', 'BTC', 'ADA'])]
+        self.storage.save_packages(packages)
+
+        self.assertEqual([p.id for p in packages], list(DPackage.objects.exclude(currency_symbol='OLD')
+                                                        .order_by('pk').values_list('pk', flat=True)))
+        with CaptureQueriesContext(connection) as queries:
+            grouped = self.storage.get_all_packages_grouped()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual({symbol: [p.currency_amount for p in symbol_packages]
+                          for symbol, symbol_packages in grouped.items()},
+                         {'ADA': [3], 'BTC': [0, 2], 'ETH': [1], 'OLD': [1.0]})
+        self.assertEqual([p.id for p in grouped['BTC']], [packages[0].id, packages[2].id])
+
+        packages[1].currency_amount = 5.0
+        packages[3].currency_amount = 6.0
+        new_package = self._package('ETH', 7.0)
+        self.storage.save_packages([packages[1], packages[3], new_package])
+        self.assertIsNotNone(new_package.id)
+        self.assertEqual([p.currency_amount for p in self.storage.get_cryptocurrency_packages(Cryptocurrency('ETH'))],
+                         [5.0, 7.0])
+        self.assertEqual(DPackage.objects.get(pk=packages[3].id).currency_amount, 6.0)
+
+    def test_delete_packages(self):
+        packages = [self._package('BTC', n) for n in range(5)]
+        self.storage.save_packages(packages)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.storage.delete_packages(packages[1:4] + [self._package('BTC', 9)])
+        self.assertEqual(len([q for q in queries if q['sql'].startswith('DELETE FROM "trading_dpackage"')]), 1)
+        self.assertEqual([p.id for p in self.storage.get_cryptocurrency_packages(Cryptocurrency('BTC'))],
+                         [packages[0].id, packages[4].id])
+
+        self.storage.delete_package(packages[0])
+        self.assertEqual(DPackage.objects.count(), 1)
+
+    def test_position_summaries(self):
+        packages = [Package(currency_symbol='BTC', currency_amount=amount, bought_at_price=price,
+                            operation_datetime=self.now - timedelta(days=days))
+                    for amount, price, days in [(1.0, 10.0, 3), (2.0, 20.0, 1), (3.0, 5.0, 2)]]
+        self.storage.save_packages(packages + [self._package('ETH', 4.0)])
+
+        btc = self.storage.get_position_summaries()['BTC']
+        self.assertEqual((btc.packages, btc.total_amount, btc.cost_basis), (3, 6.0, 65.0))
+        self.assertEqual((btc.min_bought_price, btc.max_bought_price), (5.0, 20.0))
+        self.assertEqual((btc.oldest_datetime, btc.youngest_datetime),
+                         (self.now - timedelta(days=3), self.now - timedelta(days=1)))
+
+        packages[1].currency_symbol = 'ETH'
+        self.storage.save_package(packages[1])
+        self.storage.delete_package(packages[2])
+        summaries = self.storage.get_position_summaries()
+        self.assertEqual((summaries['BTC'].packages, summaries['BTC'].total_amount), (1, 1.0))
+        self.assertEqual((summaries['ETH'].packages, summaries['ETH'].total_amount), (2, 6.0))
+
+        self.storage.delete_packages([packages[0]])
+        self.assertEqual(list(self.storage.get_position_summaries().keys()), ['ETH'])
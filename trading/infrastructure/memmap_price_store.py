@@ -0,0 +1,148 @@
+import os
+import time
+from datetime import datetime
+from typing import List, Optional
+
+import numpy as np
+
+from shared.domain.tools import filelocks
+from trading.domain.entities import CryptocurrencyPrice
+from trading.domain.interfaces import IPriceStore
+from trading.domain.tools.prices import PriceSeries
+
+_COLUMNS = ('instants', 'sell_prices', 'buy_prices')
+_DTYPE = np.dtype('<f8')
+
+# seconds that a read waits for a trim replacing the files, a trim interrupted for longer is ignored
+TRIM_WAIT = 5.0
+
+
+class MemmapPriceStore(IPriceStore):
+    """
+    Keeps every symbol history as three append only float64 files (epoch instants, sell and buy prices)
+    inside <directory>/<symbol>/. Reads memory-map the files, so series are served without copies.
+
+    `trim` replaces the files with shorter ones. Replacing them is not atomic, so it bumps a generation number
+    before and after (odd while replacing) and reads retry until they map the three files of one generation.
+    """
+    def __init__(self, directory):
+        self.directory = str(directory)
+
+    def append(self, prices: List[CryptocurrencyPrice]):
+        by_symbol = {}
+        for price in prices:
+            if price.sell_price is None or price.buy_price is None:
+                continue
+            by_symbol.setdefault(price.symbol, []).append(price)
+
+        for symbol, symbol_prices in by_symbol.items():
+            symbol_prices.sort(key=lambda p: p.instant)
+            symbol_directory = self._get_symbol_directory(symbol)
+            os.makedirs(symbol_directory, exist_ok=True)
+            with filelocks.acquire_single_access(os.path.join(symbol_directory, 'append')):
+                series = self._read(symbol)
+                last_instant = series.instants[-1] if len(series) > 0 else None
+                # series must stay sorted, samples not newer than the stored ones are discarded
+                symbol_prices = [p for p in symbol_prices
+                                 if last_instant is None or p.instant.timestamp() > last_instant]
+                if len(symbol_prices) == 0:
+                    continue
+                self._truncate_to(symbol, len(series))
+                columns = {
+                    'instants': [p.instant.timestamp() for p in symbol_prices],
+                    'sell_prices': [p.sell_price for p in symbol_prices],
+                    'buy_prices': [p.buy_price for p in symbol_prices],
+                }
+                for column in _COLUMNS:
+                    with open(self._get_column_path(symbol, column), 'ab') as f:
+                        f.write(np.asarray(columns[column], dtype=_DTYPE).tobytes())
+
+    def get_series(self, symbol: str, since: Optional[datetime] = None) -> PriceSeries:
+        series = self._read(symbol)
+        if since is None:
+            return series
+        return series.between(start_ts=since.timestamp())
+
+    def trim(self, before: datetime) -> int:
+        """
+        Deletes the samples older than `before`, returns how many were deleted.
+        """
+        deleted = 0
+        for symbol in self.get_symbols():
+            with filelocks.acquire_single_access(os.path.join(self._get_symbol_directory(symbol), 'append')):
+                series = self._read(symbol)
+                first = int(np.searchsorted(series.instants, before.timestamp(), side='left'))
+                if first == 0:
+                    continue
+                for column in _COLUMNS:
+                    with open(f'{self._get_column_path(symbol, column)}.tmp', 'wb') as f:
+                        f.write(np.asarray(getattr(series, column)[first:], dtype=_DTYPE).tobytes())
+                generation = self._get_generation(symbol)
+                self._set_generation(symbol, generation + 1)
+                try:
+                    for column in _COLUMNS:
+                        path = self._get_column_path(symbol, column)
+                        os.replace(f'{path}.tmp', path)
+                finally:
+                    self._set_generation(symbol, generation + 2)
+                deleted += first
+        return deleted
+
+    def get_symbols(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(name for name in os.listdir(self.directory)
+                      if os.path.isfile(self._get_column_path(name, 'instants')))
+
+    def _read(self, symbol) -> PriceSeries:
+        deadline = time.monotonic() + TRIM_WAIT
+        while True:
+            generation = self._get_generation(symbol)
+            if generation % 2 == 1 and time.monotonic() < deadline:
+                time.sleep(0.001)
+                continue
+            # a writer could have been interrupted between columns, only complete rows are exposed
+            length = self._get_length(symbol)
+            if length == 0:
+                series = PriceSeries(symbol=symbol)
+            else:
+                series = PriceSeries(symbol=symbol, **{
+                    column: np.memmap(self._get_column_path(symbol, column), dtype=_DTYPE, mode='r', shape=(length,))
+                    for column in _COLUMNS
+                })
+            if self._get_generation(symbol) == generation or time.monotonic() >= deadline:
+                return series
+
+    def _get_generation(self, symbol) -> int:
+        try:
+            with open(os.path.join(self._get_symbol_directory(symbol), 'generation')) as f:
+                return int(f.read() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def _set_generation(self, symbol, generation):
+        path = os.path.join(self._get_symbol_directory(symbol), 'generation')
+        with open(f'{path}.tmp', 'w') as f:
+            f.write(str(generation))
+        os.replace(f'{path}.tmp', path)
+
+    def _get_length(self, symbol):
+        sizes = []
+        for column in _COLUMNS:
+            path = self._get_column_path(symbol, column)
+            sizes.append(os.path.getsize(path) if os.path.exists(path) else 0)
+        return min(sizes) // _DTYPE.itemsize
+
+    def _truncate_to(self, symbol, length):
+        for column in _COLUMNS:
+            path = self._get_column_path(symbol, column)
+            if not os.path.exists(path):
+                open(path, 'wb').close()
+            elif os.path.getsize(path) != length * _DTYPE.itemsize:
+                os.truncate(path, length * _DTYPE.itemsize)
+
+    def _get_symbol_directory(self, symbol):
+        return os.path.join(self.directory, symbol)
+
+    def _get_column_path(self, symbol, column):
+        return os.path.join(self._get_symbol_directory(symbol), f'{column}.f8')
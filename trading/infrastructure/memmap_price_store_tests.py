@@ -0,0 +1,86 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytz
+
+from trading.domain.entities import CryptocurrencyPrice
+from trading.domain.tools.prices import PricesQueryset
+from trading.infrastructure.memmap_price_store import MemmapPriceStore
+
+
+def _prices(symbol, start, count, step=timedelta(minutes=5)):
+    return [CryptocurrencyPrice(symbol=symbol, instant=start + step * n, sell_price=float(n),
+                                buy_price=float(n) + 0.5) for n in range(count)]
+
+
+class MemmapPriceStoreTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        self.store = MemmapPriceStore(self.directory)
+        self.start = pytz.utc.localize(datetime(2021, 2, 1))
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.directory)
+
+    def test_append_and_read(self):
+        self.store.append(_prices('BTC', self.start, 10) + _prices('ETH', self.start, 5))
+        self.store.append(_prices('BTC', self.start + timedelta(minutes=50), 10))
+        series = self.store.get_series('BTC')
+        self.assertEqual(len(series), 20)
+        self.assertTrue(isinstance(series.instants, np.memmap))
+        self.assertTrue(np.all(np.diff(series.instants) > 0))
+        self.assertEqual(series[-1].sell_price, 9.0)
+        self.assertEqual(series[0].instant, self.start)
+        self.assertEqual(self.store.get_symbols(), ['BTC', 'ETH'])
+        self.assertEqual(len(self.store.get_series('DAI')), 0)
+
+    def test_older_samples_are_discarded(self):
+        self.store.append(_prices('BTC', self.start, 10))
+        self.store.append(_prices('BTC', self.start, 12))
+        self.assertEqual(len(self.store.get_series('BTC')), 12)
+
+    def test_incomplete_rows_are_ignored(self):
+        self.store.append(_prices('BTC', self.start, 10))
+        with open(os.path.join(self.directory, 'BTC', 'instants.f8'), 'ab') as f:
+            f.write(np.zeros(1, dtype='<f8').tobytes())
+        self.assertEqual(len(self.store.get_series('BTC')), 10)
+        self.store.append(_prices('BTC', self.start + timedelta(minutes=50), 1))
+        self.assertEqual(self.store.get_series('BTC')[-1].instant, self.start + timedelta(minutes=50))
+
+    def test_trim(self):
+        self.store.append(_prices('BTC', self.start, 20) + _prices('ETH', self.start + timedelta(minutes=60), 5))
+        before_trim = self.store.get_series('BTC')
+        self.assertEqual(self.store.trim(self.start + timedelta(minutes=60)), 12)
+        series = self.store.get_series('BTC')
+        self.assertEqual((len(series), series[0].instant, series[0].sell_price), (8, self.start + timedelta(minutes=60),
+                                                                                   12.0))
+        self.assertEqual((series[0].buy_price, series[-1].sell_price), (12.5, 19.0))
+        self.assertEqual(len(self.store.get_series('ETH')), 5)
+        # series read before keep the files they mapped
+        self.assertEqual((len(before_trim), before_trim[0].sell_price), (20, 0.0))
+
+        self.store.append(_prices('BTC', self.start + timedelta(minutes=100), 2))
+        self.assertEqual(len(self.store.get_series('BTC')), 10)
+        self.assertEqual(self.store.trim(self.start), 0)
+        self.assertEqual(self.store.trim(self.start + timedelta(days=1)), 15)
+        self.assertEqual([len(self.store.get_series(symbol)) for symbol in ['BTC', 'ETH']], [0, 0])
+
+    def test_queryset_over_series(self):
+        self.store.append(_prices('BTC', self.start, 288))
+        now = self.start + timedelta(hours=23, minutes=55)
+        series = self.store.get_series('BTC', since=now - timedelta(hours=12))
+        self.assertEqual(len(series), 12 * 12 + 1)
+        qs = PricesQueryset(series)
+        last_hour = qs.filter_by_last(timedelta(hours=1), now=now)
+        self.assertEqual(len(last_hour), 13)
+        self.assertTrue(np.shares_memory(last_hour.sell_prices, series.sell_prices))
+        expected = PricesQueryset(list(series)).profit_percentage(timedelta(hours=1), now=now)
+        self.assertAlmostEqual(qs.profit_percentage(timedelta(hours=1), now=now), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+import pytz
+import requests
+
+from trading.domain.entities import CryptocurrencyPrice
+from trading.domain.interfaces import IPriceStore
+from trading.domain.tools.prices import PriceSeries
+
+DEFAULT_SYNC_TTL = 60
+DEFAULT_WINDOW_DAYS = 30
+# seconds that the last sample of a symbol may be behind the newest one to share the all-month-prices cursor
+DEFAULT_CURSOR_LAG = 15 * 60
+
+
+class RemotePricesCache:
+    """
+    Local copy of the prices served by a remote robobroker instance, persisted in a price store.
+
+    Every sync asks the remote only for the samples after the last stored one: all symbols in a single
+    all-month-prices call (`since` cursor, conditional GET), falling back to concurrent month-prices calls per
+    symbol when that call fails. Symbols without local history are downloaded whole, one call each.
+    Symbols lagging more than `cursor_lag` seconds behind the newest one (stale or delisted) would pin
+    the shared cursor, they are synced with their own month-prices calls.
+    Symbols the remote does not serve are not requested again until the next sync.
+    """
+    def __init__(self, base_url, store: IPriceStore, auth=None, sync_ttl=DEFAULT_SYNC_TTL,
+                 window_days=DEFAULT_WINDOW_DAYS, max_workers=8, timeout=30.0, cursor_lag=DEFAULT_CURSOR_LAG):
+        self.base_url = base_url.rstrip('/') + '/'
+        self.store = store
+        self.sync_ttl = sync_ttl
+        self.window_days = window_days
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.cursor_lag = cursor_lag
+        self.session = requests.Session()
+        self.session.auth = auth
+        self._synced_at = None
+        self._all_prices_validator = None
+        # symbol: monotonic time of the sync that did not get it from the remote
+        self._unknown_symbols = {}
+        self._lock = threading.Lock()
+
+    def get_prices(self, symbol: str, now: Optional[datetime] = None) -> PriceSeries:
+        now = now or pytz.utc.localize(datetime.utcnow())
+        with self._lock:
+            stale = self._synced_at is None or time.monotonic() - self._synced_at >= self.sync_ttl
+            unknown = time.monotonic() - self._unknown_symbols.get(symbol, -math.inf) < self.sync_ttl
+            if stale or (not unknown and symbol not in self.store.get_symbols()):
+                self._sync([symbol])
+        return self.store.get_series(symbol, since=now - timedelta(days=self.window_days))
+
+    def sync(self, symbols: Iterable[str] = ()) -> int:
+        """
+        Brings the local copy up to date, returns the number of samples received.
+        """
+        with self._lock:
+            return self._sync(symbols)
+
+    def _sync(self, symbols):
+        known_symbols = set(self.store.get_symbols())
+        cursors = {}
+        for symbol in known_symbols:
+            series = self.store.get_series(symbol)
+            if len(series) > 0:
+                cursors[symbol] = float(series.instants[-1])
+        missing_symbols = [s for s in symbols if s not in cursors]
+
+        received = 0
+        if len(missing_symbols) > 0:
+            received += self._store(self._fetch_each({symbol: None for symbol in missing_symbols}))
+            known_symbols = set(self.store.get_symbols())
+            for symbol in missing_symbols:
+                if symbol in known_symbols:
+                    self._unknown_symbols.pop(symbol, None)
+                else:
+                    self._unknown_symbols[symbol] = time.monotonic()
+        if len(cursors) > 0:
+            newest = max(cursors.values())
+            lagging = {symbol: cursor for symbol, cursor in cursors.items() if cursor < newest - self.cursor_lag}
+            shared = {symbol: cursor for symbol, cursor in cursors.items() if symbol not in lagging}
+            try:
+                prices = self._fetch_all(min(shared.values()))
+            except (requests.RequestException, ValueError):
+                prices = self._fetch_each(shared)
+            if len(lagging) > 0:
+                prices += self._fetch_each(lagging)
+            received += self._store(prices)
+        self._synced_at = time.monotonic()
+        return received
+
+    def _store(self, prices: List[CryptocurrencyPrice]):
+        # samples not newer than the stored ones are discarded by the store
+        self.store.append(prices)
+        return len(prices)
+
+    def _fetch_all(self, since) -> List[CryptocurrencyPrice]:
+        headers = {}
+        if self._all_prices_validator is not None and self._all_prices_validator[0] == since:
+            headers['If-None-Match'] = self._all_prices_validator[1]
+        response = self.session.get(f'{self.base_url}api/all-month-prices/', headers=headers, timeout=self.timeout,
+                                    params={'days': self.window_days, 'since': repr(since)})
+        if response.status_code == 304:
+            return []
+        response.raise_for_status()
+        prices = []
+        for symbol, symbol_prices in response.json().items():
+            prices += _parse_prices(symbol, symbol_prices)
+        if 'ETag' in response.headers:
+            self._all_prices_validator = (since, response.headers['ETag'])
+        return prices
+
+    def _fetch_each(self, cursors: Dict[str, Optional[float]]) -> List[CryptocurrencyPrice]:
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(lambda item: self._fetch_symbol(*item), cursors.items()))
+        return [price for prices in results for price in prices]
+
+    def _fetch_symbol(self, symbol, since) -> List[CryptocurrencyPrice]:
+        params = {'days': self.window_days}
+        if since is not None:
+            params['since'] = repr(since)
+        try:
+            response = self.session.get(f'{self.base_url}api/month-prices/{symbol}/', params=params,
+                                        timeout=self.timeout)
+            response.raise_for_status()
+            return _parse_prices(symbol, response.json())
+        except (requests.RequestException, ValueError):
+            return []
+
+
+def _parse_prices(symbol, serialized_prices) -> List[CryptocurrencyPrice]:
+    return [CryptocurrencyPrice(
+        symbol=symbol,
+        instant=pytz.utc.localize(datetime.utcfromtimestamp(p['i'])),
+        sell_price=p['s'],
+        buy_price=p['b'],
+    ) for p in serialized_prices]
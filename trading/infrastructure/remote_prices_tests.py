@@ -0,0 +1,136 @@
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+import pytz
+from django.contrib.auth.models import User
+from django.test import LiveServerTestCase
+from requests.auth import HTTPBasicAuth
+
+from shared.domain.dependencies import dependency_dispatcher
+from trading.application.django_models import DCryptocurrencyPrice
+from trading.domain.entities import Cryptocurrency, CryptocurrencyPrice
+from trading.domain.interfaces import ICryptoCurrencySource
+from trading.infrastructure.memmap_price_store import MemmapPriceStore
+from trading.infrastructure.remote_prices import RemotePricesCache
+
+
+class _Source(ICryptoCurrencySource):
+    def __init__(self, symbols, fail=False):
+        super().__init__()
+        self.symbols = symbols
+        self.fail = fail
+
+    def get_trading_cryptocurrencies(self):
+        if self.fail:
+            raise RuntimeError('Trading currencies not available')
+        return [Cryptocurrency(symbol=symbol, metadata={}) for symbol in self.symbols]
+
+
+class RemotePricesCacheTests(LiveServerTestCase):
+    def setUp(self) -> None:
+        import robobroker.urls  # noqa: F401, wires the implementations that are replaced below
+        self.previous_source = dependency_dispatcher.request_implementation(ICryptoCurrencySource)
+        self.source = _Source(['BTC', 'ETH'])
+        dependency_dispatcher.register_implementation(ICryptoCurrencySource, self.source)
+
+        User.objects.create_user('replica', password='secret')
+        self.now = pytz.utc.localize(datetime.utcnow())
+        self._add_prices(self.now - timedelta(days=2), 100)
+        self.directory = tempfile.mkdtemp()
+        self.cache = RemotePricesCache(self.live_server_url, MemmapPriceStore(self.directory),
+                                       auth=HTTPBasicAuth('replica', 'secret'))
+
+    def tearDown(self) -> None:
+        dependency_dispatcher.register_implementation(ICryptoCurrencySource, self.previous_source)
+        shutil.rmtree(self.directory)
+
+    def _add_prices(self, start, count):
+        DCryptocurrencyPrice.objects.bulk_create([DCryptocurrencyPrice(
+            symbol=symbol,
+            instant=start + timedelta(minutes=5 * n, microseconds=123457),
+            sell_price=float(n),
+            buy_price=float(n) + 0.5,
+        ) for symbol in ['BTC', 'ETH'] for n in range(count)])
+
+    def _assert_same_prices(self, symbol):
+        expected = list(DCryptocurrencyPrice.objects.filter(symbol=symbol).order_by('instant'))
+        series = self.cache.store.get_series(symbol)
+        self.assertEqual(len(series), len(expected))
+        self.assertEqual([p.instant for p in series], [p.instant for p in expected])
+        self.assertEqual(series.sell_prices.tolist(), [p.sell_price for p in expected])
+        self.assertEqual(series.buy_prices.tolist(), [p.buy_price for p in expected])
+
+    def test_initial_download(self):
+        prices = self.cache.get_prices('BTC')
+        self.assertEqual(len(prices), 100)
+        self._assert_same_prices('BTC')
+        # symbols without local history are downloaded on their own
+        self.assertEqual(self.cache.store.get_symbols(), ['BTC'])
+
+    def test_incremental_sync(self):
+        self.assertEqual(self.cache.sync(['BTC', 'ETH']), 200)
+        self._add_prices(self.now, 3)
+        self.assertEqual(self.cache.sync(), 6)
+        self._assert_same_prices('BTC')
+        self._assert_same_prices('ETH')
+        # nothing new: answered with 304
+        self.assertEqual(self.cache.sync(), 0)
+
+    def test_cache_survives_restarts(self):
+        self.cache.sync(['BTC', 'ETH'])
+        self._add_prices(self.now, 2)
+        cache = RemotePricesCache(self.live_server_url, MemmapPriceStore(self.directory),
+                                  auth=HTTPBasicAuth('replica', 'secret'))
+        self.assertEqual(cache.sync(), 4)
+        self._assert_same_prices('ETH')
+
+    def test_per_symbol_fallback(self):
+        self.cache.sync(['BTC', 'ETH'])
+        self._add_prices(self.now, 3)
+        self.source.fail = True
+        with self.assertLogs('django.request', level='ERROR'):
+            self.assertEqual(self.cache.sync(), 6)
+        self._assert_same_prices('BTC')
+        self._assert_same_prices('ETH')
+
+    def _record_requests(self):
+        requests = []
+        get = self.cache.session.get
+
+        def _get(url, **kwargs):
+            requests.append((url.replace(self.live_server_url, ''), kwargs))
+            return get(url, **kwargs)
+        self.cache.session.get = _get
+        return requests
+
+    def test_lagging_symbol(self):
+        self.cache.sync(['BTC', 'ETH'])
+        # a symbol that the remote stopped sampling days before the others
+        self.cache.store.append([CryptocurrencyPrice(symbol='OLD', instant=self.now - timedelta(days=4),
+                                                     sell_price=1.0, buy_price=1.5)])
+        cursor = self.cache.store.get_series('BTC').instants[-1]
+        self._add_prices(self.now, 3)
+        requests = self._record_requests()
+        self.assertEqual(self.cache.sync(), 6)
+        self.assertEqual([url for url, _ in requests], ['/api/all-month-prices/', '/api/month-prices/OLD/'])
+        self.assertEqual(requests[0][1]['params']['since'], repr(float(cursor)))
+
+        # the shared cursor does not move while nothing new is sampled, answered with 304
+        del requests[:]
+        self.assertEqual(self.cache.sync(), 0)
+        self.assertEqual(self.cache.sync(), 0)
+        self.assertIn('If-None-Match', requests[2][1]['headers'])
+
+    def test_unknown_symbol(self):
+        self.assertEqual(len(self.cache.get_prices('BTC')), 100)
+        requests = self._record_requests()
+        self.assertEqual(len(self.cache.get_prices('XRP')), 0)
+        self.assertEqual([url for url, _ in requests], ['/api/month-prices/XRP/', '/api/all-month-prices/'])
+        self.assertEqual(len(self.cache.get_prices('XRP')), 0)
+        self.assertEqual(len(requests), 2)
+
+        # asked again once the sync expires
+        self.cache.sync_ttl = 0
+        self.cache.get_prices('XRP')
+        self.assertEqual(len(requests), 4)
@@ -0,0 +1,73 @@
+import json
+import os
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from shared.domain.tools import filelocks
+from trading.domain.entities import WindowStats
+from trading.domain.interfaces import IPriceStore, IRollingStats
+from trading.domain.tools.rolling import DEFAULT_WINDOWS, RollingStats
+
+
+class PriceStoreRollingStats(IRollingStats):
+    """
+    Rolling windows of the symbols of a price store. The windows of every symbol are saved as JSON in
+    <directory>/<symbol>.json after every update, so a restarted process only appends the samples stored
+    since then. Reads catch up in memory with samples appended by other processes.
+    """
+    def __init__(self, price_store: IPriceStore, directory, windows: Optional[List[timedelta]] = None):
+        self.price_store = price_store
+        self.directory = str(directory)
+        self.windows = list(windows or DEFAULT_WINDOWS)
+        self._stats = {}
+
+    def update(self, symbols: Optional[List[str]] = None):
+        symbols = symbols if symbols is not None else self.price_store.get_symbols()
+        os.makedirs(self.directory, exist_ok=True)
+        for symbol in sorted(set(symbols)):
+            path = self._get_path(symbol)
+            with filelocks.acquire_single_access(path):
+                stats = self._load(symbol)
+                if stats.update(self.price_store.get_series(symbol)) > 0:
+                    self._save(symbol, stats)
+
+    def get_window_stats(self, symbols: List[str], td: timedelta) -> Dict[str, WindowStats]:
+        window_stats = {}
+        for symbol in symbols:
+            stats = self._load(symbol)
+            stats.update(self.price_store.get_series(symbol))
+            if stats.length > 0:
+                window_stats[symbol] = stats.get_stats(td)
+        return window_stats
+
+    def _load(self, symbol) -> RollingStats:
+        path = self._get_path(symbol)
+        mtime = os.stat(path).st_mtime_ns if os.path.exists(path) else None
+        cached = self._stats.get(symbol)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        stats = None
+        if mtime is not None:
+            try:
+                with open(path) as f:
+                    stats = RollingStats.from_state(json.load(f))
+            except (ValueError, KeyError, TypeError):
+                stats = None
+        seconds = {int(td.total_seconds()) for td in self.windows}
+        if stats is None or set(stats.windows.keys()) != seconds:
+            # missing, unreadable or built for other windows, rebuilt from the price store
+            stats = RollingStats(symbol, windows=self.windows)
+        self._stats[symbol] = (mtime, stats)
+        return stats
+
+    def _save(self, symbol, stats: RollingStats):
+        path = self._get_path(symbol)
+        temporary_path = f'{path}.tmp'
+        with open(temporary_path, 'w') as f:
+            json.dump(stats.to_state(), f)
+        os.replace(temporary_path, path)
+        self._stats[symbol] = (os.stat(path).st_mtime_ns, stats)
+
+    def _get_path(self, symbol):
+        return os.path.join(self.directory, f'{symbol}.json')
@@ -0,0 +1,66 @@
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+import pytz
+
+from trading.domain.entities import CryptocurrencyPrice
+from trading.infrastructure.memmap_price_store import MemmapPriceStore
+from trading.infrastructure.rolling_stats import PriceStoreRollingStats
+
+
+def _prices(symbol, start, count, first_price=1.0, step=timedelta(minutes=5)):
+    return [CryptocurrencyPrice(symbol=symbol, instant=start + step * n, sell_price=first_price + n,
+                                buy_price=first_price + n + 0.5) for n in range(count)]
+
+
+class PriceStoreRollingStatsTests(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        self.store = MemmapPriceStore(os.path.join(self.directory, 'prices'))
+        self.stats_directory = os.path.join(self.directory, 'stats')
+        self.start = pytz.utc.localize(datetime(2021, 2, 1))
+        self.windows = [timedelta(hours=1), timedelta(days=1)]
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.directory)
+
+    def test_update_and_restart(self):
+        self.store.append(_prices('BTC', self.start, 20) + _prices('ETH', self.start, 5, first_price=10.0))
+        rolling_stats = PriceStoreRollingStats(self.store, self.stats_directory, windows=self.windows)
+        rolling_stats.update(['BTC', 'ETH'])
+        self.assertEqual(sorted(os.listdir(self.stats_directory)), ['BTC.json', 'ETH.json'])
+
+        stats = rolling_stats.get_window_stats(['BTC', 'ETH', 'DAI'], timedelta(hours=1))
+        self.assertEqual(sorted(stats.keys()), ['BTC', 'ETH'])
+        # 13 samples in the last hour: 55 minutes back from the newest one at 95 minutes
+        self.assertEqual((stats['BTC'].samples, stats['BTC'].first_price, stats['BTC'].last_price), (13, 8.0, 20.0))
+        self.assertEqual(stats['ETH'].last_instant, self.start + timedelta(minutes=20))
+
+        # a new process loads the saved windows and appends the samples stored since then
+        self.store.append(_prices('BTC', self.start + timedelta(minutes=100), 12, first_price=21.0))
+        restarted = PriceStoreRollingStats(self.store, self.stats_directory, windows=self.windows)
+        stats = restarted.get_window_stats(['BTC'], timedelta(days=1))['BTC']
+        self.assertEqual((stats.samples, stats.first_price, stats.last_price), (32, 1.0, 32.0))
+        self.assertEqual((stats.min_price, stats.max_price, stats.mean), (1.0, 32.0, 16.5))
+
+        # windows saved for other durations are rebuilt
+        other = PriceStoreRollingStats(self.store, self.stats_directory, windows=[timedelta(minutes=10)])
+        stats = other.get_window_stats(['BTC'], timedelta(minutes=10))['BTC']
+        self.assertEqual((stats.samples, stats.first_price), (3, 30.0))
+
+    def test_trimmed_store(self):
+        self.store.append(_prices('BTC', self.start, 20))
+        rolling_stats = PriceStoreRollingStats(self.store, self.stats_directory, windows=self.windows)
+        rolling_stats.update(['BTC'])
+
+        # as many samples trimmed as appended, the length of the series is the same but the windows start over
+        self.store.trim(self.start + timedelta(minutes=20))
+        self.store.append(_prices('BTC', self.start + timedelta(minutes=100), 4, first_price=21.0))
+        stats = PriceStoreRollingStats(self.store, self.stats_directory, windows=self.windows)\
+            .get_window_stats(['BTC'], timedelta(days=1))['BTC']
+        self.assertEqual((stats.samples, stats.first_price, stats.last_price), (20, 5.0, 24.0))
+        stats = rolling_stats.get_window_stats(['BTC'], timedelta(days=1))['BTC']
+        self.assertEqual((stats.samples, stats.first_price, stats.last_price), (20, 5.0, 24.0))
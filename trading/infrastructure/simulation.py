@@ -0,0 +1,197 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pytz
+
+from trading.domain.entities import Cryptocurrency, CryptocurrencyPrice, Package, PositionSummary, Trade
+from trading.domain.interfaces import ICryptoCurrencySource, ILocalStorage
+from trading.domain.tools.market import PriceMatrix
+from trading.domain.tools.prices import PriceSeries
+
+# share of the value of every conversion charged as fee
+DEFAULT_FEE = 0.005
+
+
+class SimulatedCryptoCurrencySource(ICryptoCurrencySource):
+    """
+    Trading source replaying price history: prices are the last sampled ones at `now`, which the caller
+    moves forward with `set_now`. Every currency of the matrix is a trading currency, balances start
+    at `balances` and conversions are filled right away:
+
+        + `source_amount` is an amount of the source currency, limited to its balance.
+        + The source is sold at its sell price and the target bought at its buy price, both moved against
+          the trade by `slippage`. The stable currency has no slippage and is worth `stable_price` when it
+          has no prices of its own.
+        + `fee` is the share of the converted value charged, in the stable currency.
+
+    Every fill is kept in `trades`. Prices are read from a PriceMatrix of the whole history, so moving `now`
+    costs nothing and a price lookup is a search among the samples.
+    """
+    def __init__(self, matrix: PriceMatrix, stable_symbol='DAI', balances: Optional[Dict[str, float]] = None,
+                 fee=DEFAULT_FEE, slippage=0.0, stable_price=1.0, native_currency='EUR'):
+        super().__init__(native_currency=native_currency)
+        self.matrix = matrix
+        self.stable_currency = Cryptocurrency(symbol=stable_symbol, metadata={})
+        self.currencies = [Cryptocurrency(symbol=symbol, metadata={}) for symbol in self.matrix.symbols
+                           if symbol != stable_symbol]
+        self.balances = defaultdict(float, balances or {})
+        self.fee = fee
+        self.slippage = slippage
+        self.stable_price = stable_price
+        self.trades: List[Trade] = []
+        self.now = pytz.utc.localize(datetime.utcfromtimestamp(matrix.origin))
+        self._prices = {}
+
+    @classmethod
+    def from_series(cls, series: List[PriceSeries], start: datetime, end: datetime, **kwargs):
+        """
+        Source replaying the samples of the series in [start, end].
+        """
+        return cls(PriceMatrix.from_series(series, start.timestamp(), end.timestamp(), contiguous=True), **kwargs)
+
+    def set_now(self, now: datetime):
+        self.now = now
+        self._prices = {}
+
+    def get_trading_cryptocurrencies(self) -> List[Cryptocurrency]:
+        return self.currencies
+
+    def get_trading_cryptocurrency(self, symbol: str) -> Optional[Cryptocurrency]:
+        return next((currency for currency in self.currencies if currency.symbol == symbol), None)
+
+    def get_stable_cryptocurrency(self) -> Cryptocurrency:
+        return self.stable_currency
+
+    def get_amount_owned(self, cryptocurrency: Cryptocurrency) -> float:
+        return self.balances[cryptocurrency.symbol]
+
+    def get_current_sell_price(self, cryptocurrency: Cryptocurrency) -> Optional[float]:
+        return self._get_last_price(cryptocurrency.symbol, 'sell')
+
+    def get_current_buy_price(self, cryptocurrency: Cryptocurrency) -> Optional[float]:
+        return self._get_last_price(cryptocurrency.symbol, 'buy')
+
+    def get_last_month_prices(self, cryptocurrency: Cryptocurrency) -> Sequence[CryptocurrencyPrice]:
+        from trading.domain.context import MARKET_WINDOW
+
+        return self.matrix.get_series(cryptocurrency.symbol, (self.now - MARKET_WINDOW).timestamp(),
+                                      self.now.timestamp())
+
+    def start_conversions(self):
+        pass
+
+    def finish_conversions(self):
+        pass
+
+    def convert(self, source_cryptocurrency: Cryptocurrency, source_amount: float,
+                target_cryptocurrency: Cryptocurrency) -> Optional[Trade]:
+        requested_amount = float(source_amount)
+        source_amount = min(requested_amount, self.balances[source_cryptocurrency.symbol])
+        if source_amount <= 0:
+            return None
+
+        source_price = self._get_fill_price(source_cryptocurrency.symbol, 'sell')
+        target_price = self._get_fill_price(target_cryptocurrency.symbol, 'buy')
+        value = source_amount * source_price
+        fee_value = value * self.fee
+        target_amount = (value - fee_value) / target_price
+
+        self.balances[source_cryptocurrency.symbol] -= source_amount
+        self.balances[target_cryptocurrency.symbol] += target_amount
+        trade = Trade(
+            instant=self.now,
+            source_symbol=source_cryptocurrency.symbol,
+            target_symbol=target_cryptocurrency.symbol,
+            requested_amount=requested_amount,
+            source_amount=source_amount,
+            target_amount=target_amount,
+            source_price=source_price,
+            target_price=target_price,
+            fee=fee_value / self._get_stable_price(),
+        )
+        self.trades.append(trade)
+        return trade
+
+    def get_equity(self) -> float:
+        """
+        Value of every balance at the current sell prices, in the stable currency.
+        """
+        value = 0.0
+        for symbol, amount in self.balances.items():
+            if amount == 0:
+                continue
+            price = self._get_stable_price() if symbol == self.stable_currency.symbol else \
+                self._get_last_price(symbol, 'sell')
+            value += amount * (price or 0.0)
+        return value / self._get_stable_price()
+
+    def _get_fill_price(self, symbol, price) -> float:
+        if symbol == self.stable_currency.symbol:
+            return self._get_stable_price()
+        last_price = self._get_last_price(symbol, price)
+        if last_price is None:
+            raise ValueError(f'No {price} price of {symbol} at {self.now}')
+        return last_price * (1 - self.slippage if price == 'sell' else 1 + self.slippage)
+
+    def _get_stable_price(self) -> float:
+        return self._get_last_price(self.stable_currency.symbol, 'sell') or self.stable_price
+
+    def _get_last_price(self, symbol, price) -> Optional[float]:
+        if price not in self._prices:
+            self._prices[price] = self.matrix.last_prices(self.now, price=price)
+        row = self.matrix.index.get(symbol)
+        if row is None or np.isnan(self._prices[price][row]):
+            return None
+        return float(self._prices[price][row])
+
+
+class InMemoryLocalStorage(ILocalStorage):
+    """
+    Local storage keeping packages in a dict, ids are given in saving order.
+    Position summaries are computed from the packages when read after a change.
+    """
+    def __init__(self):
+        self._packages: Dict[int, Package] = {}
+        self._next_id = 1
+        self._summaries = None
+
+    def save_package(self, package: Package):
+        if package.id is None:
+            package.id = self._next_id
+            self._next_id += 1
+        self._packages[package.id] = package
+        self._summaries = None
+
+    def delete_package(self, package: Package):
+        self._packages.pop(package.id, None)
+        self._summaries = None
+
+    def get_cryptocurrency_packages(self, cryptocurrency: Cryptocurrency) -> List[Package]:
+        return [package for package in self._packages.values() if package.currency_symbol == cryptocurrency.symbol]
+
+    def get_all_packages_grouped(self) -> Dict[str, List[Package]]:
+        grouped = defaultdict(list)
+        for package in self._packages.values():
+            grouped[package.currency_symbol].append(package)
+        return dict(grouped)
+
+    def get_position_summaries(self) -> Dict[str, PositionSummary]:
+        if self._summaries is None:
+            self._summaries = {symbol: _summarize(symbol, packages)
+                               for symbol, packages in self.get_all_packages_grouped().items()}
+        return self._summaries
+
+
+def _summarize(symbol, packages: List[Package]) -> PositionSummary:
+    return PositionSummary(
+        currency_symbol=symbol,
+        packages=len(packages),
+        total_amount=sum(package.currency_amount for package in packages),
+        cost_basis=sum(package.currency_amount * package.bought_at_price for package in packages),
+        oldest_datetime=min(package.operation_datetime for package in packages),
+        youngest_datetime=max(package.operation_datetime for package in packages),
+        min_bought_price=min(package.bought_at_price for package in packages),
+        max_bought_price=max(package.bought_at_price for package in packages),
+    )
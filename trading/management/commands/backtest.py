@@ -0,0 +1,98 @@
+import csv
+import os
+from datetime import datetime, timedelta
+from typing import Tuple
+
+import pytz
+from django.core.management.base import BaseCommand, CommandError
+
+from trading.domain.backtesting import Backtest, load_price_series
+from trading.domain.context import MARKET_WINDOW
+from trading.domain.strategy import StrategyConfig
+
+
+def _parse_datetime(value):
+    return pytz.utc.localize(datetime.fromisoformat(value)) if value else None
+
+
+def add_backtest_arguments(parser):
+    parser.add_argument('--since', help='First tick, ISO date. Defaults to --days before --until')
+    parser.add_argument('--until', help='Last tick, ISO date. Defaults to the newest price loaded')
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--symbols', help='Comma separated symbols. Defaults to every stored one')
+    parser.add_argument('--stable', default='DAI', help='Stable currency the strategy buys with')
+    parser.add_argument('--initial', type=float, default=1000.0, help='Initial amount of the stable currency')
+    parser.add_argument('--fee', type=float, default=0.5, help='Fee of every conversion, percentage')
+    parser.add_argument('--slippage', type=float, default=0.0, help='Slippage of every fill, percentage')
+    parser.add_argument('--step', type=int, default=5, help='Minutes between ticks')
+    parser.add_argument('--purchase-every', type=int, default=60, help='Minutes between purchases')
+
+
+def load_backtest(options, strategy=None) -> Tuple[Backtest, datetime, datetime]:
+    """
+    Backtest of the stored prices with the command options, and the period to run it over.
+    """
+    until = _parse_datetime(options['until']) or pytz.utc.localize(datetime.utcnow())
+    since = _parse_datetime(options['since']) or until - timedelta(days=options['days'])
+    symbols = options['symbols'].split(',') if options['symbols'] else None
+
+    series = load_price_series(since - MARKET_WINDOW, until, symbols=symbols)
+    if len(series) == 0:
+        raise CommandError(f'No prices between {since - MARKET_WINDOW} and {until}')
+    if options['until'] is None:
+        until = min(until, pytz.utc.localize(datetime.utcfromtimestamp(max(s.instants[-1] for s in series))))
+
+    backtest = Backtest(series, stable_symbol=options['stable'], initial_amount=options['initial'],
+                        fee=options['fee'] / 100.0, slippage=options['slippage'] / 100.0,
+                        step=timedelta(minutes=options['step']),
+                        purchase_every=timedelta(minutes=options['purchase_every']), strategy=strategy)
+    return backtest, since, until
+
+
+class Command(BaseCommand):
+    help = 'Replay the stored prices through the trading strategy with a simulated exchange'
+
+    def add_arguments(self, parser):
+        add_backtest_arguments(parser)
+        parser.add_argument('--strategy', action='append', default=[],
+                            help='Strategy parameter as key=value, windows and periods in hours. Can be repeated')
+        parser.add_argument('--output', help='Directory to write equity.csv, trades.csv and equity.png to')
+
+    def handle(self, *args, **options):
+        try:
+            strategy = StrategyConfig.from_dict(dict(param.partition('=')[::2] for param in options['strategy']))
+        except ValueError as e:
+            raise CommandError(str(e))
+        backtest, since, until = load_backtest(options, strategy=strategy)
+        result = backtest.run(since, until)
+
+        self.stdout.write(f'{len(backtest.series)} currencies from {since} to {until}, strategy {strategy}')
+        for key, value in result.summary().items():
+            self.stdout.write(f'{key:>18}: {value:.2f}' if isinstance(value, float) else f'{key:>18}: {value}')
+
+        if options['output']:
+            self._write_output(options['output'], result)
+
+    def _write_output(self, directory, result):
+        import matplotlib.pyplot as plt
+
+        os.makedirs(directory, exist_ok=True)
+        instants = [pytz.utc.localize(datetime.utcfromtimestamp(instant)) for instant in result.instants]
+        with open(os.path.join(directory, 'equity.csv'), 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['instant', 'equity'])
+            writer.writerows((instant.isoformat(), equity) for instant, equity in zip(instants, result.equity))
+        with open(os.path.join(directory, 'trades.csv'), 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['instant', 'source', 'target', 'requested_amount', 'source_amount', 'target_amount',
+                             'source_price', 'target_price', 'fee'])
+            writer.writerows((trade.instant.isoformat(), trade.source_symbol, trade.target_symbol,
+                              trade.requested_amount, trade.source_amount, trade.target_amount, trade.source_price,
+                              trade.target_price, trade.fee) for trade in result.trades)
+
+        figure, ax = plt.subplots(figsize=(12, 6))
+        ax.plot(instants, result.equity)
+        ax.set_title(f'Equity ({result.stable_symbol})')
+        figure.savefig(os.path.join(directory, 'equity.png'))
+        plt.close(figure)
+        self.stdout.write(f'Equity curve and {len(result.trades)} trades written to {directory}')
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from trading.application.benchmarks import BENCHMARKS, run_benchmark
+
+
+class Command(BaseCommand):
+    help = 'Run performance benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help=f'Benchmarks to run: {", ".join(sorted(BENCHMARKS.keys()))}')
+        parser.add_argument('-p', '--param', action='append', default=[],
+                            help='Benchmark parameter as key=value. Can be repeated')
+
+    def handle(self, *args, **options):
+        params = {}
+        for param in options['param']:
+            key, _, value = param.partition('=')
+            params[key] = value
+        names = options['names'] or sorted(BENCHMARKS.keys())
+        for name in names:
+            if name not in BENCHMARKS:
+                raise CommandError(f'Unknown benchmark {name}')
+        for name in names:
+            self.stdout.write(f'== {name}')
+            run_benchmark(name, report=self.stdout.write, **params)
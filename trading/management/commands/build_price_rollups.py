@@ -0,0 +1,46 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Max, Min
+
+from shared.domain.dependencies import dependency_dispatcher
+from trading.application.django_models import DCryptocurrencyPrice, DPriceRollup
+from trading.domain.entities import CryptocurrencyPrice
+from trading.domain.interfaces import IPriceRollups
+from trading.domain.tools.rollups import DAILY, get_bucket_instant
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the hourly and daily price rollups of the days covered by the stored prices'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        price_rollups: IPriceRollups = dependency_dispatcher.request_implementation(IPriceRollups)
+        covered = DCryptocurrencyPrice.objects.aggregate(first_instant=Min('instant'), last_instant=Max('instant'))
+        if covered['first_instant'] is None:
+            self.stdout.write('No prices stored, rollups left untouched')
+            return
+        # prices older than the first stored one may have been deleted by the retention policy, the rollups are
+        # their only history: the day of the first stored price is only rebuilt if it starts with it
+        start = get_bucket_instant(covered['first_instant'], DAILY)
+        if start < covered['first_instant']:
+            start += timedelta(days=1)
+        DPriceRollup.objects.filter(instant__gte=start, instant__lte=covered['last_instant']).delete()
+        rows = DCryptocurrencyPrice.objects.filter(instant__gte=start).order_by('symbol', 'instant').values_list(
+            'symbol', 'instant', 'sell_price', 'buy_price')
+
+        chunk = []
+        total = 0
+        for symbol, instant, sell_price, buy_price in rows.iterator(chunk_size=options['chunk_size']):
+            chunk.append(CryptocurrencyPrice(symbol=symbol, instant=instant, sell_price=sell_price,
+                                             buy_price=buy_price))
+            if len(chunk) >= options['chunk_size']:
+                price_rollups.update(chunk)
+                total += len(chunk)
+                chunk = []
+        price_rollups.update(chunk)
+        total += len(chunk)
+        self.stdout.write(f'{total} prices since {start} processed, '
+                          f'{DPriceRollup.objects.filter(instant__gte=start).count()} rollups built')
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from shared.domain.dependencies import dependency_dispatcher
+from trading.application.django_models import DCryptocurrencyPrice
+from trading.domain.entities import CryptocurrencyPrice
+from trading.domain.interfaces import IPriceStore
+
+
+class Command(BaseCommand):
+    help = 'Load stored prices into the columnar prices store'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        price_store: IPriceStore = dependency_dispatcher.request_implementation(IPriceStore)
+        rows = DCryptocurrencyPrice.objects.order_by('symbol', 'instant').values_list(
+            'symbol', 'instant', 'sell_price', 'buy_price')
+
+        chunk = []
+        total = 0
+        for symbol, instant, sell_price, buy_price in rows.iterator(chunk_size=options['chunk_size']):
+            chunk.append(CryptocurrencyPrice(symbol=symbol, instant=instant, sell_price=sell_price,
+                                             buy_price=buy_price))
+            if len(chunk) >= options['chunk_size']:
+                price_store.append(chunk)
+                total += len(chunk)
+                chunk = []
+        price_store.append(chunk)
+        total += len(chunk)
+        self.stdout.write(f'{total} prices processed')
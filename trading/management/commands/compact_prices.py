@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from trading.infrastructure.django_retention import DEFAULT_BATCH_SIZE, DEFAULT_MAX_BATCHES, DEFAULT_RAW_DAYS, \
+    DEFAULT_VACUUM_PAGES, apply_prices_retention, compact_database, get_database_size
+
+
+class Command(BaseCommand):
+    help = 'Delete raw prices older than the retention period, keeping their rollups, trim the price stores and ' \
+           'compact the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--raw-days', type=int, default=DEFAULT_RAW_DAYS)
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--max-batches', type=int, default=DEFAULT_MAX_BATCHES,
+                            help='Batches deleted in this run, 0 for no limit')
+        parser.add_argument('--vacuum-pages', type=int, default=DEFAULT_VACUUM_PAGES)
+        parser.add_argument('--full-vacuum', action='store_true',
+                            help='Rebuild the SQLite file and enable incremental vacuum on it')
+
+    def handle(self, *args, **options):
+        report = apply_prices_retention(
+            raw_days=options['raw_days'],
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'] or None,
+            vacuum_pages=options['vacuum_pages'],
+        )
+        if options['full_vacuum']:
+            size_before = get_database_size()
+            compact_database(full=True)
+            report['bytes_reclaimed'] += max(size_before - get_database_size(), 0)
+
+        self.stdout.write(f'Raw prices before {report["cutoff"]}: {report["rows_deleted"]} deleted, '
+                          f'{report["rows_rolled_up"]} rolled up first'
+                          f'{"" if report["complete"] else " (more left for the next run)"}')
+        self.stdout.write(f'{report["blobs_deleted"]} price blobs deleted')
+        self.stdout.write(f'{report["samples_trimmed"]} samples trimmed from the price stores')
+        self.stdout.write(f'{report["bytes_reclaimed"]} bytes reclaimed')
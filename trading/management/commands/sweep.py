@@ -0,0 +1,73 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from trading.domain.strategy import STRATEGY_PARAMETERS
+from trading.domain.sweep import grid_parameters, random_parameters, run_sweep
+from trading.management.commands.backtest import add_backtest_arguments, load_backtest
+
+# summary columns shown in the ranking
+RANKING_COLUMNS = ['total_return', 'max_drawdown', 'sharpe', 'trades', 'fees']
+
+
+class Command(BaseCommand):
+    help = 'Backtest the trading strategy with many parameter sets in parallel and rank them'
+
+    def add_arguments(self, parser):
+        add_backtest_arguments(parser)
+        parser.add_argument('-p', '--param', action='append', default=[],
+                            help='Strategy parameter to sweep as key=v1,v2,... or key=low:high (random search). '
+                                 f'Windows and periods in hours. Available: {", ".join(STRATEGY_PARAMETERS)}')
+        parser.add_argument('--samples', type=int,
+                            help='Random search of this many parameter sets instead of the whole grid')
+        parser.add_argument('--seed', type=int)
+        parser.add_argument('--workers', type=int, help='Worker processes. Defaults to one per core')
+        parser.add_argument('--rank-by', default='total_return', choices=['total_return', 'sharpe', 'final_equity'])
+        parser.add_argument('--top', type=int, default=20, help='Parameter sets shown')
+        parser.add_argument('--output', help='CSV file to write every ranked parameter set to')
+
+    def handle(self, *args, **options):
+        space = {}
+        for param in options['param']:
+            name, _, values = param.partition('=')
+            if name not in STRATEGY_PARAMETERS:
+                raise CommandError(f'Unknown strategy parameter {name}')
+            try:
+                if ':' in values:
+                    low, _, high = values.partition(':')
+                    space[name] = (float(low), float(high))
+                else:
+                    space[name] = [STRATEGY_PARAMETERS[name](value) for value in values.split(',')]
+            except ValueError as e:
+                raise CommandError(f'Invalid values of {name}: {e}')
+        if len(space) == 0:
+            raise CommandError('No parameters to sweep, use --param')
+
+        if options['samples']:
+            parameter_sets = random_parameters(space, options['samples'], seed=options['seed'])
+        elif any(isinstance(values, tuple) for values in space.values()):
+            raise CommandError('Parameter ranges need --samples')
+        else:
+            parameter_sets = grid_parameters(space)
+
+        backtest, since, until = load_backtest(options)
+        start = time.perf_counter()
+        rows = run_sweep(backtest, since, until, parameter_sets, workers=options['workers'],
+                         rank_by=options['rank_by'])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f'{len(rows)} parameter sets of {len(backtest.series)} currencies from {since} to {until} '
+                          f'in {elapsed:.1f}s ({len(rows) / elapsed:.2f} sets/s)')
+
+        columns = list(space.keys()) + RANKING_COLUMNS
+        self.stdout.write(' '.join(f'{column:>20}' for column in columns))
+        for row in rows[:options['top']]:
+            self.stdout.write(' '.join(f'{row[column]:>20.2f}' if isinstance(row[column], float) else
+                                       f'{row[column]:>20}' for column in columns))
+
+        if options['output']:
+            with open(options['output'], 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=list(space.keys()) + [
+                    key for key in rows[0].keys() if key not in space])
+                writer.writeheader()
+                writer.writerows(rows)
@@ -0,0 +1,21 @@
+# Generated by Django 3.1.6 on 2026-10-18 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trading', '0004_auto_20210216_1003'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='dcryptocurrencyprice',
+            options={'ordering': ('instant',), 'verbose_name': 'CryptocurrencyPrice', 'verbose_name_plural': 'CryptocurrencyPrices'},
+        ),
+        migrations.AddIndex(
+            model_name='dcryptocurrencyprice',
+            index=models.Index(fields=['symbol', 'instant'], name='price_symbol_instant_idx'),
+        ),
+    ]
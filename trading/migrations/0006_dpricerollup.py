@@ -0,0 +1,39 @@
+# Generated by Django 3.1.6 on 2026-10-18 11:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trading', '0005_dcryptocurrencyprice_symbol_instant_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DPriceRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=10)),
+                ('resolution', models.IntegerField()),
+                ('instant', models.DateTimeField()),
+                ('open_price', models.FloatField()),
+                ('high_price', models.FloatField()),
+                ('low_price', models.FloatField()),
+                ('close_price', models.FloatField()),
+                ('mean_price', models.FloatField()),
+                ('samples', models.IntegerField(default=0)),
+                ('first_instant', models.DateTimeField()),
+                ('last_instant', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'PriceRollup',
+                'verbose_name_plural': 'PriceRollups',
+                'ordering': ('instant',),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dpricerollup',
+            constraint=models.UniqueConstraint(fields=('symbol', 'resolution', 'instant'), name='price_rollup_bucket_unique'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.1.6 on 2026-10-18 11:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trading', '0006_dpricerollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dpackage',
+            index=models.Index(fields=['currency_symbol'], name='package_currency_symbol_idx'),
+        ),
+    ]
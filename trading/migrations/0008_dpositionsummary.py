@@ -0,0 +1,53 @@
+# Generated by Django 3.1.6 on 2026-10-18 11:38
+
+from django.db import migrations, models
+from django.db.models import Count, F, Max, Min, Sum
+
+
+def _build_position_summaries(apps, schema_editor):
+    DPackage = apps.get_model('trading', 'DPackage')
+    DPositionSummary = apps.get_model('trading', 'DPositionSummary')
+    rows = DPackage.objects.order_by().values('currency_symbol').annotate(
+        packages=Count('pk'),
+        total_amount=Sum('currency_amount'),
+        cost_basis=Sum(F('currency_amount') * F('bought_at_price')),
+        oldest_datetime=Min('operation_datetime'),
+        youngest_datetime=Max('operation_datetime'),
+        min_bought_price=Min('bought_at_price'),
+        max_bought_price=Max('bought_at_price'),
+    )
+    DPositionSummary.objects.bulk_create([DPositionSummary(**{
+        **row,
+        'total_amount': row['total_amount'] or 0.0,
+        'cost_basis': row['cost_basis'] or 0.0,
+    }) for row in rows])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trading', '0007_dpackage_currency_symbol_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DPositionSummary',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('currency_symbol', models.CharField(max_length=10, unique=True)),
+                ('packages', models.IntegerField(default=0)),
+                ('total_amount', models.FloatField(default=0.0)),
+                ('cost_basis', models.FloatField(default=0.0)),
+                ('oldest_datetime', models.DateTimeField(blank=True, null=True)),
+                ('youngest_datetime', models.DateTimeField(blank=True, null=True)),
+                ('min_bought_price', models.FloatField(blank=True, null=True)),
+                ('max_bought_price', models.FloatField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'PositionSummary',
+                'verbose_name_plural': 'PositionSummaries',
+                'ordering': ('currency_symbol',),
+            },
+        ),
+        migrations.RunPython(_build_position_summaries, migrations.RunPython.noop),
+    ]